@@ -1,19 +1,107 @@
+import os
 from datetime import datetime
 from flask import Flask
 from models.quiz import Quiz
 from extensions import db, migrate, login_manager
 
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///quiz.db'
+    # e.g. DATABASE_URL=postgresql+psycopg2://quiz:secret@db/quiz; relative SQLite paths live in instance/
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///quiz.db')
     app.config['SECRET_KEY'] = 'quiz-master'
+    if test_config:
+        app.config.update(test_config)  # Used by the benchmarks to point at a scratch database
 
+    app.config.setdefault('DB_PROFILE', os.environ.get('DB_PROFILE', 'production'))  # SQLite pragmas, see services/db_profile.py
+    app.config.setdefault('SQLITE_BUSY_TIMEOUT', int(os.environ.get('SQLITE_BUSY_TIMEOUT', 15000)))  # ms a writer waits for the lock (production profile), see README
+    app.config.setdefault('DB_LOCKED_RETRIES', 2)  # A submission that still finds the database locked is retried this often
+    app.config.setdefault('SQLITE_PRAGMAS', {})  # Overrides on top of the profile, e.g. {'busy_timeout': 10000}
+    app.config.setdefault('DB_POOL_SIZE', int(os.environ.get('DB_POOL_SIZE', 10)))  # Connections kept open per process
+    app.config.setdefault('DB_MAX_OVERFLOW', int(os.environ.get('DB_MAX_OVERFLOW', 20)))  # Extra connections under load
+    app.config.setdefault('DB_POOL_TIMEOUT', 30)  # Seconds to wait for a free connection
+    app.config.setdefault('DB_POOL_RECYCLE', 1800)  # Reconnect after this many seconds (server-side idle timeouts)
+    app.config.setdefault('REPLICA_DATABASE_URL', os.environ.get('REPLICA_DATABASE_URL'))  # Read-only copy for reporting pages
+    app.config.setdefault('REPLICA_SNAPSHOT_INTERVAL', 30)  # Seconds between refreshes of a SQLite snapshot replica
+    app.config.setdefault('REPLICA_STICKY_SECONDS', 60)  # After writing, a visitor reads from the primary this long; keep above the replica lag
+    app.config.setdefault('METRICS_ENABLED', True)  # Per-endpoint latency / SQL / template timings at /metrics
+    app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))  # Bearer token for scrapers; admins can always read /metrics
+    app.config.setdefault('SLOW_QUERY_MS', 200)  # Statements at least this slow are logged with their route; None disables
+    app.config.setdefault('SESSION_BACKEND', os.environ.get('SESSION_BACKEND', 'sqlite'))  # 'sqlite', 'filesystem' or 'cookie' (Flask's signed cookie)
+    app.config.setdefault('SESSION_STORE_PATH', None)  # Defaults to instance/sessions.db or instance/sessions/
+    app.config.setdefault('SESSION_CACHE_SIZE', 10000)  # Decoded sessions kept in memory per process, checked against the store's version
+    app.config.setdefault('SESSION_PURGE_INTERVAL', 300)  # Seconds between bulk deletes of expired sessions
+    app.config.setdefault('PASSWORD_HASH_METHOD', os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'))  # werkzeug method string; older hashes are upgraded at login
+    app.config.setdefault('PASSWORD_SALT_LENGTH', 16)
+    app.config.setdefault('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)  # Processes that hash/verify passwords off the request threads; 0 hashes inline
+    app.config.setdefault('ANSWER_KEY_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+    app.config.setdefault('API_PAGE_SIZE', 50)  # Quizzes per page in /api/v1/quizzes
+    app.config.setdefault('API_GZIP_MIN_BYTES', 1024)  # Smaller API responses are sent uncompressed
+    app.config.setdefault('API_GZIP_LEVEL', 6)
+    app.config.setdefault('ADMIN_PAGE_SIZE', 50)  # Rows per page in the admin list views
+    app.config.setdefault('DELETE_CHUNK_SIZE', 5000)  # Rows per committed chunk when deleting large subtrees
+    app.config.setdefault('IMPORT_BATCH_SIZE', 1000)  # Rows per dedupe lookup / insert when importing questions
+    app.config.setdefault('EXPORT_YIELD_PER', 1000)  # Rows fetched from the cursor per chunk when exporting
+    app.config.setdefault('PRINCIPAL_CACHE_TTL', 30)  # Seconds a logged-in user/admin is served from memory
+    app.config.setdefault('PRINCIPAL_CACHE_SIZE', 10000)
+    app.config.setdefault('QUIZ_PAPER_CACHE_SIZE', 1000)  # Quiz versions whose rendered paper is kept in memory
+    app.config.setdefault('DASHBOARD_CACHE_SIZE', 10000)  # Users whose dashboard score summary is kept in memory
+    app.config.setdefault('DASHBOARD_CACHE_TTL', 60)  # Seconds before a summary is rebuilt (picks up other processes' grading)
+    app.config.setdefault('DASHBOARD_LOG_SAMPLE_RATE', 0.01)  # Share of dashboard views logged to quiz.dashboard
+    app.config.setdefault('LEADERBOARD_TTL', 60)  # Seconds before an in-process ranking is reloaded
+    app.config.setdefault('SUBMISSION_MODE', 'sync')  # 'sync' grades in the request, 'queued' hands off to workers
+    app.config.setdefault('SUBMISSION_QUEUE_PATH', None)  # Defaults to instance/submissions.db
+    app.config.setdefault('SUBMISSION_WORKERS', 2)
+    app.config.setdefault('SUBMISSION_BATCH_SIZE', 50)
+    app.config.setdefault('SUBMISSION_POLL_INTERVAL', 1.0)
+    app.config.setdefault('SUBMISSION_MAX_TRIES', 5)  # Failed gradings before a submission is dead-lettered
+    app.config.setdefault('SCHEDULER_ENABLED', True)  # Opens/closes quizzes and finalizes expired attempts
+    app.config.setdefault('SCHEDULER_INTERVAL', 30)  # Seconds between scheduler ticks
+    app.config.setdefault('SCHEDULER_LEASE_TTL', 90)  # A new leader takes over this long after the old one stops
+    app.config.setdefault('SCHEDULER_PREWARM_LEAD', 300)  # Seconds before start_time that answer keys are cached
+    app.config.setdefault('QUIZ_SHUFFLE', True)  # Per-attempt question and option order
+    app.config.setdefault('ATTEMPT_GRACE_SECONDS', 30)  # Late submissions within this many seconds still count
+    app.config.setdefault('AUTOSAVE_FLUSH_INTERVAL', 2.0)  # Seconds between autosave writes; None/0 disables the flusher
+    app.config.setdefault('AUTOSAVE_MAX_PENDING', 5000)  # Buffered answers that trigger an early flush
+
+    from services import db_profile
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = db_profile.engine_options(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    db_profile.init_app(app)
+    from services import read_replica
+    read_replica.init_app(app)
+    from services import metrics
+    metrics.init_app(app)
+    migrate.init_app(app, db, render_as_batch=True)  # SQLite cannot ALTER a column in place; migrations copy the table
+    from services import passwords
+    passwords.init_app(app)
+    from services import session_store
+    session_store.init_app(app)
     login_manager.init_app(app)
     login_manager.login_view = 'routes.landing'
 
+    from services.answer_key_cache import answer_key_cache
+    answer_key_cache.max_bytes = app.config['ANSWER_KEY_CACHE_MAX_BYTES']
+    from services.leaderboard import leaderboards
+    leaderboards.ttl = app.config['LEADERBOARD_TTL']
+    from services.dashboard_summary import dashboard_summaries, dashboard_log
+    dashboard_summaries.configure(app.config['DASHBOARD_CACHE_SIZE'], app.config['DASHBOARD_CACHE_TTL'])
+    dashboard_log.rate = app.config['DASHBOARD_LOG_SAMPLE_RATE']
+    from services.quiz_paper import paper_cache
+    paper_cache.max_size = app.config['QUIZ_PAPER_CACHE_SIZE']
+    from services.principal_cache import principal_cache
+    principal_cache.ttl = app.config['PRINCIPAL_CACHE_TTL']
+    principal_cache.max_size = app.config['PRINCIPAL_CACHE_SIZE']
+    from services import submission_queue
+    submission_queue.init_app(app)
+    from services import autosave
+    autosave.init_app(app)
+    from services import scheduler
+    scheduler.init_app(app)
+
+    from commands import register_commands
+    register_commands(app)
+
     from controllers.user import user_bp  # Import inside the function to avoid circular imports
     app.register_blueprint(user_bp)
     from controllers.auth import auth_bp
@@ -22,5 +110,7 @@ def create_app():
     app.register_blueprint(admin_bp)
     from controllers.routes import routes_bp
     app.register_blueprint(routes_bp)
+    from controllers.api import api_bp
+    app.register_blueprint(api_bp)
 
     return app
\ No newline at end of file
@@ -0,0 +1,172 @@
+# Runs EXPLAIN QUERY PLAN for every statement the routes issue and fails on full table scans.
+# Every route in the app must be exercised, so a new route cannot slip past the audit. The script's own
+# id lookups filter on indexed columns, so they pass the audit too.
+#   python benchmarks/audit_query_plans.py
+import io
+import sys
+from datetime import datetime, timedelta
+
+from flask import request, request_finished
+
+from common import make_app, seed_catalog, seed_quiz, login
+from extensions import db
+from services.query_plan import capture_statements, find_table_scans
+
+# Scans we accept on purpose, keyed by table: small lookup tables and whole-catalog listings
+ALLOWED_SCANS = {
+    'subject': "subject dropdowns list every subject",
+    'quiz': "user dashboard and available quizzes list the whole catalog",
+    'user': "admin dashboard user totals (COUNT over the table)",
+}
+
+
+def _first_id(model, **filters):
+    with db.session.no_autoflush:
+        return db.session.scalars(db.select(model.id).filter_by(**filters).order_by(model.id.desc())).first()
+
+
+def exercise_candidate_routes(app, quiz_id, question_ids, api_quiz_id, api_question_ids, user_email):
+    client = app.test_client()
+    for url in ['/', '/register', '/user-login', '/admin-login']:
+        client.get(url)
+    client.post('/register', data={'email': 'audit-new@example.com', 'password': 'bench', 'full_name': 'Audit',
+                                   'qualification': 'BSc', 'dob': '2000-01-01'})
+
+    user = login(client, '/user-login', user_email)
+    for url in ['/dashboard', '/available-quizzes', '/api/v1/quizzes', f'/api/v1/quizzes?after={quiz_id}',
+                f'/quiz/{quiz_id}/attempt', f'/quiz/{quiz_id}/paper', '/scores']:
+        user.get(url)
+    user.post(f'/quiz/{quiz_id}/autosave', json={str(qid): 'B' for qid in question_ids[:5]})
+    response = user.post(f'/quiz/{quiz_id}/attempt', data={str(qid): 'A' for qid in question_ids})
+    user.get(response.headers['Location'])
+
+    user.get(f'/api/v1/quizzes/{api_quiz_id}/paper')
+    response = user.post(f'/api/v1/quizzes/{api_quiz_id}/submission',
+                         json={'answers': {str(qid): 'A' for qid in api_question_ids}})
+    user.get(f"/api/v1/attempts/{response.get_json()['attempt_id']}/result")
+    user.get('/logout')
+
+
+def exercise_admin_routes(app, quiz_id, admin_email):
+    from models.quiz import Subject, Chapter, Question, Quiz
+    from models.user import User
+
+    with app.app_context():
+        quiz = db.session.get(Quiz, quiz_id)
+        subject_id, chapter_id = quiz.chapter.subject_id, quiz.chapter_id
+
+    admin = login(app.test_client(), '/admin-login', admin_email)
+    for url in ['/admin-dashboard', '/admin/users', '/admin/users?q=bench&active=1',
+                '/admin/manage_subjects', '/admin/manage_subjects?q=Sub', f'/admin/manage_chapters/{subject_id}',
+                f'/get_chapters/{subject_id}', f'/get_chapters/{subject_id}?q=Ch',
+                f'/admin/manage_questions/{subject_id}/{chapter_id}?q=Question', '/admin/manage_quizzes',
+                f'/admin/manage_quizzes?subject_id={subject_id}&chapter_id={chapter_id}&active=1&q=Bench',
+                f'/admin/preview_quiz/{quiz_id}', f'/admin/add_question_to_quiz/{quiz_id}',
+                f'/admin/quiz_analytics/{quiz_id}', '/admin/scheduler_status', '/metrics', '/admin/export']:
+        admin.get(url)
+    for dataset in ['scores', 'attempts', 'answers']:
+        admin.get(f'/admin/export/download?dataset={dataset}&subject_id={subject_id}&since=2000-01-01').close()
+
+    # A throwaway subtree, built and torn down through the admin pages
+    admin.post('/admin/add_subject', data={'subject_name': 'Audit Subject'})
+    with app.app_context():
+        audit_subject_id = _first_id(Subject, name='Audit Subject')
+    admin.post(f'/admin/edit_subject/{audit_subject_id}', data={'subject_name': 'Audit Subject 2'})
+    for name in ['Audit Chapter', 'Audit Chapter B']:
+        admin.post(f'/admin/manage_chapters/{audit_subject_id}/add', data={'chapter_name': name})
+    with app.app_context():
+        audit_chapter_id = _first_id(Chapter, subject_id=audit_subject_id, name='Audit Chapter')
+        other_chapter_id = _first_id(Chapter, subject_id=audit_subject_id, name='Audit Chapter B')
+    admin.post(f'/admin/edit_chapter/{audit_chapter_id}', data={'chapter_name': 'Audit Chapter A', 'chapter_number': 1})
+
+    admin.post(f'/admin/add_question/{audit_subject_id}/{audit_chapter_id}', data={
+        'question_text': 'Audit question', 'option_a': 'A', 'option_b': 'B', 'option_c': 'C',
+        'option_d': 'D', 'correct_option': 'A'})
+    admin.post(f'/admin/import_questions/{audit_subject_id}/{audit_chapter_id}', data={'file': (io.BytesIO(
+        b'question_text,option_a,option_b,option_c,option_d,correct_option\r\nImported,A,B,C,D,B\r\n'), 'audit.csv')},
+        content_type='multipart/form-data')
+    with app.app_context():
+        audit_question_id = _first_id(Question, chapter_id=audit_chapter_id, question_text='Audit question')
+        imported_question_id = _first_id(Question, chapter_id=audit_chapter_id, question_text='Imported')
+    admin.post(f'/admin/edit_question/{audit_question_id}', data={
+        'question_text': 'Audit question 2', 'option_a': 'A', 'option_b': 'B', 'option_c': 'C',
+        'option_d': 'D', 'correct_option': 'C'})
+
+    now = datetime.utcnow()
+    window = {'start_time': (now - timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'),
+              'end_time': (now + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'), 'duration': 30, 'total_marks': 2}
+    admin.post('/admin/add_quiz', data={'name': 'Audit Quiz', 'subject_id': audit_subject_id,
+                                        'chapter_id': audit_chapter_id, **window})
+    with app.app_context():
+        audit_quiz_id = _first_id(Quiz, chapter_id=audit_chapter_id, name='Audit Quiz')
+    admin.post(f'/admin/edit_quiz/{audit_quiz_id}', data={'name': 'Audit Quiz', 'description': 'Edited',
+                                                         'chapter_id': audit_chapter_id, **window})
+    admin.post(f'/admin/add_question_to_quiz/{audit_quiz_id}',
+               data={'questions': [audit_question_id, imported_question_id]})
+    admin.post(f'/admin/toggle_quiz_status/{audit_quiz_id}')  # New quizzes start inactive
+
+    admin.post('/admin/users/add', data={'email': 'audit-added@example.com', 'password': 'bench',
+                                         'full_name': 'Audit Added', 'qualification': '', 'dob': '2001-02-03'})
+    with app.app_context():
+        audit_user_id = _first_id(User, email='audit-added@example.com')
+    admin.post(f'/admin/users/edit/{audit_user_id}', data={'email': 'audit-added@example.com', 'full_name': 'Audit',
+                                                         'qualification': 'MSc', 'dob': '', 'password': ''})
+    return admin, (audit_subject_id, audit_chapter_id, other_chapter_id, audit_question_id, audit_quiz_id, audit_user_id)
+
+
+def exercise_deletes(admin, quiz_id, audit_ids, user_id):
+    audit_subject_id, audit_chapter_id, other_chapter_id, audit_question_id, audit_quiz_id, audit_user_id = audit_ids
+    admin.post(f'/admin/delete_question/{audit_question_id}')
+    admin.post(f'/admin/delete_quiz/{audit_quiz_id}')
+    admin.post(f'/admin/delete_chapter/{audit_chapter_id}')
+    admin.post(f'/admin/delete_subject/{audit_subject_id}')
+    admin.post(f'/admin/users/delete/{audit_user_id}')
+    admin.post(f'/admin/users/delete/{user_id}')  # The candidate, with their attempts, answers and scores
+    admin.post(f'/admin/delete_quiz/{quiz_id}')
+
+
+def main():
+    app = make_app()
+    with app.app_context():
+        from models.user import User
+        user_email, admin_email = seed_catalog(3, 3, 2)
+        quiz_id, question_ids, _ = seed_quiz(20, 0)
+        user_id = _first_id(User, email=user_email)
+        engine = db.engine
+
+    exercised, failures = set(), []
+
+    def record(sender, response, **extra):
+        if request.url_rule is not None:
+            exercised.add(request.url_rule.endpoint)
+            if response.status_code >= 500:
+                failures.append(f"{request.method} {request.path} -> {response.status_code}")
+
+    request_finished.connect(record, app)
+    with capture_statements(engine) as captured:
+        admin, audit_ids = exercise_admin_routes(app, quiz_id, admin_email)
+        with app.app_context():
+            from models.quiz import quiz_questions
+            api_quiz_id = audit_ids[4]
+            api_question_ids = db.session.scalars(
+                db.select(quiz_questions.c.question_id).where(quiz_questions.c.quiz_id == api_quiz_id)).all()
+        exercise_candidate_routes(app, quiz_id, question_ids, api_quiz_id, api_question_ids, user_email)
+        exercise_deletes(admin, quiz_id, audit_ids, user_id)
+
+    missed = sorted({rule.endpoint for rule in app.url_map.iter_rules()} - exercised - {'static'})
+    violations = find_table_scans(engine, captured, lambda statement, table: table in ALLOWED_SCANS)
+    print(f"explained {len(captured)} distinct statements from {len(exercised)} routes, "
+          f"{len(violations)} full table scans")
+    for statement, table, plan in violations:
+        print(f"\nSCAN {table}:\n  {' '.join(statement.split())}")
+        for detail in plan:
+            print(f"    {detail}")
+    for endpoint in missed:
+        print(f"not exercised: {endpoint}")
+    for failure in failures:
+        print(f"server error: {failure}")
+    return 1 if violations or missed or failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# JSON API benchmark: requests and bytes for one candidate taking a quiz through the HTML pages
+# vs through /api/v1, plus the cost of revalidating the paper and of encoding it.
+#   python benchmarks/bench_api.py [num_questions] [repeats]
+import json
+import sys
+import time
+
+import orjson
+
+from common import make_app, seed_quiz, percentile
+
+HEADERS = {'Accept-Encoding': 'gzip'}
+
+
+def take_quiz_html(client, quiz_id, question_ids):
+    replies = [client.get('/dashboard'), client.get(f'/quiz/{quiz_id}/attempt')]
+    replies.append(client.post(f'/quiz/{quiz_id}/attempt', data={str(qid): 'A' for qid in question_ids}))
+    replies.append(client.get(replies[-1].headers['Location']))
+    return replies
+
+
+def take_quiz_api(client, quiz_id, question_ids):
+    replies = [client.get('/api/v1/quizzes', headers=HEADERS), client.get(f'/api/v1/quizzes/{quiz_id}/paper', headers=HEADERS)]
+    replies.append(client.post(f'/api/v1/quizzes/{quiz_id}/submission', headers=HEADERS,
+                               json={'answers': {str(qid): 'A' for qid in question_ids}}))
+    return replies
+
+
+def login(app, email):
+    client = app.test_client()
+    response = client.post('/user-login', data={'email': email, 'password': 'bench'})
+    assert response.status_code == 302, f"login failed for {email}"
+    return client
+
+
+def main(num_questions=50, repeats=200):
+    from extensions import db
+    from models.user import User
+    from services.quiz_paper import get_paper
+
+    app = make_app(QUIZ_SHUFFLE=False, PASSWORD_HASH_WORKERS=0)
+    with app.app_context():
+        quiz_id, question_ids, _ = seed_quiz(num_questions, 0)
+        for email in ('html@example.com', 'api@example.com', 'paper@example.com'):
+            user = User(email=email, full_name='Bench')
+            user.set_password('bench')
+            db.session.add(user)
+        db.session.commit()
+
+    print(f"{num_questions} questions")
+    for label, take_quiz, email in (('HTML pages', take_quiz_html, 'html@example.com'),
+                                    ('JSON API', take_quiz_api, 'api@example.com')):
+        replies = take_quiz(login(app, email), quiz_id, question_ids)
+        assert all(reply.status_code < 400 for reply in replies), [reply.status_code for reply in replies]
+        print(f"{label:<12}: {len(replies)} requests, {sum(len(reply.data) for reply in replies):7d} bytes")
+
+    # Re-fetching the paper: without If-None-Match the gzipped body, with a matching ETag a bodiless 304
+    client = login(app, 'paper@example.com')
+    etag = client.get(f'/api/v1/quizzes/{quiz_id}/paper').headers['ETag']
+    for label, headers in (('paper 200', HEADERS), ('paper 304', {**HEADERS, 'If-None-Match': etag})):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            reply = client.get(f'/api/v1/quizzes/{quiz_id}/paper', headers=headers)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{label:<12}: p50 {percentile(timings, 50):5.2f} ms, p99 {percentile(timings, 99):5.2f} ms, "
+              f"{len(reply.data)} bytes")
+
+    with app.test_request_context():
+        payload = get_paper(quiz_id, 1).payload
+    for label, encode in (('json', lambda: json.dumps(payload, separators=(',', ':')).encode()),
+                          ('orjson', lambda: orjson.dumps(payload))):
+        start = time.perf_counter()
+        for _ in range(repeats * 10):
+            encode()
+        print(f"{label:<12}: {(time.perf_counter() - start) / (repeats * 10) * 1e6:6.1f} us per paper")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
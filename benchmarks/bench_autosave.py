@@ -0,0 +1,78 @@
+# Autosave benchmark: the write burst when every candidate submits at the deadline,
+# with and without their answers autosaved beforehand.
+#   python benchmarks/bench_autosave.py [num_candidates] [num_questions]
+import random
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from common import make_app, seed_quiz
+from extensions import db
+
+
+# Rows written to quiz_answer, counting every parameter set of an executemany
+class AnswerWrites:
+    def __init__(self):
+        self.rows = 0
+        self.statements = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if 'quiz_answer' in statement and not statement.lstrip().upper().startswith('SELECT'):
+            self.statements += 1
+            self.rows += len(parameters) if executemany else 1
+
+
+def run(autosave, num_candidates, num_questions):
+    from models.quiz import QuizAttempt
+    from services.autosave import autosave_buffer
+    from services.grading import grade_submitted_attempts
+
+    app = make_app()
+    with app.app_context():
+        quiz_id, question_ids, user_ids = seed_quiz(num_questions, num_candidates)
+        now = datetime.utcnow()
+        attempts = [QuizAttempt(user_id=user_id, quiz_id=quiz_id, started_at=now) for user_id in user_ids]
+        db.session.add_all(attempts)
+        db.session.commit()
+        attempt_ids = db.session.scalars(db.select(QuizAttempt.id).order_by(QuizAttempt.id)).all()
+
+        rng = random.Random(42)
+        forms = {attempt_id: {str(qid): rng.choice('ABCD') for qid in question_ids} for attempt_id in attempt_ids}
+
+        flush_ms = 0.0
+        if autosave:
+            # Candidates answer over the course of the quiz; the flusher writes every few seconds
+            for round_start in range(0, num_questions, 10):
+                for attempt_id, form in forms.items():
+                    autosave_buffer.add(attempt_id, {int(qid): form[qid] for qid in list(form)[round_start:round_start + 10]})
+                start = time.perf_counter()
+                autosave_buffer.flush()
+                flush_ms += (time.perf_counter() - start) * 1000
+            # A few candidates change their mind in the last seconds
+            for attempt_id, form in list(forms.items())[::10]:
+                form[str(question_ids[0])] = 'ABCD'['ABCD'.index(form[str(question_ids[0])]) - 1]
+
+        writes = AnswerWrites()
+        event.listen(db.engine, 'before_cursor_execute', writes)
+        start = time.perf_counter()
+        for offset in range(0, num_candidates, 50):  # Batches of 50, as the submission workers grade them
+            batch = [(attempt_id, forms[attempt_id]) for attempt_id in attempt_ids[offset:offset + 50]]
+            grade_submitted_attempts(batch)
+        burst_ms = (time.perf_counter() - start) * 1000
+        event.remove(db.engine, 'before_cursor_execute', writes)
+        return burst_ms, writes, flush_ms
+
+
+def main(num_candidates=2000, num_questions=50):
+    print(f"candidates x questions : {num_candidates:,} x {num_questions}")
+    for autosave in (False, True):
+        burst_ms, writes, flush_ms = run(autosave, num_candidates, num_questions)
+        label = 'with autosave   ' if autosave else 'without autosave'
+        print(f"{label} : deadline burst {burst_ms:,.0f} ms, {writes.rows:,} answer rows in "
+              f"{writes.statements} statements" + (f" (earlier flushes: {flush_ms:,.0f} ms)" if autosave else ''))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,71 @@
+# Concurrent writers benchmark: worker processes submitting quizzes while other processes keep
+# reading, like a multi-worker deploy, under each database profile (services/db_profile.py).
+#   python benchmarks/bench_concurrent_writers.py [num_writers] [num_readers] [seconds]
+import multiprocessing
+import random
+import sys
+import time
+
+from common import make_app, percentile, seed_quiz
+from extensions import db
+
+
+def _worker(args):
+    from sqlalchemy.exc import OperationalError
+    from app import create_app
+    from models.score import Score
+    from services.grading import submit_attempt
+
+    config, role, index, num_writers, quiz_id, question_ids, user_ids, seconds = args
+    app = create_app(config)
+    timings, errors = [], []
+    deadline = time.perf_counter() + seconds
+    rng = random.Random(index)
+    with app.app_context():
+        users = iter(user_ids[index::num_writers])
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if role == 'writer':
+                    submit_attempt(quiz_id, next(users), {str(qid): rng.choice('ABCD') for qid in question_ids})
+                else:
+                    db.session.execute(db.select(Score.user_id, Score.total_score)
+                                       .where(Score.quiz_id == quiz_id).order_by(Score.id.desc()).limit(20)).all()
+                timings.append((time.perf_counter() - start) * 1000)
+            except OperationalError as e:  # "database is locked"
+                db.session.rollback()
+                errors.append(str(e.orig))
+            db.session.remove()
+    return role, timings, errors
+
+
+def run(profile, num_writers, num_readers, seconds, num_questions=50):
+    app = make_app(DB_PROFILE=profile)
+    with app.app_context():
+        quiz_id, question_ids, user_ids = seed_quiz(num_questions, num_writers * 5000)
+    config = {key: app.config[key] for key in ('SQLALCHEMY_DATABASE_URI', 'SCHEDULER_ENABLED',
+                                               'AUTOSAVE_FLUSH_INTERVAL', 'DB_PROFILE')}
+
+    jobs = [(config, 'writer', i, num_writers, quiz_id, question_ids, user_ids, seconds) for i in range(num_writers)]
+    jobs += [(config, 'reader', i, num_writers, quiz_id, question_ids, user_ids, seconds) for i in range(num_readers)]
+    with multiprocessing.get_context('fork').Pool(len(jobs)) as pool:
+        results = pool.map(_worker, jobs)
+
+    writes = [ms for role, timings, _ in results if role == 'writer' for ms in timings]
+    reads = [ms for role, timings, _ in results if role == 'reader' for ms in timings]
+    errors = [error for _, _, role_errors in results for error in role_errors]
+    return writes, reads, errors
+
+
+def main(num_writers=4, num_readers=4, seconds=5):
+    print(f"{num_writers} writer processes, {num_readers} reader processes, {seconds} s per profile")
+    for profile in ('default', 'production'):
+        writes, reads, errors = run(profile, num_writers, num_readers, seconds)
+        print(f"{profile:<10}: {len(writes) / seconds:7.1f} submissions/s "
+              f"(p50 {percentile(writes, 50):6.1f} ms, p99 {percentile(writes, 99):7.1f} ms), "
+              f"{len(reads) / seconds:8.1f} reads/s (p99 {percentile(reads, 99):6.1f} ms), "
+              f"{len(errors)} locked errors")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
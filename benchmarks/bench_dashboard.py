@@ -0,0 +1,54 @@
+# Dashboard benchmark: a user with many scores reloading the dashboard, with the per-user summary
+# rebuilt on every view (DASHBOARD_CACHE_TTL=0) vs served from the cache.
+#   python benchmarks/bench_dashboard.py [num_quizzes] [reloads]
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import make_app, percentile, count_queries
+from extensions import db
+
+
+def seed(num_quizzes):
+    from models.quiz import Subject, Chapter, Quiz
+    from models.score import Score
+    from models.user import User
+
+    now = datetime.utcnow()
+    subject = Subject(name='Bench Subject')
+    chapter = Chapter(name='Bench Chapter', number=1, subject=subject)
+    quizzes = [Quiz(name=f'Quiz {i}', chapter=chapter, start_time=now - timedelta(hours=1),
+                    end_time=now + timedelta(hours=1), duration=30, max_marks=10, active=True)
+               for i in range(num_quizzes)]
+    user = User(email='dashboard@example.com', full_name='Bench')
+    user.set_password('bench')
+    db.session.add_all([subject, chapter, *quizzes, user])
+    db.session.flush()
+    db.session.add_all([Score(quiz_id=quiz.id, user_id=user.id, total_score=i % 11,
+                              attempted_at=now - timedelta(minutes=i)) for i, quiz in enumerate(quizzes)])
+    db.session.commit()
+
+
+def main(num_quizzes=200, reloads=200):
+    print(f"{num_quizzes} quizzes, all attempted, {reloads} reloads")
+    for label, ttl in (('rebuilt per view', 0), ('cached summary', 60)):
+        app = make_app(DASHBOARD_CACHE_TTL=ttl, PASSWORD_HASH_WORKERS=0)
+        with app.app_context():
+            seed(num_quizzes)
+            engine = db.engine
+        client = app.test_client()
+        assert client.post('/user-login', data={'email': 'dashboard@example.com', 'password': 'bench'}).status_code == 302
+        client.get('/dashboard')
+
+        timings = []
+        with count_queries(engine) as statements:
+            for _ in range(reloads):
+                start = time.perf_counter()
+                assert client.get('/dashboard').status_code == 200
+                timings.append((time.perf_counter() - start) * 1000)
+        print(f"{label:<18}: p50 {percentile(timings, 50):6.2f} ms, p99 {percentile(timings, 99):6.2f} ms, "
+              f"{len(statements) / reloads:.1f} queries per view")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,62 @@
+# Export benchmark: stream the answers of a quiz at two sizes and compare throughput and peak memory.
+# Peak memory should stay roughly the same when the row count grows.
+#   python benchmarks/bench_export.py [num_users] [num_questions]
+import sys
+import time
+import tracemalloc
+
+from common import make_app, seed_quiz
+from extensions import db
+
+
+def seed_answers(quiz_id, question_ids, user_ids):
+    from sqlalchemy import insert
+    from models.quiz import QuizAttempt, QuizAnswer
+    from datetime import datetime
+
+    now = datetime.utcnow()
+    db.session.execute(insert(QuizAttempt), [
+        {'user_id': user_id, 'quiz_id': quiz_id, 'started_at': now, 'submitted_at': now} for user_id in user_ids
+    ])
+    attempt_ids = db.session.scalars(db.select(QuizAttempt.id).where(QuizAttempt.quiz_id == quiz_id)).all()
+    for attempt_id in attempt_ids:
+        db.session.execute(insert(QuizAnswer), [
+            {'attempt_id': attempt_id, 'question_id': question_id, 'selected_option': 'A', 'is_correct': True}
+            for question_id in question_ids
+        ])
+    db.session.commit()
+
+
+def measure(stmt, fmt):
+    from services.export import iter_export
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = size = 0
+    for chunk in iter_export(stmt, fmt):
+        size += len(chunk)
+        rows += chunk.count(b'\n')
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows, size, elapsed, peak
+
+
+def main(num_users=2000, num_questions=100):
+    from services.export import build_query
+
+    app = make_app()
+    with app.app_context():
+        quiz_id, question_ids, user_ids = seed_quiz(num_questions, num_users)
+        seed_answers(quiz_id, question_ids, user_ids)
+
+        for label, users in (('10%', user_ids[:len(user_ids) // 10]), ('100%', user_ids)):
+            from models.quiz import QuizAttempt
+            stmt = build_query('answers', quiz_id=quiz_id).where(QuizAttempt.user_id.in_(users))
+            for fmt in ('csv', 'jsonl'):
+                rows, size, elapsed, peak = measure(stmt, fmt)
+                print(f"{label:>4} {fmt:<5}: {rows:>9,} lines  {size / 1e6:7.1f} MB  "
+                      f"{rows / elapsed:>9,.0f} rows/s  peak {peak / 1e6:5.1f} MB")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,38 @@
+# Grading benchmark: query count and latency of one submission to a 100-question quiz.
+#   python benchmarks/bench_grading.py [num_questions] [num_submissions]
+import random
+import sys
+import time
+
+from common import make_app, count_queries, percentile, seed_quiz
+from extensions import db
+from services.grading import submit_attempt
+
+
+def main(num_questions=100, num_submissions=200):
+    app = make_app()
+    with app.app_context():
+        quiz_id, question_ids, user_ids = seed_quiz(num_questions, num_submissions)
+        rng = random.Random(42)
+        timings, query_counts = [], []
+
+        for user_id in user_ids:
+            form = {'quiz_id': str(quiz_id)}
+            form.update({str(qid): rng.choice('ABCD') for qid in question_ids})
+            db.session.expunge_all()
+
+            with count_queries() as statements:
+                start = time.perf_counter()
+                submit_attempt(quiz_id, user_id, form)
+                timings.append((time.perf_counter() - start) * 1000)
+            query_counts.append(len(statements))
+
+    print(f"questions per quiz : {num_questions}")
+    print(f"submissions        : {num_submissions}")
+    print(f"queries/submission : {max(query_counts)} (max), {min(query_counts)} (min)")
+    print(f"latency p50        : {percentile(timings, 50):.2f} ms")
+    print(f"latency p99        : {percentile(timings, 99):.2f} ms")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,59 @@
+# Question import benchmark: stream a generated CSV / JSONL file into an empty chapter, then re-import it
+# (every row a duplicate) and report rows per second for both passes.
+#   python benchmarks/bench_import.py [num_rows] [batch_size]
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+
+from common import make_app
+from extensions import db
+
+
+def write_files(directory, num_rows):
+    rows = [
+        {'question_text': f'Imported question {i}', 'option_a': 'Alpha', 'option_b': 'Beta',
+         'option_c': 'Gamma', 'option_d': 'Delta', 'correct_option': 'ABCD'[i % 4]}
+        for i in range(num_rows)
+    ]
+    csv_path, jsonl_path = os.path.join(directory, 'questions.csv'), os.path.join(directory, 'questions.jsonl')
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(jsonl_path, 'w') as f:
+        f.writelines(json.dumps(row) + '\n' for row in rows)
+    return csv_path, jsonl_path
+
+
+def timed_import(path, fmt, chapter_id, batch_size):
+    from services.question_import import import_questions
+    start = time.perf_counter()
+    with open(path, newline='') as stream:
+        report = import_questions(stream, fmt=fmt, chapter_id=chapter_id, batch_size=batch_size)
+    return report, time.perf_counter() - start
+
+
+def main(num_rows=50_000, batch_size=1000):
+    from models.quiz import Subject, Chapter
+
+    app = make_app()
+    csv_path, jsonl_path = write_files(tempfile.mkdtemp(prefix='quiz-import-'), num_rows)
+    with app.app_context():
+        subject = Subject(name='Import Subject')
+        chapters = [Chapter(name=f'Import {fmt}', number=n, subject=subject) for n, fmt in enumerate(('csv', 'jsonl'), 1)]
+        db.session.add_all([subject, *chapters])
+        db.session.commit()
+
+        print(f"rows        : {num_rows:,} per file, batch size {batch_size}")
+        for (fmt, path), chapter in zip((('csv', csv_path), ('jsonl', jsonl_path)), chapters):
+            for label in ('fresh', 'duplicates'):
+                report, elapsed = timed_import(path, fmt, chapter.id, batch_size)
+                print(f"{fmt:<5} {label:<10}: {report.rows / elapsed:>10,.0f} rows/s   "
+                      f"({report.inserted:,} imported, {report.duplicates:,} duplicates, {report.error_count} errors)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,44 @@
+# Leaderboard benchmark: build a ranking from 1M scores, then time top-N, rank, percentile and updates.
+#   python benchmarks/bench_leaderboard.py [num_scores] [max_score]
+import random
+import sys
+import time
+
+from common import percentile
+from services.leaderboard import Ranking
+
+
+def timed(fn, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def main(num_scores=1_000_000, max_score=100):
+    rng = random.Random(7)
+    scores = [(user_id, rng.randint(0, max_score)) for user_id in range(num_scores)]
+
+    start = time.perf_counter()
+    ranking = Ranking(scores)
+    build_s = time.perf_counter() - start
+
+    users = [(rng.randrange(num_scores),) for _ in range(10_000)]
+    results = {
+        'rank(user)': timed(ranking.rank, users),
+        'percentile(user)': timed(ranking.percentile, users),
+        'top(10)': timed(ranking.top, [(10,)] * 1_000),
+        'top(100)': timed(ranking.top, [(100,)] * 1_000),
+        'set(user, score)': timed(ranking.set, [(u, rng.randint(0, max_score)) for (u,) in users]),
+    }
+
+    print(f"scores      : {num_scores:,} (0..{max_score})")
+    print(f"build       : {build_s:.2f} s")
+    for name, samples in results.items():
+        print(f"{name:<18}: p50 {percentile(samples, 50):7.1f} us   p99 {percentile(samples, 99):7.1f} us")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,72 @@
+# Login storm benchmark: many candidates logging in at once, with password hashing on the request
+# threads vs in the worker processes of services/passwords.py, plus the one-off cost of upgrading
+# hashes made with older parameters.
+#   python benchmarks/bench_login.py [num_logins] [concurrency] [method]
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import make_app, percentile
+from extensions import db
+
+PASSWORD = 'bench'
+
+
+def seed(num_users, method):
+    from werkzeug.security import generate_password_hash
+    from models.user import User
+
+    password_hash = generate_password_hash(PASSWORD, method)
+    db.session.execute(db.insert(User), [
+        {'email': f'login{i}@example.com', 'full_name': f'Login {i}', 'password_hash': password_hash}
+        for i in range(num_users)
+    ])
+    db.session.commit()
+
+
+def storm(app, num_logins, concurrency):
+    def login(i):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post('/user-login', data={'email': f'login{i}@example.com', 'password': PASSWORD})
+        assert response.status_code == 302, f"login failed for login{i}@example.com"
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        timings = list(pool.map(login, range(num_logins)))
+    return timings, time.perf_counter() - start
+
+
+def run(num_logins, concurrency, method, workers, seeded_method=None):
+    from models.user import User
+    from services import passwords
+
+    app = make_app(PASSWORD_HASH_METHOD=method, PASSWORD_HASH_WORKERS=workers)
+    with app.app_context():
+        seed(num_logins, seeded_method or method)
+    timings, elapsed = storm(app, num_logins, concurrency)
+    with app.app_context():
+        stale = sum(passwords.needs_rehash(h) for h in db.session.scalars(db.select(User.password_hash)))
+    return timings, elapsed, stale
+
+
+def main(num_logins=200, concurrency=16, method='scrypt:32768:8:1'):
+    cores = os.cpu_count() or 1
+    print(f"{num_logins} logins, {concurrency} concurrent, {method}, {cores} cores")
+    cases = [
+        ('inline', 0, None),
+        ('process pool', cores, None),
+        ('upgrade from pbkdf2', cores, 'pbkdf2:sha256:600000'),  # Every login re-hashes once
+    ]
+    for label, workers, seeded_method in cases:
+        timings, elapsed, stale = run(num_logins, concurrency, method, workers, seeded_method)
+        rate = num_logins / elapsed
+        print(f"{label:<20}: {rate:7.1f} logins/s ({rate / min(cores, concurrency):6.1f} per core), "
+              f"p50 {percentile(timings, 50):7.1f} ms, p99 {percentile(timings, 99):7.1f} ms, "
+              f"{stale} hashes left to upgrade")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]), *sys.argv[3:4])
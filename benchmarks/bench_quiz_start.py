@@ -0,0 +1,49 @@
+# Quiz start benchmark: many candidates open the same quiz. Reports queries and latency per start
+# (the question paper comes from the per-version cache) and the cost of revalidating the paper by ETag.
+#   python benchmarks/bench_quiz_start.py [num_candidates] [num_questions]
+import sys
+import time
+
+from common import make_app, count_queries, percentile, seed_quiz
+
+
+def as_user(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+        session['user_type'] = 'user'
+    return client
+
+
+def main(num_candidates=10_000, num_questions=50):
+    app = make_app()
+    with app.app_context():
+        quiz_id, _, user_ids = seed_quiz(num_questions, num_candidates)
+
+    client = app.test_client()
+    timings, query_counts = [], []
+    for user_id in user_ids:
+        as_user(client, user_id)
+        with app.app_context(), count_queries() as statements:
+            start = time.perf_counter()
+            response = client.get(f'/quiz/{quiz_id}/attempt')
+            timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+        query_counts.append(len(statements))
+
+    paper = client.get(f'/quiz/{quiz_id}/paper')
+    revalidations = []
+    for _ in range(1000):
+        start = time.perf_counter()
+        response = client.get(f'/quiz/{quiz_id}/paper', headers={'If-None-Match': paper.headers['ETag']})
+        revalidations.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 304
+
+    print(f"candidates       : {num_candidates:,}, {num_questions} questions")
+    print(f"queries/start    : {max(query_counts)} (max), {sorted(query_counts)[len(query_counts) // 2]} (median)")
+    print(f"start latency    : p50 {percentile(timings, 50):.2f} ms   p99 {percentile(timings, 99):.2f} ms")
+    print(f"paper            : {len(paper.data):,} bytes; 304 revalidation p50 {percentile(revalidations, 50):.2f} ms")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,86 @@
+# Sweeper benchmark: close a large number of expired attempts in one sweep.
+# Also reports the longest write transaction, which is how long other writers can wait on the lock.
+#   python benchmarks/bench_sweeper.py [num_attempts] [num_quizzes]
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from common import make_app
+from extensions import db
+
+
+def seed(num_attempts, num_quizzes):
+    from sqlalchemy import insert
+    from models.quiz import Subject, Chapter, Quiz, QuizAttempt
+    from models.user import User
+
+    now = datetime.utcnow()
+    subject = Subject(name='Sweep Subject')
+    chapter = Chapter(name='Sweep Chapter', number=1, subject=subject)
+    quizzes = [Quiz(name=f'Sweep {i}', chapter=chapter, start_time=now - timedelta(hours=2),
+                    end_time=now + timedelta(hours=2), duration=30, max_marks=10, active=True)
+               for i in range(num_quizzes)]
+    db.session.add_all([subject, chapter, *quizzes])
+    db.session.commit()
+
+    users_per_quiz = num_attempts // num_quizzes
+    db.session.execute(insert(User), [
+        {'email': f'sweep{i}@example.com', 'full_name': 'Sweep', 'password_hash': 'x'} for i in range(users_per_quiz)
+    ])
+    user_ids = db.session.scalars(db.select(User.id)).all()
+    # Half of the attempts ran out of time, the other half are still running
+    db.session.execute(insert(QuizAttempt), [
+        {'user_id': user_id, 'quiz_id': quiz.id, 'started_at': now - timedelta(minutes=45 if i % 2 else 5)}
+        for quiz in quizzes for i, user_id in enumerate(user_ids)
+    ])
+    db.session.commit()
+
+
+# Longest time from a transaction's first write to its commit, in seconds
+@contextmanager
+def longest_write_transaction(engine):
+    holds, first_write = [0.0], {}
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if conn not in first_write and not statement.lstrip().upper().startswith('SELECT'):
+            first_write[conn] = time.perf_counter()
+
+    def end(conn):
+        started = first_write.pop(conn, None)
+        if started is not None:
+            holds[0] = max(holds[0], time.perf_counter() - started)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'commit', end)
+    event.listen(engine, 'rollback', end)
+    try:
+        yield holds
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+        event.remove(engine, 'commit', end)
+        event.remove(engine, 'rollback', end)
+
+
+def main(num_attempts=100_000, num_quizzes=20):
+    from services.attempt_timer import sweep_expired_attempts, sweep_counters
+
+    app = make_app()
+    with app.app_context():
+        seed(num_attempts, num_quizzes)
+        with longest_write_transaction(db.engine) as holds:
+            start = time.perf_counter()
+            closed = sweep_expired_attempts()
+            elapsed = time.perf_counter() - start
+        idle = sweep_expired_attempts()
+
+        print(f"open attempts : {num_attempts:,} across {num_quizzes} quizzes")
+        print(f"sweep         : closed {closed:,} in {elapsed * 1000:.0f} ms ({closed / elapsed:,.0f} attempts/s)")
+        print(f"longest lock  : {holds[0] * 1000:.0f} ms (one chunk's writes)")
+        print(f"idle sweep    : closed {idle} in {sweep_counters.last_duration_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,35 @@
+# Checks that listing pages emit a constant number of SQL statements however big the catalog is.
+#   python benchmarks/check_query_budgets.py [num_subjects] [chapters_per_subject] [quizzes_per_chapter]
+import sys
+
+from common import make_app, seed_catalog, login
+from services.query_counter import check_route_budgets
+
+# Budgets include the load_user lookup that every authenticated request makes
+USER_BUDGETS = {
+    '/dashboard': 3,
+    '/available-quizzes': 1,
+    '/api/v1/quizzes': 1,
+}
+ADMIN_BUDGETS = {
+    '/admin/manage_quizzes': 4,
+}
+
+
+def main(num_subjects=20, chapters_per_subject=10, quizzes_per_chapter=5):
+    app = make_app()
+    with app.app_context():
+        user_email, admin_email = seed_catalog(num_subjects, chapters_per_subject, quizzes_per_chapter)
+
+    used = {}
+    used.update(check_route_budgets(app, login(app.test_client(), '/user-login', user_email), USER_BUDGETS))
+    used.update(check_route_budgets(app, login(app.test_client(), '/admin-login', admin_email), ADMIN_BUDGETS))
+
+    print(f"catalog: {num_subjects * chapters_per_subject * quizzes_per_chapter} quizzes")
+    budgets = {**USER_BUDGETS, **ADMIN_BUDGETS}
+    for url, count in used.items():
+        print(f"  {url:<28} {count:>3} queries (budget {budgets[url]})")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,86 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from services.query_counter import count_queries  # noqa: F401  Re-exported for the benchmark scripts
+
+
+# ✅ App bound to a throwaway SQLite file so benchmarks never touch quiz.db
+def make_app(**config):
+    path = os.path.join(tempfile.mkdtemp(prefix='quiz-bench-'), 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SCHEDULER_ENABLED': False,
+                      'AUTOSAVE_FLUSH_INTERVAL': None, 'SESSION_STORE_PATH': f'{path[:-3]}-sessions.db', **config})
+    with app.app_context():
+        import models  # noqa: F401  Registers every table on db.metadata
+        from models.quiz import QuizAttempt, QuizAnswer  # noqa: F401
+        db.create_all()
+    return app
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ✅ One subject / chapter / active quiz with `num_questions` questions
+def seed_quiz(num_questions, num_users):
+    from models.quiz import Subject, Chapter, Quiz, Question
+    from models.user import User
+
+    subject = Subject(name='Bench Subject')
+    chapter = Chapter(name='Bench Chapter', number=1, subject=subject)
+    questions = [
+        Question(chapter=chapter, question_text=f'Question {i}', option_a='A', option_b='B',
+                 option_c='C', option_d='D', correct_option='ABCD'[i % 4])
+        for i in range(num_questions)
+    ]
+    now = datetime.utcnow()
+    quiz = Quiz(name='Bench Quiz', chapter=chapter, start_time=now - timedelta(hours=1),
+                end_time=now + timedelta(hours=1), duration=60, max_marks=num_questions,
+                active=True, questions=questions)
+    users = [User(email=f'bench{i}@example.com', full_name=f'Bench {i}', password_hash='x')
+             for i in range(num_users)]
+    db.session.add_all([subject, chapter, quiz, *questions, *users])
+    db.session.commit()
+    return quiz.id, [q.id for q in questions], [u.id for u in users]
+
+
+# ✅ Catalog of subjects -> chapters -> quizzes, plus one user and one admin who can log in
+def seed_catalog(num_subjects, chapters_per_subject, quizzes_per_chapter, password='bench'):
+    from models.quiz import Subject, Chapter, Quiz
+    from models.user import User
+    from models.admin import Admin
+
+    now = datetime.utcnow()
+    for s in range(num_subjects):
+        subject = Subject(name=f'Subject {s}')
+        db.session.add(subject)
+        for c in range(chapters_per_subject):
+            chapter = Chapter(name=f'Chapter {s}.{c}', number=c + 1, subject=subject)
+            db.session.add(chapter)
+            for q in range(quizzes_per_chapter):
+                db.session.add(Quiz(name=f'Quiz {s}.{c}.{q}', chapter=chapter, start_time=now,
+                                    end_time=now + timedelta(hours=1), duration=30, max_marks=10,
+                                    active=True))
+
+    user = User(email='bench-user@example.com', full_name='Bench User')
+    user.set_password(password)
+    admin = Admin(email='bench-admin@example.com')
+    admin.set_password(password)
+    db.session.add_all([user, admin])
+    db.session.commit()
+    return user.email, admin.email
+
+
+def login(client, endpoint, email, password='bench'):
+    response = client.post(endpoint, data={'email': email, 'password': password})
+    assert response.status_code == 302, f"login failed for {email}"
+    return client
@@ -0,0 +1,361 @@
+# Exam-day load test. Seeds a synthetic catalog (subjects, chapters, questions, quizzes, users and past
+# scores), then replays an exam through the real app: candidates log in, open the dashboard, start the exam,
+# autosave a few answers, all submit at the deadline and open their result, while admins browse the listings.
+# Reports throughput, latency percentiles and SQL statements per route and saves them as JSON, so a run can
+# be compared with an earlier one (exits 1 when a route regressed).
+#   python benchmarks/load_test.py --scale small --candidates 200 --concurrency 16
+#   python benchmarks/load_test.py --wsgi --output results/today.json --compare results/yesterday.json
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from flask import g
+from sqlalchemy import insert
+
+from common import make_app, percentile
+from extensions import db
+
+PASSWORD = 'load-test'
+
+# subjects, chapters per subject, questions per chapter, quizzes per chapter, users, past scores
+SCALES = {
+    'small': (5, 4, 20, 1, 500, 5_000),
+    'medium': (20, 5, 50, 2, 5_000, 100_000),
+    'large': (50, 10, 100, 2, 50_000, 1_000_000),
+}
+
+Reply = namedtuple('Reply', 'status location sql')
+
+
+# ✅ Synthetic data with bulk INSERTs; returns the ids the scenario needs
+def seed(scale, exam_questions, rng):
+    from models.admin import Admin
+    from models.quiz import Subject, Chapter, Quiz, Question, quiz_questions
+    from models.score import Score
+    from models.user import User
+    from services import passwords, stats
+
+    num_subjects, chapters_per, questions_per, quizzes_per, num_users, num_scores = SCALES[scale]
+    now = datetime.utcnow()
+    password_hash = passwords.hash_password(PASSWORD)  # One hash shared by every synthetic account
+
+    def ids(model):
+        return db.session.scalars(db.select(model.id).order_by(model.id)).all()
+
+    db.session.execute(insert(Subject), [{'name': f'Subject {s}'} for s in range(num_subjects)])
+    db.session.execute(insert(Chapter), [
+        {'name': f'Chapter {s}.{c}', 'number': c + 1, 'subject_id': subject_id}
+        for s, subject_id in enumerate(ids(Subject)) for c in range(chapters_per)
+    ])
+    chapter_ids = ids(Chapter)
+    db.session.execute(insert(Question), [
+        {'chapter_id': chapter_id, 'question_text': f'Question {chapter_id}.{q}', 'option_a': 'A', 'option_b': 'B',
+         'option_c': 'C', 'option_d': 'D', 'correct_option': rng.choice('ABCD')}
+        for chapter_id in chapter_ids for q in range(questions_per)
+    ])
+    db.session.execute(insert(Quiz), [
+        {'name': f'Quiz {chapter_id}.{q}', 'chapter_id': chapter_id, 'start_time': now - timedelta(days=30),
+         'end_time': now - timedelta(days=29), 'duration': 30, 'max_marks': 10, 'active': False}
+        for chapter_id in chapter_ids for q in range(quizzes_per)
+    ])
+    questions_by_chapter = defaultdict(list)
+    for question_id, chapter_id in db.session.execute(db.select(Question.id, Question.chapter_id)):
+        questions_by_chapter[chapter_id].append(question_id)
+    past_quizzes = db.session.execute(db.select(Quiz.id, Quiz.chapter_id)).all()
+    db.session.execute(insert(quiz_questions), [
+        {'quiz_id': quiz_id, 'question_id': question_id}
+        for quiz_id, chapter_id in past_quizzes
+        for question_id in rng.sample(questions_by_chapter[chapter_id], min(10, questions_per))
+    ])
+
+    # The exam everybody takes today, in its own chapter
+    exam_chapter = Chapter(name='Exam chapter', number=chapters_per + 1, subject_id=ids(Subject)[0])
+    exam_questions = [Question(chapter=exam_chapter, question_text=f'Exam question {q}', option_a='A', option_b='B',
+                               option_c='C', option_d='D', correct_option=rng.choice('ABCD'))
+                      for q in range(exam_questions)]
+    exam = Quiz(name='Exam', chapter=exam_chapter, start_time=now - timedelta(hours=1),
+                end_time=now + timedelta(hours=3), duration=120, max_marks=len(exam_questions), active=True,
+                questions=exam_questions)
+    admin = Admin(email='load-admin@example.com', password_hash=password_hash)
+    db.session.add_all([exam_chapter, exam, admin])
+    db.session.flush()
+
+    db.session.execute(insert(User), [
+        {'email': f'candidate{u}@example.com', 'full_name': f'Candidate {u}', 'password_hash': password_hash}
+        for u in range(num_users)
+    ])
+    user_ids = ids(User)
+    quiz_ids = [quiz_id for quiz_id, _ in past_quizzes]
+    for start in range(0, num_scores, 50_000):
+        db.session.execute(insert(Score), [
+            {'quiz_id': rng.choice(quiz_ids), 'user_id': rng.choice(user_ids), 'total_score': rng.randint(0, 10),
+             'attempted_at': now - timedelta(days=rng.randint(1, 29))}
+            for _ in range(min(50_000, num_scores - start))
+        ])
+    db.session.commit()
+    stats.rebuild()
+    return {
+        'exam_id': exam.id,
+        'exam_question_ids': [q.id for q in exam_questions],
+        'emails': [f'candidate{u}@example.com' for u in range(num_users)],
+        'admin_email': admin.email,
+        'quiz_ids': quiz_ids,
+    }
+
+
+# ✅ The in-process Flask test client
+class TestClientSession:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None, json_body=None):
+        response = self.client.open(path, method=method, data=data, json=json_body)
+        response.close()
+        return Reply(response.status_code, response.headers.get('Location'),
+                     int(response.headers.get('X-SQL-Statements', 0)))
+
+
+# ✅ Real HTTP against a local WSGI server, with the session cookie kept between requests
+class HttpSession:
+    def __init__(self, host, port):
+        self.conn = http.client.HTTPConnection(host, port, timeout=120)
+        self.cookies = {}
+
+    def request(self, method, path, data=None, json_body=None):
+        headers, body = {}, None
+        if data is not None:
+            body, headers['Content-Type'] = urlencode(data), 'application/x-www-form-urlencoded'
+        elif json_body is not None:
+            body, headers['Content-Type'] = json.dumps(json_body), 'application/json'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        response.read()
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        location = response.headers.get('Location')
+        if location:
+            location = urlsplit(location)._replace(scheme='', netloc='').geturl()
+        return Reply(response.status, location, int(response.headers.get('X-SQL-Statements', 0)))
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)  # route -> [(ms, status, sql statements, expected status)]
+        self.phases = []
+
+    def call(self, session, route, method, path, expect=(200,), **kwargs):
+        start = time.perf_counter()
+        reply = session.request(method, path, **kwargs)
+        self.samples[route].append(((time.perf_counter() - start) * 1000, reply.status, reply.sql, reply.status in expect))
+        return reply
+
+    # Run `task(item)` for every item on `concurrency` threads and time the phase
+    def phase(self, name, task, items, concurrency):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(task, items))
+        elapsed = time.perf_counter() - start
+        self.phases.append({'name': name, 'seconds': round(elapsed, 3), 'items': len(items)})
+        print(f"  {name:<10} {len(items):>6} candidates in {elapsed:7.2f} s")
+
+    def summary(self):
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            timings = [ms for ms, _, _, _ in samples]
+            sql = [count for _, _, count, _ in samples]
+            routes[route] = {
+                'requests': len(samples),
+                'errors': sum(1 for *_, good in samples if not good),
+                'p50_ms': round(percentile(timings, 50), 2),
+                'p90_ms': round(percentile(timings, 90), 2),
+                'p99_ms': round(percentile(timings, 99), 2),
+                'max_ms': round(max(timings), 2),
+                'mean_sql': round(sum(sql) / len(sql), 2),
+                'max_sql': max(sql),
+            }
+        return routes
+
+
+def scenario(session_factory, ids, args, recorder):
+    rng = random.Random(args.seed)
+    exam_id, question_ids = ids['exam_id'], ids['exam_question_ids']
+    candidates = [(email, session_factory()) for email in ids['emails'][:args.candidates]]
+    results = {}
+
+    def login(candidate):
+        email, session = candidate
+        recorder.call(session, 'auth.user_login', 'POST', '/user-login', expect=(302,),
+                      data={'email': email, 'password': PASSWORD})
+        recorder.call(session, 'user.dashboard', 'GET', '/dashboard')
+
+    def start(candidate):
+        recorder.call(candidate[1], 'user.attempt_quiz GET', 'GET', f'/quiz/{exam_id}/attempt')
+
+    def answer(candidate):
+        for _ in range(args.autosaves):
+            recorder.call(candidate[1], 'user.autosave_answers', 'POST', f'/quiz/{exam_id}/autosave',
+                          json_body={str(qid): rng.choice('ABCD') for qid in rng.sample(question_ids, 5)})
+
+    def submit(candidate):
+        email, session = candidate
+        reply = recorder.call(session, 'user.attempt_quiz POST', 'POST', f'/quiz/{exam_id}/attempt', expect=(302,),
+                              data={str(qid): rng.choice('ABCD') for qid in question_ids})
+        results[email] = reply.location
+
+    def result(candidate):
+        email, session = candidate
+        if results.get(email):
+            recorder.call(session, 'user.quiz_result', 'GET', results[email])
+
+    # Admins keep browsing while the submissions land
+    burst_over = threading.Event()
+
+    def admin_browsing(_):
+        session = session_factory()
+        recorder.call(session, 'auth.admin_login', 'POST', '/admin-login', expect=(302,),
+                      data={'email': ids['admin_email'], 'password': PASSWORD})
+        pages = [('admin.dashboard', '/admin-dashboard'), ('admin.manage_quizzes', '/admin/manage_quizzes'),
+                 ('admin.manage_users', '/admin/users'), ('admin.quiz_analytics', f'/admin/quiz_analytics/{exam_id}')]
+        while not burst_over.is_set():
+            for route, path in pages:
+                recorder.call(session, route, 'GET', path)
+
+    recorder.phase('login', login, candidates, args.concurrency)
+    recorder.phase('start', start, candidates, args.concurrency)
+    recorder.phase('answer', answer, candidates, args.concurrency)
+    with ThreadPoolExecutor(max(args.admins, 1)) as admins:
+        futures = [admins.submit(admin_browsing, i) for i in range(args.admins)]
+        recorder.phase('deadline', submit, candidates, args.concurrency)
+        burst_over.set()
+        for future in futures:
+            future.result()
+    recorder.phase('result', result, candidates, args.concurrency)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# ✅ Route by route against a saved run; a regression is p99 or SQL count growing past the threshold
+def compare(baseline, current, threshold):
+    regressions = []
+    print(f"\n{'route':<28}{'p99 before':>12}{'p99 now':>10}{'change':>9}{'sql before':>12}{'sql now':>9}")
+    for route, now in current['routes'].items():
+        before = baseline['routes'].get(route)
+        if before is None:
+            continue
+        change = (now['p99_ms'] - before['p99_ms']) / before['p99_ms'] * 100 if before['p99_ms'] else 0.0
+        flag = ''
+        if change > threshold or now['max_sql'] > before['max_sql']:
+            regressions.append(route)
+            flag = '  <- regression'
+        print(f"{route:<28}{before['p99_ms']:>12.1f}{now['p99_ms']:>10.1f}{change:>8.0f}%"
+              f"{before['max_sql']:>12}{now['max_sql']:>9}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exam-day load test')
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--candidates', type=int, default=200, help='Candidates sitting the exam')
+    parser.add_argument('--exam-questions', type=int, default=50)
+    parser.add_argument('--autosaves', type=int, default=3, help='Autosave requests per candidate')
+    parser.add_argument('--admins', type=int, default=2, help='Admins browsing during the deadline burst')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--wsgi', action='store_true', help='Serve the app over HTTP instead of the test client')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='JSON results file (default: benchmarks/results/load_<scale>_<time>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=20.0, help='Allowed p99 growth in percent')
+    args = parser.parse_args()
+
+    app = make_app()
+    logging.getLogger('quiz.slow_query').setLevel(logging.ERROR)  # The per-route numbers below say the same
+
+    @app.after_request
+    def sql_count_header(response):
+        response.headers['X-SQL-Statements'] = str(g.get('metrics_sql', [0])[0])
+        return response
+
+    started = time.perf_counter()
+    with app.app_context():
+        ids = seed(args.scale, args.exam_questions, random.Random(args.seed))
+    print(f"seeded {args.scale} dataset in {time.perf_counter() - started:.1f} s")
+    args.candidates = min(args.candidates, len(ids['emails']))
+
+    server = None
+    if args.wsgi:
+        from werkzeug.serving import make_server
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        session_factory = lambda: HttpSession('127.0.0.1', server.server_port)  # noqa: E731
+    else:
+        session_factory = lambda: TestClientSession(app)  # noqa: E731
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    try:
+        scenario(session_factory, ids, args, recorder)
+    finally:
+        if server is not None:
+            server.shutdown()
+    elapsed = time.perf_counter() - started
+
+    routes = recorder.summary()
+    total = sum(route['requests'] for route in routes.values())
+    results = {
+        'started_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'seconds': round(elapsed, 3),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 1),
+        'phases': recorder.phases,
+        'routes': routes,
+    }
+
+    print(f"\n{total:,} requests in {elapsed:.1f} s ({total / elapsed:,.1f} req/s), "
+          f"{args.candidates} candidates, concurrency {args.concurrency}, {'wsgi' if args.wsgi else 'test client'}")
+    print(f"{'route':<28}{'requests':>9}{'errors':>7}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'sql avg':>9}{'sql max':>8}")
+    for route, stats in routes.items():
+        print(f"{route:<28}{stats['requests']:>9}{stats['errors']:>7}{stats['p50_ms']:>9.1f}{stats['p90_ms']:>9.1f}"
+              f"{stats['p99_ms']:>9.1f}{stats['mean_sql']:>9.1f}{stats['max_sql']:>8}")
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'results',
+        f"load_{args.scale}_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} route(s) regressed: {', '.join(regressions)}")
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import click
+
+
+def register_commands(app):
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats():
+        """Recompute the quiz and question statistics from scores and answers."""
+        from services import stats
+        stats.rebuild()
+        click.echo("quiz statistics rebuilt")
+
+    @app.cli.command('refresh-replica')
+    def refresh_replica():
+        """Copy the primary SQLite database into the snapshot read replica now."""
+        from services import read_replica
+        if not read_replica.is_snapshot(app):
+            raise click.ClickException("REPLICA_DATABASE_URL is not a SQLite snapshot replica")
+        elapsed_ms = read_replica.refresh_snapshot(app)
+        click.echo(f"replica refreshed in {elapsed_ms:.0f} ms")
+
+    @app.cli.command('purge-sessions')
+    def purge_sessions():
+        """Delete expired sessions from the server-side session store."""
+        from services import session_store
+        if session_store.session_store is None:
+            raise click.ClickException("SESSION_BACKEND is 'cookie'; there is no session store")
+        click.echo(f"{session_store.purge_expired()} expired sessions deleted")
+
+    @app.cli.command('requeue-submissions')
+    def requeue_submissions():
+        """Put dead-lettered queued submissions back in the grading queue."""
+        from services import submission_queue
+        if submission_queue.submission_queue is None:
+            raise click.ClickException("SUBMISSION_MODE is not 'queued'; there is no submission queue")
+        click.echo(f"{submission_queue.submission_queue.requeue_failed()} submission(s) requeued")
+
+    @app.cli.command('import-questions')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--chapter-id', type=int, help='Chapter for rows that have no chapter_id column.')
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+    @click.option('--batch-size', type=int, help='Rows per batch (IMPORT_BATCH_SIZE).')
+    def import_questions(path, chapter_id, fmt, batch_size):
+        """Stream questions from a CSV or JSONL file into the question bank, skipping duplicates."""
+        from services import question_import
+        with open(path, encoding='utf-8-sig', newline='') as stream:
+            report = question_import.import_questions(
+                stream,
+                fmt=fmt or question_import.detect_format(path),
+                chapter_id=chapter_id,
+                batch_size=batch_size or app.config['IMPORT_BATCH_SIZE'],
+            )
+        for line, message in report.errors:
+            click.echo(f"line {line}: {message}", err=True)
+        click.echo(report.summary())
+
+    @app.cli.command('export-results')
+    @click.argument('dataset', type=click.Choice(['scores', 'attempts', 'answers']))
+    @click.option('--output', '-o', type=click.Path(dir_okay=False), help='Defaults to stdout.')
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv')
+    @click.option('--quiz-id', type=int)
+    @click.option('--chapter-id', type=int)
+    @click.option('--subject-id', type=int)
+    @click.option('--since', help='First day to include (YYYY-MM-DD).')
+    @click.option('--until', help='Last day to include (YYYY-MM-DD).')
+    def export_results(dataset, output, fmt, quiz_id, chapter_id, subject_id, since, until):
+        """Stream scores, attempts or answers to a CSV / JSONL file for offline analysis."""
+        from services import export
+        stmt = export.build_query(dataset, quiz_id=quiz_id, chapter_id=chapter_id, subject_id=subject_id,
+                                  since=export.parse_date(since), until=export.parse_date(until, inclusive_end=True))
+        with click.open_file(output or '-', 'wb') as out:
+            for chunk in export.iter_export(stmt, fmt, yield_per=app.config['EXPORT_YIELD_PER']):
+                out.write(chunk)
@@ -1,12 +1,21 @@
-from flask import jsonify, Blueprint, render_template, request, redirect, url_for, flash
+import hmac
+from flask import jsonify, Blueprint, render_template, request, redirect, url_for, flash, current_app, Response, stream_with_context, session
 from flask_login import login_required, current_user
-from werkzeug.security import generate_password_hash
 from datetime import datetime
+from sqlalchemy import or_
 from models.admin import Admin
 from models.user import User
 from models.score import Score
 from models.quiz import Quiz, Chapter, Subject, Question, QuizAttempt, QuizAnswer
 from extensions import db, login_manager
+from services.answer_key_cache import answer_key_cache
+from services.leaderboard import leaderboards
+from services.dashboard_summary import dashboard_summaries
+from services.principal_cache import invalidate as invalidate_principal
+from services.queries import quizzes_with_subject_chapters
+from services.pagination import keyset_paginate, page_args, prefix_filter, flag_arg
+from services import deletion, stats, question_import, export, quiz_paper, metrics, passwords, session_store
+from services.read_replica import replica_reads
 from .decorators import admin_required
 
 admin_bp = Blueprint('admin', __name__)
@@ -15,6 +24,7 @@ admin_bp = Blueprint('admin', __name__)
 @admin_bp.route('/admin-dashboard')
 @login_required
 @admin_required
+@replica_reads  # Counts and recent rows can lag the primary by one replica refresh
 def dashboard():
     users = User.query.order_by(User.created_at.desc()).limit(8).all()
     total_users = User.query.count()
@@ -23,10 +33,9 @@ def dashboard():
 
     latest_quizzes = Quiz.query.order_by(Quiz.created_at.desc()).limit(5).all()
 
-    quiz_attempt_counts = {
-        quiz.id: QuizAttempt.query.filter_by(quiz_id=quiz.id).count()
-        for quiz in latest_quizzes
-    }
+    # Graded attempts come from the materialized quiz stats in one query
+    attempt_counts = stats.attempt_counts([quiz.id for quiz in latest_quizzes])
+    quiz_attempt_counts = {quiz.id: attempt_counts.get(quiz.id, 0) for quiz in latest_quizzes}
 
     return render_template(
         'admin/admin_dashboard.html',
@@ -43,7 +52,15 @@ def dashboard():
 @login_required
 @admin_required
 def manage_users():
-    return render_template('admin/manage_users.html', users=User.query.all())
+    filters = {'q': request.args.get('q', '').strip(), 'active': request.args.get('active', '')}
+    query = User.query
+    if filters['q']:
+        query = query.filter(or_(prefix_filter(User.full_name, filters['q']), prefix_filter(User.email, filters['q'])))
+    if flag_arg('active') is not None:
+        query = query.filter(User.is_active == flag_arg('active'))
+
+    users = keyset_paginate(query, User.id, **page_args())
+    return render_template('admin/manage_users.html', users=users, filters=filters)
 
 @admin_bp.route('/admin/users/add', methods=['POST'])
 @login_required
@@ -59,7 +76,7 @@ def add_user():
 
         new_user = User(
             email=email,
-            password_hash=generate_password_hash(password),
+            password_hash=passwords.hash_password(password),
             full_name=full_name,
             qualification=qualification,
             dob=datetime.strptime(dob, '%Y-%m-%d').date() if dob else None,
@@ -91,9 +108,10 @@ def edit_user(user_id):
         # Update password if a new one is provided
         new_password = request.form.get('password')
         if new_password:  
-            user.password = generate_password_hash(new_password)
+            user.set_password(new_password)
 
         db.session.commit()
+        invalidate_principal('user', user_id)
         flash("User updated successfully!", "success")
 
     except Exception as e:
@@ -107,17 +125,12 @@ def edit_user(user_id):
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     try:
-        # Delete all related scores first
-        Score.query.filter_by(user_id=user.id).delete()
-        
-        # Delete quiz attempts and their answers
-        attempts = QuizAttempt.query.filter_by(user_id=user.id).all()
-        for attempt in attempts:
-            QuizAnswer.query.filter_by(attempt_id=attempt.id).delete()
-        QuizAttempt.query.filter_by(user_id=user.id).delete()
-        
-        db.session.delete(user)
-        db.session.commit()
+        # Answers, attempts and scores are removed with set-based deletes
+        deletion.delete_user(user.id, chunked=True)
+        leaderboards.remove_user(user_id)
+        dashboard_summaries.forget(user_id)
+        invalidate_principal('user', user_id)
+        session_store.revoke('user', user_id)  # Log the deleted user out everywhere
         flash('User deleted successfully', 'success')
     except Exception as e:
         db.session.rollback()
@@ -129,7 +142,13 @@ def delete_user(user_id):
 @login_required
 @admin_required
 def manage_subjects():
-    return render_template('admin/manage_subjects.html', subjects=Subject.query.all())
+    filters = {'q': request.args.get('q', '').strip()}
+    query = Subject.query
+    if filters['q']:
+        query = query.filter(prefix_filter(Subject.name, filters['q']))
+
+    subjects = keyset_paginate(query, Subject.id, **page_args())
+    return render_template('admin/manage_subjects.html', subjects=subjects, filters=filters)
 
 @admin_bp.route('/admin/add_subject', methods=['POST'])
 @login_required
@@ -159,6 +178,7 @@ def edit_subject(subject_id):
             flash(f"Subject '{new_name}' already exists!", "danger")
         else:
             subject.name = new_name
+            quiz_paper.bump_subject(subject_id)
             db.session.commit()
             flash("Subject updated successfully!", "success")
 
@@ -174,26 +194,12 @@ def delete_subject(subject_id):
     try:
         subject = Subject.query.get_or_404(subject_id)
         
-        # Handle all related chapters
-        for chapter in subject.chapters:
-            # Handle quizzes in chapter
-            for quiz in chapter.quizzes:
-                # Delete related scores
-                Score.query.filter_by(quiz_id=quiz.id).delete()
-                # Delete attempts and answers
-                attempts = QuizAttempt.query.filter_by(quiz_id=quiz.id).all()
-                for attempt in attempts:
-                    QuizAnswer.query.filter_by(attempt_id=attempt.id).delete()
-                QuizAttempt.query.filter_by(quiz_id=quiz.id).delete()
-                # Clear quiz-question relationships
-                quiz.questions = []
-            
-            # Delete chapter questions and answers
-            for question in chapter.questions:
-                QuizAnswer.query.filter_by(question_id=question.id).delete()
-        
-        db.session.delete(subject)
-        db.session.commit()
+        # Chapters, quizzes, questions and everything hanging off them go in a few set-based deletes
+        for quiz_id in deletion.delete_subject(subject.id, chunked=True):
+            answer_key_cache.invalidate(quiz_id)
+            leaderboards.invalidate_quiz(quiz_id)
+        leaderboards.invalidate_subject(subject_id)
+        dashboard_summaries.clear()
         flash("Subject deleted successfully!", "success")
     except Exception as e:
         db.session.rollback()
@@ -237,6 +243,7 @@ def edit_chapter(chapter_id):
         else:
             chapter.name = new_name
             chapter.number = int(new_number) if new_number else chapter.number
+            quiz_paper.bump_chapter(chapter_id)
             db.session.commit()
             flash("Chapter updated successfully!", "success")
 
@@ -249,9 +256,15 @@ def edit_chapter(chapter_id):
 @login_required
 @admin_required
 def get_chapters(subject_id):
-    chapters = Chapter.query.filter_by(subject_id=subject_id).all()
+    query = db.session.query(Chapter.id, Chapter.name).filter(Chapter.subject_id == subject_id)
+    if request.args.get('q'):
+        query = query.filter(prefix_filter(Chapter.name, request.args['q'].strip()))
+
+    # Dropdowns load every chapter of a subject, so the default page is larger than the admin tables
+    chapters = keyset_paginate(query, Chapter.id, **page_args(default_per_page=500))
     return jsonify({
-        'chapters': [{'id': chapter.id, 'name': chapter.name} for chapter in chapters]
+        'chapters': [{'id': chapter.id, 'name': chapter.name} for chapter in chapters],
+        'next_cursor': chapters.next_cursor
     })
 
 @admin_bp.route('/admin/delete_chapter/<int:chapter_id>', methods=['POST'])
@@ -262,27 +275,12 @@ def delete_chapter(chapter_id):
         chapter = Chapter.query.get_or_404(chapter_id)
         subject_id = chapter.subject_id
         
-        # Handle quizzes in chapter
-        for quiz in chapter.quizzes:
-            # Delete related scores
-            Score.query.filter_by(quiz_id=quiz.id).delete()
-            # Delete attempts and answers
-            attempts = QuizAttempt.query.filter_by(quiz_id=quiz.id).all()
-            for attempt in attempts:
-                QuizAnswer.query.filter_by(attempt_id=attempt.id).delete()
-            QuizAttempt.query.filter_by(quiz_id=quiz.id).delete()
-            # Clear quiz-question relationships
-            quiz.questions = []
-        
-        # Handle chapter questions
-        for question in chapter.questions:
-            # Remove from quizzes first
-            question.quizzes = []
-            # Delete related answers
-            QuizAnswer.query.filter_by(question_id=question.id).delete()
-        
-        db.session.delete(chapter)
-        db.session.commit()
+        # Quizzes, questions, attempts, answers and scores of the chapter in a few set-based deletes
+        for quiz_id in deletion.delete_chapter(chapter.id, chunked=True):
+            answer_key_cache.invalidate(quiz_id)
+            leaderboards.invalidate_quiz(quiz_id)
+        leaderboards.invalidate_subject(subject_id)
+        dashboard_summaries.clear()
         flash("Chapter deleted successfully!", "success")
     except Exception as e:
         db.session.rollback()
@@ -296,9 +294,13 @@ def delete_chapter(chapter_id):
 def manage_questions(subject_id, chapter_id):
     subject = Subject.query.get_or_404(subject_id)
     chapter = Chapter.query.get_or_404(chapter_id)
-    questions = Question.query.filter_by(chapter_id=chapter_id).all()
-    
-    return render_template('admin/manage_questions.html', subject=subject, chapter=chapter, questions=questions)
+    filters = {'q': request.args.get('q', '').strip()}
+    query = Question.query.filter_by(chapter_id=chapter_id)
+    if filters['q']:
+        query = query.filter(prefix_filter(Question.question_text, filters['q']))
+
+    questions = keyset_paginate(query, Question.id, **page_args())
+    return render_template('admin/manage_questions.html', subject=subject, chapter=chapter, questions=questions, filters=filters)
 
 @admin_bp.route('/admin/add_question/<int:subject_id>/<int:chapter_id>', methods=['POST'])
 @login_required
@@ -346,6 +348,32 @@ def add_question(subject_id, chapter_id):
 
     return redirect(url_for('admin.manage_questions', subject_id=subject_id, chapter_id=chapter_id))
 
+# ✅ Bulk import from a CSV / JSONL file; rows without a chapter_id go to this chapter
+@admin_bp.route('/admin/import_questions/<int:subject_id>/<int:chapter_id>', methods=['POST'])
+@login_required
+@admin_required
+def import_questions(subject_id, chapter_id):
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash("Choose a CSV or JSONL file to import!", "danger")
+        return redirect(url_for('admin.manage_questions', subject_id=subject_id, chapter_id=chapter_id))
+
+    try:
+        report = question_import.import_questions(
+            question_import.text_stream(upload.stream),
+            fmt=question_import.detect_format(upload.filename),
+            chapter_id=chapter_id,
+            batch_size=current_app.config['IMPORT_BATCH_SIZE'],
+        )
+        flash(report.summary(), "warning" if report.error_count else "success")
+        for line, message in report.errors[:10]:
+            flash(f"Line {line}: {message}", "danger")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Error: {str(e)}", "danger")
+
+    return redirect(url_for('admin.manage_questions', subject_id=subject_id, chapter_id=chapter_id))
+
 @admin_bp.route('/admin/edit_question/<int:question_id>', methods=['POST'])
 @login_required
 @admin_required
@@ -358,8 +386,10 @@ def edit_question(question_id):
         question.option_c = request.form.get('option_c').strip()
         question.option_d = request.form.get('option_d').strip()
         question.correct_option = request.form.get('correct_option').strip()
+        quiz_paper.bump_question(question_id)
         
         db.session.commit()
+        answer_key_cache.invalidate_question(question_id)
         flash("Question updated successfully!", "success")
 
     except Exception as e:
@@ -376,14 +406,10 @@ def delete_question(question_id):
         subject_id = question.chapter.subject_id
         chapter_id = question.chapter_id
         
-        # Remove from all quizzes first
-        question.quizzes = []
-        
-        # Delete related answers
-        QuizAnswer.query.filter_by(question_id=question.id).delete()
-        
-        db.session.delete(question)
-        db.session.commit()
+        # Quiz links and answers are removed with set-based deletes
+        quiz_paper.bump_question(question.id)
+        deletion.delete_question(question.id, chunked=True)
+        answer_key_cache.invalidate_question(question_id)
         flash("Question deleted successfully!", "success")
     except Exception as e:
         db.session.rollback()
@@ -394,7 +420,26 @@ def delete_question(question_id):
 @login_required
 @admin_required
 def manage_quizzes():
-    return render_template("admin/manage_quizzes.html", quizzes=Quiz.query.all(), subjects=Subject.query.all())
+    filters = {
+        'q': request.args.get('q', '').strip(),
+        'subject_id': request.args.get('subject_id', type=int),
+        'chapter_id': request.args.get('chapter_id', type=int),
+        'active': request.args.get('active', ''),
+    }
+    query = quizzes_with_subject_chapters()
+    if filters['q']:
+        query = query.filter(prefix_filter(Quiz.name, filters['q']))
+    if filters['chapter_id']:
+        query = query.filter(Quiz.chapter_id == filters['chapter_id'])
+    elif filters['subject_id']:
+        query = query.filter(Quiz.chapter_id.in_(db.select(Chapter.id).where(Chapter.subject_id == filters['subject_id'])))
+    if flag_arg('active') is not None:
+        query = query.filter(Quiz.active == flag_arg('active'))
+
+    quizzes = keyset_paginate(query, Quiz.id, **page_args())
+    filter_chapters = Chapter.query.filter_by(subject_id=filters['subject_id']).all() if filters['subject_id'] else []
+    return render_template("admin/manage_quizzes.html", quizzes=quizzes, subjects=Subject.query.all(),
+                           filters=filters, filter_chapters=filter_chapters)
 
 @admin_bp.route('/admin/add_quiz', methods=['POST'])
 @login_required
@@ -435,8 +480,11 @@ def edit_quiz(quiz_id):
         quiz.end_time = datetime.strptime(request.form.get('end_time'), '%Y-%m-%dT%H:%M') if request.form.get('end_time') else None
         quiz.duration = int(request.form.get('duration')) if request.form.get('duration') else None
         quiz.max_marks = int(request.form.get('total_marks')) if request.form.get('total_marks') else None
+        quiz_paper.bump_quiz(quiz_id)
 
         db.session.commit()
+        leaderboards.invalidate_quiz(quiz_id)  # The chapter, and so the subject ranking, may have changed
+        dashboard_summaries.clear()  # Name and max marks show on every attempted user's dashboard
         flash("Quiz updated successfully!", "success")
 
     except Exception as e:
@@ -474,7 +522,9 @@ def add_question_to_quiz(quiz_id):
                 else:
                     flash(f"Question '{question.question_text}' doesn't belong to this quiz's chapter!", 'danger')
 
+            quiz_paper.bump_quiz(quiz.id)
             db.session.commit()
+            answer_key_cache.invalidate(quiz.id)
             flash(f"Questions added to quiz '{quiz.name}' successfully!", 'success')
         except Exception as e:
             flash(f"Error: {str(e)}", 'danger')
@@ -491,6 +541,74 @@ def preview_quiz(quiz_id):
     quiz = Quiz.query.get_or_404(quiz_id)
     return render_template('admin/quiz_preview.html', quiz=quiz, questions=quiz.questions)
 
+@admin_bp.route('/admin/quiz_analytics/<int:quiz_id>', methods=['GET'])
+@login_required
+@admin_required
+@replica_reads
+def quiz_analytics(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+    return render_template('admin/quiz_analytics.html', quiz=quiz, summary=stats.quiz_summary(quiz_id))
+
+# ✅ Leader lease and this process's sweeper counters, as JSON for monitoring
+@admin_bp.route('/admin/scheduler_status', methods=['GET'])
+@login_required
+@admin_required
+def scheduler_status():
+    from models.scheduler import SchedulerLease
+    from services.attempt_timer import sweep_counters
+    from services.scheduler import HOLDER, LEASE_NAME
+
+    lease = db.session.get(SchedulerLease, LEASE_NAME)
+    return jsonify({
+        'process': HOLDER,
+        'leader': lease.holder if lease else None,
+        'lease_expires_at': lease.expires_at.isoformat() if lease else None,
+        'last_run_at': lease.last_run_at.isoformat() if lease and lease.last_run_at else None,
+        'sweeper': sweep_counters.as_dict(),
+    })
+
+# ✅ Prometheus scrape target: this process's request, SQL and template timings plus cache / sweeper /
+# autosave counters. Admins, or a scraper sending `Authorization: Bearer <METRICS_TOKEN>`.
+@admin_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    token = current_app.config['METRICS_TOKEN']
+    scraper = token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not scraper and not (current_user.is_authenticated and session.get('user_type') == 'admin'):
+        return Response("Forbidden\n", status=403, mimetype='text/plain')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# ---------------------- Export ----------------------
+@admin_bp.route('/admin/export', methods=['GET'])
+@login_required
+@admin_required
+def export_results():
+    subjects = db.session.execute(db.select(Subject.id, Subject.name).order_by(Subject.name)).all()
+    return render_template('admin/export.html', subjects=subjects, datasets=export.DATASETS, formats=export.FORMATS)
+
+# ✅ Streams the rows straight from the database cursor into a chunked response
+@admin_bp.route('/admin/export/download', methods=['GET'])
+@login_required
+@admin_required
+@replica_reads
+def download_export():
+    dataset = request.args.get('dataset', 'scores')
+    fmt = request.args.get('format', 'csv')
+    ids = {name: request.args.get(name, type=int) for name in ('quiz_id', 'chapter_id', 'subject_id')}
+    try:
+        stmt = export.build_query(
+            dataset, **ids,
+            since=export.parse_date(request.args.get('since')),
+            until=export.parse_date(request.args.get('until'), inclusive_end=True),
+        )
+        chunks = export.iter_export(stmt, fmt, yield_per=current_app.config['EXPORT_YIELD_PER'])
+    except ValueError as e:
+        flash(f"Error: {str(e)}", "danger")
+        return redirect(url_for('admin.export_results'))
+
+    filename = export.export_filename(dataset, fmt, **{name.replace('_id', ''): value for name, value in ids.items()})
+    return Response(stream_with_context(chunks), mimetype=export.FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
 @admin_bp.route('/admin/delete_quiz/<int:quiz_id>', methods=['POST'])
 @login_required
 @admin_required
@@ -498,20 +616,11 @@ def delete_quiz(quiz_id):
     try:
         quiz = Quiz.query.get_or_404(quiz_id)
         
-        # Delete related scores
-        Score.query.filter_by(quiz_id=quiz.id).delete()
-        
-        # Delete attempts and answers
-        attempts = QuizAttempt.query.filter_by(quiz_id=quiz.id).all()
-        for attempt in attempts:
-            QuizAnswer.query.filter_by(attempt_id=attempt.id).delete()
-        QuizAttempt.query.filter_by(quiz_id=quiz.id).delete()
-        
-        # Clear quiz-question relationships
-        quiz.questions = []
-        
-        db.session.delete(quiz)
-        db.session.commit()
+        # Scores, attempts, answers and question links are removed with set-based deletes
+        deletion.delete_quiz(quiz.id, chunked=True)
+        answer_key_cache.invalidate(quiz_id)
+        leaderboards.invalidate_quiz(quiz_id)
+        dashboard_summaries.clear()
         flash("Quiz deleted successfully!", "success")
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,257 @@
+import gzip
+import secrets
+from datetime import datetime
+from functools import wraps
+import orjson
+from flask import Blueprint, current_app, make_response, request, session, url_for
+from flask_login import current_user
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError, OperationalError
+from extensions import db
+from models.quiz import Quiz, Chapter, Subject, QuizAttempt, QuizAnswer
+from services.attempt_timer import deadline, is_late
+from services.autosave import autosave_buffer
+from services.db_profile import retry_locked
+from services.grading import submit_attempt, get_answer_key, stored_answers
+from services.leaderboard import leaderboards
+from services.pagination import keyset_paginate, page_args
+from services.quiz_paper import get_paper
+from services.read_replica import replica_reads
+from services.shuffle import for_attempt, LETTERS
+from services.submission_queue import enqueue_submission, is_grading
+
+# JSON API for the mobile client. Authentication is the normal session cookie (POST /user-login).
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def _json(payload, status=200):
+    # Straight to bytes; datetimes come out as ISO 8601 (UTC), question ids as object keys
+    response = make_response(orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS), status)
+    response.mimetype = 'application/json'
+    return response
+
+
+def _error(message, status):
+    return _json({'error': message}, status)
+
+
+# ✅ Conditional GET: the (weak) ETag hashes the body, so an unchanged response costs a 304 and no transfer
+def _conditional(payload):
+    response = _json(payload)
+    response.add_etag(weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def api_user_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or session.get('user_type') != 'user':
+            return _error("Log in as a user first.", 401)  # No redirect to the HTML login page
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+# ✅ Compress large bodies for clients that accept gzip
+@api_bp.after_request
+def _gzip(response):
+    if response.status_code not in (200, 201) or response.direct_passthrough:
+        return response
+    response.vary.add('Accept-Encoding')
+    if 'gzip' not in request.accept_encodings or 'Content-Encoding' in response.headers:
+        return response
+    body = response.get_data()
+    if len(body) >= current_app.config['API_GZIP_MIN_BYTES']:
+        response.set_data(gzip.compress(body, compresslevel=current_app.config['API_GZIP_LEVEL']))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def _status(row, now):
+    if row.attempt_id is not None:
+        return 'submitted' if row.submitted_at is not None else 'in_progress'
+    if row.start_time and now < row.start_time:
+        return 'upcoming'
+    if row.end_time and now >= row.end_time:
+        return 'closed'
+    return 'open'
+
+
+# ✅ Active quizzes with this user's attempt state, one query per page: ?after=<next_cursor>&per_page=
+@api_bp.route('/quizzes')
+@api_user_required
+def list_quizzes():
+    query = (
+        db.session.query(Quiz.id, Quiz.name, Subject.name.label('subject'), Chapter.name.label('chapter'),
+                         Quiz.start_time, Quiz.end_time, Quiz.duration, Quiz.max_marks,
+                         QuizAttempt.id.label('attempt_id'), QuizAttempt.submitted_at)
+        .outerjoin(Chapter, Chapter.id == Quiz.chapter_id)
+        .outerjoin(Subject, Subject.id == Chapter.subject_id)
+        .outerjoin(QuizAttempt, and_(QuizAttempt.quiz_id == Quiz.id, QuizAttempt.user_id == current_user.id))
+        .filter(Quiz.active.is_(True))
+    )
+    page = keyset_paginate(query, Quiz.id, **page_args(current_app.config['API_PAGE_SIZE'], max_per_page=200))
+    now = datetime.utcnow()
+    return _conditional({
+        'quizzes': [{
+            'id': row.id, 'name': row.name, 'subject': row.subject, 'chapter': row.chapter,
+            'start_time': row.start_time, 'end_time': row.end_time, 'duration': row.duration,
+            'max_marks': row.max_marks, 'status': _status(row, now), 'attempt_id': row.attempt_id,
+        } for row in page],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    })
+
+
+def _closed(quiz, now):
+    return not quiz.active or (quiz.start_time and now < quiz.start_time) or (quiz.end_time and now >= quiz.end_time)
+
+
+def _attempt_row(quiz_id):
+    return db.session.execute(
+        db.select(QuizAttempt.id, QuizAttempt.started_at, QuizAttempt.submitted_at, QuizAttempt.seed)
+        .where(QuizAttempt.user_id == current_user.id, QuizAttempt.quiz_id == quiz_id)
+    ).first()
+
+
+# ✅ The paper and the attempt in one payload. Like opening the HTML page, the first fetch starts the
+# attempt; later fetches resume it with the answers saved so far. `deadline` is absolute (UTC), so the
+# body and its ETag stay the same until an answer is saved.
+@api_bp.route('/quizzes/<int:quiz_id>/paper')
+@api_user_required
+def quiz_paper(quiz_id):
+    quiz = db.session.execute(
+        db.select(Quiz.id, Quiz.version, Quiz.active, Quiz.start_time, Quiz.end_time, Quiz.duration)
+        .where(Quiz.id == quiz_id)
+    ).first()
+    if quiz is None:
+        return _error("Quiz not found.", 404)
+    now = datetime.utcnow()
+    if _closed(quiz, now):
+        return _error("This quiz is not open right now.", 403)
+
+    attempt = _attempt_row(quiz_id)
+    if attempt is not None and attempt.submitted_at is not None:
+        return _error("You have already completed this quiz.", 409)
+
+    saved = {}
+    if attempt is None:
+        # ⏳ Opening the quiz starts the attempt; the scheduler submits it when the time runs out
+        seed = secrets.randbits(31) if current_app.config['QUIZ_SHUFFLE'] else None
+        db.session.add(QuizAttempt(user_id=current_user.id, quiz_id=quiz_id, started_at=now, seed=seed))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # Started on another device at the same moment
+        attempt = _attempt_row(quiz_id)
+    else:
+        saved = {**stored_answers([attempt.id])[attempt.id], **autosave_buffer.get(attempt.id)}
+
+    paper = get_paper(quiz.id, quiz.version)
+    questions = paper.payload['questions']
+    shuffle = for_attempt(attempt)
+    if shuffle is not None:
+        questions = shuffle.arrange(paper)
+        saved = {question_id: shuffle.to_shown(question_id, option) for question_id, option in saved.items()}
+    return _conditional({
+        **paper.payload, 'questions': questions,
+        'attempt_id': attempt.id, 'deadline': deadline(attempt.started_at, quiz), 'answers': saved,
+    })
+
+
+# ✅ Graded result from column tuples; letters are the ones this attempt was shown
+def _result_payload(attempt):
+    answers = db.session.execute(
+        db.select(QuizAnswer.question_id, QuizAnswer.selected_option).where(QuizAnswer.attempt_id == attempt.id)
+    ).all()
+    answer_key, shuffle = get_answer_key(attempt.quiz_id), for_attempt(attempt)
+
+    def shown(question_id, option):
+        return shuffle.to_shown(question_id, option) if shuffle is not None and option else option
+
+    correct = sum(1 for question_id, option in answers if answer_key.get(question_id) == option)
+
+    quiz_ranking = leaderboards.quiz(attempt.quiz_id)
+    subject_ranking = leaderboards.subject(leaderboards.subject_of(attempt.quiz_id))
+    return {
+        'attempt_id': attempt.id, 'quiz_id': attempt.quiz_id, 'status': 'graded',
+        'submitted_at': attempt.submitted_at, 'correct': correct, 'answered': len(answers),
+        'questions': len(answer_key),
+        'answers': [[question_id, shown(question_id, option), shown(question_id, answer_key.get(question_id))]
+                    for question_id, option in answers],
+        'quiz_rank': quiz_ranking.rank(current_user.id), 'quiz_total': len(quiz_ranking),
+        'quiz_percentile': quiz_ranking.percentile(current_user.id),
+        'subject_rank': subject_ranking.rank(current_user.id), 'subject_total': len(subject_ranking),
+    }
+
+
+def _grading_payload(attempt_id):
+    return {'attempt_id': attempt_id, 'status': 'grading',
+            'result_url': url_for('api.attempt_result', attempt_id=attempt_id)}
+
+
+# ✅ All answers in one call: {"answers": {question_id: letter as shown}}. A synchronous submission
+# returns the graded result straight away; a queued one returns 202 and the result URL to poll.
+@api_bp.route('/quizzes/<int:quiz_id>/submission', methods=['POST'])
+@api_user_required
+def submit_quiz(quiz_id):
+    data = request.get_json(silent=True)
+    answers = data.get('answers') if isinstance(data, dict) else None
+    if not isinstance(answers, dict):
+        return _error('Expected a JSON object {"answers": {question_id: letter}}.', 400)
+    selected_options = {str(question_id): option for question_id, option in answers.items()
+                        if isinstance(option, str) and len(option) == 1 and option in LETTERS}
+
+    quiz = db.session.get(Quiz, quiz_id)
+    if quiz is None:
+        return _error("Quiz not found.", 404)
+    now = datetime.utcnow()
+    attempt = QuizAttempt.query.filter_by(user_id=current_user.id, quiz_id=quiz.id).first()
+    if attempt and attempt.submitted_at:
+        return _error("You have already completed this quiz.", 409)
+    # The window only matters without an attempt; one under way is judged by its deadline and grace below
+    if attempt is None and _closed(quiz, now):
+        return _error("This quiz is not open right now.", 403)
+
+    submitted_at = None
+    # ⏳ Time is up: the answers sent after the deadline do not count
+    if attempt and is_late(attempt, quiz, current_app.config['ATTEMPT_GRACE_SECONDS'], now):
+        selected_options, submitted_at = {}, deadline(attempt.started_at, quiz)
+    try:
+        if current_app.config['SUBMISSION_MODE'] == 'queued':
+            attempt = retry_locked(enqueue_submission, quiz.id, current_user.id, selected_options, attempt, submitted_at)
+            if attempt is None:  # Submitted meanwhile (another device, or the deadline sweep)
+                return _error("You have already completed this quiz.", 409)
+            return _json(_grading_payload(attempt.id), 202)
+        attempt, correct_answers = retry_locked(submit_attempt, quiz.id, current_user.id, selected_options,
+                                                attempt, submitted_at)
+        if correct_answers is None:  # Submitted meanwhile (another device, or the deadline sweep)
+            return _error("You have already completed this quiz.", 409)
+    except IntegrityError:
+        db.session.rollback()  # A concurrent submission already created the attempt
+        return _error("You have already completed this quiz.", 409)
+    except OperationalError:
+        db.session.rollback()  # Still locked after the retries; the client keeps the answers and submits again
+        response = _error("The server is busy; the quiz has not been submitted. Please submit again.", 503)
+        response.headers['Retry-After'] = '2'
+        return response
+    return _json({**_result_payload(attempt), 'late': submitted_at is not None}, 201)
+
+
+@api_bp.route('/attempts/<int:attempt_id>/result')
+@api_user_required
+@replica_reads  # Right after submitting, the visitor is pinned to the primary (read-your-writes)
+def attempt_result(attempt_id):
+    attempt = db.session.execute(
+        db.select(QuizAttempt.id, QuizAttempt.user_id, QuizAttempt.quiz_id, QuizAttempt.submitted_at, QuizAttempt.seed)
+        .where(QuizAttempt.id == attempt_id)
+    ).first()
+    if attempt is None or attempt.user_id != current_user.id:
+        return _error("Attempt not found.", 404)  # Other users' attempts look the same as missing ones
+    if attempt.submitted_at is None:
+        return _error("This attempt has not been submitted yet.", 409)
+    if is_grading(attempt):
+        response = _json(_grading_payload(attempt.id), 202)
+        response.headers['Retry-After'] = '2'
+        return response
+    return _conditional(_result_payload(attempt))
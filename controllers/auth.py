@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, current_user
 from models.user import User
 from models.admin import Admin
 from extensions import db
+from services import passwords
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -47,6 +48,8 @@ def user_login():
         user = User.query.filter_by(email=email).first()
         
         if user and user.check_password(password):
+            if passwords.upgrade(user, password):  # Hash parameters changed since this password was set
+                db.session.commit()
             session.clear()
             login_user(user, remember=True, force=True)
             session['user_type'] = 'user'
@@ -71,6 +74,8 @@ def admin_login():
 
         admin = Admin.query.filter_by(email=email).first()
         if admin and admin.check_password(password):
+            if passwords.upgrade(admin, password):
+                db.session.commit()
             session.clear()
             login_user(admin, remember=True, force=True)
             session['user_type'] = 'admin'
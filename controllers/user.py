@@ -1,12 +1,31 @@
-from flask import render_template, session, redirect, url_for, Blueprint,request,flash
+from flask import render_template, session, redirect, url_for, Blueprint,request,flash, current_app, make_response, jsonify
 from flask_login import current_user, login_required
 from models.user import User
 from models.quiz import Quiz, Question,QuizAttempt, QuizAnswer
 from models.score import Score
 from extensions import db, login_manager
+import json
+import logging
+import secrets
+import time
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import joinedload
+from services.db_profile import retry_locked
+from services.grading import submit_attempt, get_answer_key, keep_answers, stored_answers
+from services.submission_queue import enqueue_submission, is_grading
+from services.queries import quizzes_with_subject
+from services.leaderboard import leaderboards
+from services.attempt_timer import deadline, is_late, remaining_seconds
+from services.quiz_paper import get_paper
+from services.shuffle import AttemptShuffle, for_attempt, LETTERS
+from services.autosave import autosave_buffer
+from services.read_replica import replica_reads
+from services.dashboard_summary import dashboard_summaries, dashboard_log
 from .decorators import user_required
 
+logger = logging.getLogger(__name__)
+
 user_bp = Blueprint('user', __name__)
 
 # @login_manager.user_loader
@@ -19,40 +38,37 @@ user_bp = Blueprint('user', __name__)
 @login_required
 @user_required  # ✅ Ensures user must be logged in
 def dashboard():
+    started = time.perf_counter()
     try:
-        user = User.query.get(current_user.id)  # Ensure you are getting the full user object
-
-        if not user:
-            flash("User not found!", "danger")
-            return redirect(url_for("auth.user_login"))  # Redirect if user doesn't exist
+        user = current_user  # Cached principal from load_user; no extra lookup needed
 
-        quizzes = Quiz.query.all()
-        scores = Score.query.filter_by(user_id=current_user.id).all()
-        score_data = [(score, score.quiz.max_marks) for score in scores]
+        quizzes = quizzes_with_subject().all()
+        summary = dashboard_summaries.get(current_user.id)  # Best / latest score per attempted quiz, cached per user
 
-        print(f"User Data: {user.__dict__}")  # Debugging to check if `created_at` exists
-        print(f"Score Data: {score_data}")
+        html = render_template('users/user_dashboard.html', user=user, quizzes=quizzes, scores=summary.values())
+        dashboard_log.info('dashboard', user_id=current_user.id, quizzes=len(quizzes), attempted=len(summary),
+                           ms=round((time.perf_counter() - started) * 1000, 1))
+        return html
 
-        return render_template('users/user_dashboard.html', user=user, quizzes=quizzes, scores=score_data)
-
-    except Exception as e:
-        print(f"Error: {str(e)}")
+    except Exception:
+        logger.exception("Dashboard failed for user %s", current_user.id)
         flash("An error occurred while loading the dashboard.", "danger")
         return redirect(url_for("auth.user_login"))
 
+def _closed_reason(quiz, now):
+    if not quiz.active:
+        return "This quiz is inactive and cannot be attempted."
+    if (quiz.start_time and now < quiz.start_time) or (quiz.end_time and now >= quiz.end_time):
+        return "This quiz is not open right now."
+    return None
+
 # 📝 Route for Attempt Quiz
 @user_bp.route('/quiz/<int:quiz_id>/attempt', methods=['GET', 'POST'])
 @login_required
 @user_required
 def attempt_quiz(quiz_id):
     quiz = Quiz.query.get_or_404(quiz_id)
-    
-    if not quiz.active:
-        flash("This quiz is inactive and cannot be attempted.", "danger")
-        return redirect(url_for('user.dashboard'))
-    
-    # Load questions for this quiz
-    questions = quiz.questions  # This gets the questions from the many-to-many relationship
+    now = datetime.utcnow()
 
     # ❌ Prevent re-attempt if already submitted
     attempt = QuizAttempt.query.filter_by(user_id=current_user.id, quiz_id=quiz.id).first()
@@ -60,55 +76,155 @@ def attempt_quiz(quiz_id):
         flash("You have already completed this quiz.", "warning")
         return redirect(url_for('user.dashboard'))
 
+    # ❌ Inactive or outside the quiz window: the paper cannot be opened. Submitting an attempt that is
+    # already under way is judged by its deadline and grace period below, so answers sent at the bell count.
+    if request.method == 'GET' or attempt is None:
+        closed = _closed_reason(quiz, now)
+        if closed:
+            flash(closed, "danger")
+            return redirect(url_for('user.dashboard'))
+
     if request.method == 'POST':
-        selected_options = request.form.to_dict()
-        attempt = attempt or QuizAttempt(user_id=current_user.id, quiz_id=quiz.id, started_at=datetime.utcnow())
-        db.session.add(attempt)
-        db.session.commit()
-
-        # ✅ Store user answers & correctness
-        for question_id, selected_option in selected_options.items():
-            if question_id.isdigit():  # Make sure it's a question ID
-                question = Question.query.get(int(question_id))
-                if question:
-                    is_correct = (selected_option == question.correct_option)
-                    answer = QuizAnswer(attempt_id=attempt.id, question_id=question.id, 
-                                       selected_option=selected_option, is_correct=is_correct)
-                    db.session.add(answer)
-
-        # ✅ Calculate score
-        db.session.commit()
-        correct_answers = QuizAnswer.query.filter_by(attempt_id=attempt.id, is_correct=True).count()
-        total_questions = QuizAnswer.query.filter_by(attempt_id=attempt.id).count()
-        
-        score = Score(
-            quiz_id=quiz.id,
-            user_id=current_user.id,
-            total_score=correct_answers,
-            attempted_at=datetime.utcnow()
-        )
-        db.session.add(score)
-        
-        attempt.submitted_at = datetime.utcnow()
-        db.session.commit()
+        selected_options, submitted_at = request.form.to_dict(), None
+        # ⏳ Time is up: the answers sent after the deadline do not count
+        if attempt and is_late(attempt, quiz, current_app.config['ATTEMPT_GRACE_SECONDS'], now):
+            selected_options, submitted_at = {}, deadline(attempt.started_at, quiz)
+            flash("Time was up before the quiz was submitted; answers after the deadline were not counted.", "warning")
+        try:
+            if current_app.config['SUBMISSION_MODE'] == 'queued':
+                # ⏳ Queue the raw answers; background workers grade them in batches
+                queued = retry_locked(enqueue_submission, quiz.id, current_user.id, selected_options, attempt, submitted_at)
+                if queued is None:  # Submitted meanwhile (another tab, or the deadline sweep)
+                    flash("You have already completed this quiz.", "warning")
+                    return redirect(url_for('user.dashboard'))
+                flash("Quiz submitted! Your answers are being graded.", "info")
+                return redirect(url_for('user.quiz_result', attempt_id=queued.id))
+
+            # ✅ Grade against the answer key and store answers, score and submission in one transaction
+            submitted, correct_answers = retry_locked(submit_attempt, quiz.id, current_user.id, selected_options,
+                                                      attempt, submitted_at)
+            if correct_answers is None:  # Submitted meanwhile (another tab, or the deadline sweep)
+                flash("You have already completed this quiz.", "warning")
+                return redirect(url_for('user.dashboard'))
+        except IntegrityError:
+            # A concurrent submission already created the attempt (unique_user_quiz_attempt)
+            db.session.rollback()
+            flash("You have already completed this quiz.", "warning")
+            return redirect(url_for('user.dashboard'))
+        except OperationalError:
+            # ⏳ Still locked after the retries: keep the answers and let the user submit again
+            db.session.rollback()
+            if attempt is not None and submitted_at is None:
+                keep_answers(attempt, selected_options)
+            flash("The server is busy and your quiz has not been submitted yet. Your answers are kept; "
+                  "please submit again.", "warning")
+            return redirect(url_for('user.attempt_quiz', quiz_id=quiz.id))
 
         flash("Quiz submitted successfully!", "success")
-        return redirect(url_for('user.quiz_result', attempt_id=attempt.id))
+        return redirect(url_for('user.quiz_result', attempt_id=submitted.id))
+
+    # ✅ Questions come from the per-version cache; only the timer and form shell are rendered per user.
+    # Everything is read before the commit below, which would otherwise expire and reload the rows.
+    paper = get_paper(quiz.id, quiz.version)
+    saved = {}
+    if attempt is None:
+        # ⏳ Opening the quiz starts the attempt; the scheduler submits it when the time runs out
+        seed = secrets.randbits(31) if current_app.config['QUIZ_SHUFFLE'] else None
+        attempt = QuizAttempt(user_id=current_user.id, quiz_id=quiz.id, started_at=now, seed=seed)
+        db.session.add(attempt)
+    else:
+        # 💾 Reopened: restore what was autosaved, including answers not flushed yet
+        saved = {**stored_answers([attempt.id])[attempt.id], **autosave_buffer.get(attempt.id)}
+    remaining = remaining_seconds(attempt, quiz, now)
+    shuffle = for_attempt(attempt)
+    if attempt.id is None:
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # Opened in another tab at the same moment
+            attempt = QuizAttempt.query.filter_by(user_id=current_user.id, quiz_id=quiz_id).first()
+            remaining, shuffle = remaining_seconds(attempt, quiz, now), for_attempt(attempt)
+
+    # 🔀 A shuffled attempt joins the paper's pre-rendered question blocks in its own order (no queries)
+    questions_html = paper.html if shuffle is None else shuffle.render(paper)
+    if shuffle is not None:
+        saved = {question_id: shuffle.to_shown(question_id, option) for question_id, option in saved.items()}
+    return render_template('users/attempt_quiz.html', paper=paper, questions_html=questions_html,
+                           remaining_seconds=remaining, saved_answers=saved)
+
+# ✅ The question paper as compact JSON, revalidated with ETag / If-None-Match
+@user_bp.route('/quiz/<int:quiz_id>/paper')
+@login_required
+@user_required
+def quiz_paper(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+    closed = _closed_reason(quiz, datetime.utcnow())
+    if closed:
+        return jsonify({'error': closed}), 403
+
+    paper = get_paper(quiz.id, quiz.version)
+    body, etag = paper.json, paper.etag
+    # 🔀 Candidates with a shuffled attempt get their own order, and so their own ETag
+    seed = db.session.scalar(
+        db.select(QuizAttempt.seed).where(QuizAttempt.user_id == current_user.id, QuizAttempt.quiz_id == quiz.id)
+    )
+    if seed is not None:
+        body = json.dumps({**paper.payload, 'questions': AttemptShuffle(seed).arrange(paper)}, separators=(',', ':'))
+        etag = f'{paper.etag}-s{seed}'
+
+    response = make_response(body)
+    response.mimetype = 'application/json'
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'  # Always revalidate; a match costs a 304
+    return response.make_conditional(request)
+
+# 💾 Autosave the answers changed since the last save: JSON {question_id: letter as shown}.
+# They are buffered in memory and written in batches; submitting merges them with the form.
+@user_bp.route('/quiz/<int:quiz_id>/autosave', methods=['POST'])
+@login_required
+@user_required
+def autosave_answers(quiz_id):
+    changes = request.get_json(silent=True)
+    if not isinstance(changes, dict):
+        return jsonify({'error': 'Expected a JSON object of answers.'}), 400
+
+    # One query for everything needed to check the attempt and its deadline
+    attempt = db.session.execute(
+        db.select(QuizAttempt.id, QuizAttempt.quiz_id, QuizAttempt.seed, QuizAttempt.started_at,
+                  QuizAttempt.submitted_at, Quiz.duration, Quiz.end_time, Quiz.version)
+        .join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+        .where(QuizAttempt.user_id == current_user.id, QuizAttempt.quiz_id == quiz_id)
+    ).first()
+    if attempt is None or attempt.submitted_at is not None:
+        return jsonify({'error': 'No attempt in progress.'}), 409
+    if is_late(attempt, attempt, current_app.config['ATTEMPT_GRACE_SECONDS']):
+        return jsonify({'error': 'Time is up.'}), 409
 
-    return render_template('users/attempt_quiz.html', quiz=quiz, attempt=attempt)
+    # ❌ Unknown questions and anything that is not an option letter are dropped
+    answer_key, shuffle = get_answer_key(quiz_id, attempt.version), for_attempt(attempt)
+    answers = {}
+    for question_id, option in changes.items():
+        if not str(question_id).isdecimal() or int(question_id) not in answer_key:
+            continue
+        if not isinstance(option, str) or len(option) != 1 or option not in LETTERS:
+            continue
+        answers[int(question_id)] = shuffle.to_original(int(question_id), option) if shuffle else option
+    autosave_buffer.add(attempt.id, answers)
+    return jsonify({'saved': len(answers)})
 
 # ✅ Show available quizzes
 @user_bp.route('/available-quizzes')
 @login_required
 @user_required
 def available_quizzes():
-    quizzes = Quiz.query.all()  # Fetch all available quizzes
+    quizzes = quizzes_with_subject().all()  # Fetch all available quizzes with chapter and subject
     return render_template('available_quizzes.html', quizzes=quizzes)
 
 
 @user_bp.route('/quiz_result/<int:attempt_id>')
 @login_required
 @user_required
+@replica_reads  # Right after submitting, the visitor is pinned to the primary (read-your-writes)
 def quiz_result(attempt_id):
     attempt = QuizAttempt.query.get_or_404(attempt_id)
 
@@ -117,19 +233,52 @@ def quiz_result(attempt_id):
         flash("Unauthorized access!", "danger")
         return redirect(url_for('user.dashboard'))
 
-    user_answers = QuizAnswer.query.filter_by(attempt_id=attempt.id).all()
-    correct_answers = {ans.question_id: ans.question.correct_option for ans in user_answers}
+    # ⏳ Still in the submission queue: show a holding page that refreshes itself
+    if is_grading(attempt):
+        response = make_response(render_template('users/quiz_grading.html', attempt=attempt))
+        response.headers['Refresh'] = '2'
+        return response
+
+    user_answers = QuizAnswer.query.filter_by(attempt_id=attempt.id).options(joinedload(QuizAnswer.question)).all()
+    correct_answers = get_answer_key(attempt.quiz_id)
+
+    # 🔀 Letters as this attempt showed them, not as stored on the Question row
+    shuffle = for_attempt(attempt)
 
-    correct_count = sum(1 for ans in user_answers if ans.selected_option == correct_answers[ans.question_id])
+    def shown(question_id, option):
+        return shuffle.to_shown(question_id, option) if shuffle is not None and option else option
+
+    breakdown = []
+    for ans in user_answers:
+        correct_option = correct_answers.get(ans.question_id, ans.question.correct_option)
+        breakdown.append((ans.question.question_text, shown(ans.question_id, ans.selected_option),
+                          shown(ans.question_id, correct_option), ans.selected_option == correct_option))
+
+    correct_count = sum(1 for *_, is_correct in breakdown if is_correct)
     total_questions = len(user_answers)
     score_percentage = (correct_count / total_questions) * 100 if total_questions else 0
 
-    return render_template('users/quiz_result.html', attempt=attempt, score=score_percentage, user_answers=user_answers)
+    quiz_ranking = leaderboards.quiz(attempt.quiz_id)
+    subject_ranking = leaderboards.subject(leaderboards.subject_of(attempt.quiz_id))
+    top_scores = quiz_ranking.top(5)
+    top_names = dict(db.session.query(User.id, User.full_name).filter(User.id.in_([uid for uid, _, _ in top_scores])).all())
+    ranks = {
+        'quiz_rank': quiz_ranking.rank(current_user.id),
+        'quiz_total': len(quiz_ranking),
+        'quiz_percentile': quiz_ranking.percentile(current_user.id),
+        'subject_rank': subject_ranking.rank(current_user.id),
+        'subject_total': len(subject_ranking),
+        'top': [(top_names.get(uid, 'Deleted user'), score, rank) for uid, score, rank in top_scores],
+    }
+
+    return render_template('users/quiz_result.html', attempt=attempt, score=score_percentage,
+                           breakdown=breakdown, ranks=ranks)
 
 # 📊 Dummy route for My Scores
 @user_bp.route('/scores')
 @login_required
 @user_required
+@replica_reads
 def scores():
     user_scores = Score.query.filter_by(user_id=current_user.id).join(Quiz).add_columns(
         Quiz.name.label('quiz_name'),
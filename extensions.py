@@ -1,22 +1,36 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_migrate import Migrate
 from flask_login import LoginManager
-from flask import session
+from flask import session, g, current_app, has_app_context
 
 
-db = SQLAlchemy()
+# ✅ Sends reads to the read replica (app.extensions['read_replica']) while g.db_route is 'replica',
+# see services/read_replica.py. Flushes, INSERT/UPDATE/DELETE and every read after them in the same
+# app context stay on the primary, so a request always sees its own writes.
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if self._flushing or getattr(clause, 'is_dml', False):
+                g.db_wrote = True
+            elif g.get('db_route') == 'replica' and not g.get('db_wrote'):
+                replica = current_app.extensions.get('read_replica')
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 
 @login_manager.user_loader
 def load_user(user_id):
-    from models.user import User
-    from models.admin import Admin
+    from services.principal_cache import load_principal
     user_type = session.get('user_type')  # Check user type stored in session
     
-    if user_type == "user":
-        return User.query.get(int(user_id))
-    elif user_type == "admin":
-        return Admin.query.get(int(user_id))
+    # Served from a short-lived in-process cache; the database is only hit on a miss
+    if user_type in ("user", "admin"):
+        return load_principal(user_type, int(user_id))
     
     return None  # Return None if user_type is missing
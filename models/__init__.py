@@ -2,6 +2,8 @@ from models.user import User
 from models.quiz import Quiz, Chapter, Subject
 from models.score import Score
 from models.admin import Admin
+from models.stats import QuizStats, QuizScoreBucket, QuestionStats
+from models.scheduler import SchedulerLease
 
 def register_models():
     pass  # Just to ensure models are imported properly
\ No newline at end of file
@@ -1,5 +1,5 @@
 from extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from services import passwords
 from flask_login import UserMixin
 
 class Admin(UserMixin, db.Model):
@@ -8,7 +8,7 @@ class Admin(UserMixin, db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify(self.password_hash, password)
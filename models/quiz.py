@@ -7,7 +7,8 @@ from sqlalchemy import UniqueConstraint
 quiz_questions = db.Table(
     'quiz_questions',
     db.Column('quiz_id', db.Integer, db.ForeignKey('quiz.id'), primary_key=True),
-    db.Column('question_id', db.Integer, db.ForeignKey('question.id'), primary_key=True)
+    db.Column('question_id', db.Integer, db.ForeignKey('question.id'), primary_key=True),
+    db.Index('ix_quiz_questions_question_id', 'question_id')  # Reverse lookups; the PK covers quiz_id
 )
 
 # 🟢 SUBJECT TABLE
@@ -29,6 +30,8 @@ class Chapter(db.Model):
     quizzes = db.relationship('Quiz', back_populates='chapter', cascade='all, delete-orphan', passive_deletes=True)  # ✅ FIXED
     questions = db.relationship('Question', back_populates='chapter', cascade='all, delete-orphan', passive_deletes=True)
 
+    __table_args__ = (db.Index('ix_chapter_subject_id_number', 'subject_id', 'number'),)
+
 
 # 🟢 QUIZ TABLE
 class Quiz(db.Model):
@@ -42,6 +45,7 @@ class Quiz(db.Model):
     duration = db.Column(db.Integer, nullable=False)  # Duration in minutes
     max_marks = db.Column(db.Integer, nullable=False)
     active = db.Column(db.Boolean, default=False, nullable=False)
+    version = db.Column(db.Integer, default=1, server_default='1', nullable=False)  # Bumped by admin edits; keys the cached paper
 
     # ✅ Chapter relationship
     chapter = db.relationship('Chapter', back_populates='quizzes')
@@ -55,6 +59,13 @@ class Quiz(db.Model):
     # ✅ One-to-Many: Quiz <-> Attempts
     quiz_attempts = db.relationship("QuizAttempt", back_populates="quiz", lazy="dynamic")
 
+    __table_args__ = (
+        db.Index('ix_quiz_chapter_id', 'chapter_id'),
+        db.Index('ix_quiz_created_at', 'created_at'),
+        db.Index('ix_quiz_start_time', 'start_time'),  # Scheduler: quizzes opening / closing soon
+        db.Index('ix_quiz_end_time', 'end_time'),
+    )
+
 
 
 # 🟢 QUESTION TABLE
@@ -75,6 +86,9 @@ class Question(db.Model):
     chapter = db.relationship('Chapter', back_populates='questions')
     quiz_answers = db.relationship('QuizAnswer', back_populates='question', lazy=True)
 
+    # Duplicate check in add_question and the per-chapter listing
+    __table_args__ = (db.Index('ix_question_chapter_id_question_text', 'chapter_id', 'question_text'),)
+
 
 class QuizAttempt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -82,12 +96,18 @@ class QuizAttempt(db.Model):
     quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False)
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     submitted_at = db.Column(db.DateTime, nullable=True)  # Stores when the user submits the quiz
+    seed = db.Column(db.Integer, nullable=True)  # Question/option shuffle for this attempt; NULL = quiz order
 
     # Change from backref to back_populates to match the User model
     user = db.relationship('User', back_populates='quiz_attempts')
     quiz = db.relationship('Quiz', back_populates='quiz_attempts')
     answers = db.relationship('QuizAnswer', back_populates='attempt')
-    __table_args__ = (UniqueConstraint('user_id', 'quiz_id', name='unique_user_quiz_attempt'),)
+    # The unique constraint also serves lookups by user_id
+    __table_args__ = (
+        UniqueConstraint('user_id', 'quiz_id', name='unique_user_quiz_attempt'),
+        db.Index('ix_quiz_attempt_quiz_id', 'quiz_id'),
+        db.Index('ix_quiz_attempt_open', 'submitted_at', 'quiz_id', 'started_at'),  # Sweeper: open attempts by quiz
+    )
 
 
 
@@ -100,3 +120,8 @@ class QuizAnswer(db.Model):
 
     attempt = db.relationship('QuizAttempt', back_populates='answers')
     question = db.relationship('Question', back_populates='quiz_answers')
+
+    __table_args__ = (
+        db.Index('ix_quiz_answer_attempt_id', 'attempt_id'),
+        db.Index('ix_quiz_answer_question_id', 'question_id'),
+    )
@@ -0,0 +1,11 @@
+from extensions import db
+
+
+# 🟢 SCHEDULER LEASE: which worker process currently runs the scheduled jobs.
+# The holder renews it on every tick; another process takes over once it has expired.
+class SchedulerLease(db.Model):
+    __tablename__ = 'scheduler_lease'
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(120), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    last_run_at = db.Column(db.DateTime, nullable=True)  # Quiz window changes before this have been applied
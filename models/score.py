@@ -13,6 +13,11 @@ class Score(db.Model):
     quiz = db.relationship('Quiz', back_populates='scores')  # Removed backref conflict
     user = db.relationship('User', back_populates='scores')
 
+    __table_args__ = (
+        db.Index('ix_score_user_id_attempted_at', 'user_id', 'attempted_at'),  # My Scores, newest first
+        db.Index('ix_score_quiz_id_user_id', 'quiz_id', 'user_id'),
+    )
+
     def percentage(self):
         if self.quiz.max_marks and self.total_score is not None:
             return round((self.total_score / self.quiz.max_marks) * 100, 2)
@@ -0,0 +1,33 @@
+from extensions import db
+
+
+# 🟢 QUIZ STATS: running totals per quiz, updated each time a submission is graded
+class QuizStats(db.Model):
+    __tablename__ = 'quiz_stats'
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)  # Sum of Score.total_score
+
+    def mean_score(self):
+        return round(self.total_score / self.attempts, 2) if self.attempts else 0
+
+
+# 🟢 SCORE HISTOGRAM: how many graded attempts of a quiz got each score (used for the median)
+class QuizScoreBucket(db.Model):
+    __tablename__ = 'quiz_score_bucket'
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    score = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+# 🟢 QUESTION STATS: answers and correct answers per question within a quiz
+class QuestionStats(db.Model):
+    __tablename__ = 'question_stats'
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True)
+    answered = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.Index('ix_question_stats_question_id', 'question_id'),)  # Deleting a question drops its rows
+
+    def correct_rate(self):
+        return round(self.correct / self.answered * 100, 2) if self.answered else 0
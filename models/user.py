@@ -1,12 +1,12 @@
 from flask_login import UserMixin
 from extensions import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from services import passwords
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)  # scrypt hashes are ~160 characters
     full_name = db.Column(db.String(100), nullable=False)
     qualification = db.Column(db.String(100))
     dob = db.Column(db.Date)
@@ -19,9 +19,11 @@ class User(db.Model, UserMixin):
     # Fix the quiz_attempts relationship to use back_populates instead of backref
     quiz_attempts = db.relationship('QuizAttempt', back_populates='user', lazy=True, cascade="all, delete", passive_deletes=True)
 
+    __table_args__ = (db.Index('ix_user_created_at', 'created_at'),)  # Newest users on the admin dashboard
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify(self.password_hash, password)
 
@@ -0,0 +1,100 @@
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+
+# ✅ Compact answer key: sorted question ids in an array and one byte per correct option
+class AnswerKey:
+    __slots__ = ('question_ids', 'options')
+
+    def __init__(self, pairs):
+        pairs = sorted(pairs)
+        self.question_ids = array('q', (question_id for question_id, _ in pairs))
+        self.options = ''.join(option for _, option in pairs).encode('ascii')
+
+    def get(self, question_id, default=None):
+        index = bisect_left(self.question_ids, question_id)
+        if index < len(self.question_ids) and self.question_ids[index] == question_id:
+            return chr(self.options[index])
+        return default
+
+    def __contains__(self, question_id):
+        return self.get(question_id) is not None
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def items(self):
+        return zip(self.question_ids, (chr(option) for option in self.options))
+
+    @property
+    def size_bytes(self):
+        return sys.getsizeof(self.question_ids) + sys.getsizeof(self.options)
+
+
+# ✅ LRU of answer keys per (quiz_id, version), bounded by total memory. Every admin edit that can change a
+# key bumps Quiz.version, so other processes stop using the old key on their next lookup; invalidate()
+# only frees this process's memory early.
+class AnswerKeyCache:
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._generation = 0  # Bumped by every invalidation
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id, version, loader):
+        cache_key = (quiz_id, version)
+        with self._lock:
+            key = self._entries.get(cache_key)
+            if key is not None:
+                self._entries.move_to_end(cache_key)
+                return key
+            generation = self._generation
+
+        key = AnswerKey(loader(quiz_id).items())  # Load outside the lock
+        with self._lock:
+            if generation != self._generation:
+                return key  # Invalidated while loading: use it for this call, but do not keep a possibly stale key
+            self._discard(cache_key)
+            self._entries[cache_key] = key
+            self._size += key.size_bytes
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                self._discard(next(iter(self._entries)))
+        return key
+
+    def invalidate(self, quiz_id):
+        with self._lock:
+            self._generation += 1
+            for cache_key in [cache_key for cache_key in self._entries if cache_key[0] == quiz_id]:
+                self._discard(cache_key)
+
+    # A question can be linked to several quizzes, so drop every key that contains it
+    def invalidate_question(self, question_id):
+        with self._lock:
+            self._generation += 1
+            for cache_key in [cache_key for cache_key, key in self._entries.items() if question_id in key]:
+                self._discard(cache_key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._size = 0
+
+    def _discard(self, cache_key):
+        key = self._entries.pop(cache_key, None)
+        if key is not None:
+            self._size -= key.size_bytes
+
+    @property
+    def size_bytes(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+
+answer_key_cache = AnswerKeyCache()
@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import and_, bindparam, insert, or_, update
+from extensions import db
+from models.quiz import Quiz, QuizAttempt
+from models.score import Score
+from services import stats
+from services.leaderboard import leaderboards
+from services.dashboard_summary import dashboard_summaries
+from services.autosave import autosave_buffer
+from services.grading import get_answer_key, stored_answers
+
+logger = logging.getLogger(__name__)
+
+
+# ✅ The server decides when an attempt ends: `duration` minutes after it started, or when the quiz closes
+def deadline(started_at, quiz):
+    candidates = [quiz.end_time] if quiz.end_time else []
+    if quiz.duration:
+        candidates.append(started_at + timedelta(minutes=quiz.duration))
+    return min(candidates) if candidates else None
+
+
+def remaining_seconds(attempt, quiz, now=None):
+    end = deadline(attempt.started_at, quiz)
+    if end is None:
+        return None
+    return max(0, int((end - (now or datetime.utcnow())).total_seconds()))
+
+
+# A submission counts if it arrives before the deadline plus a little grace for the network
+def is_late(attempt, quiz, grace_seconds, now=None):
+    end = deadline(attempt.started_at, quiz)
+    return end is not None and (now or datetime.utcnow()) > end + timedelta(seconds=grace_seconds)
+
+
+# ✅ Counters for the sweeper, per process
+class SweepCounters:
+    def __init__(self):
+        self.sweeps = 0
+        self.closed_total = 0
+        self.last_closed = 0
+        self.last_duration_ms = 0.0
+        self.total_duration_ms = 0.0
+        self.last_sweep_at = None
+        self._lock = threading.Lock()
+
+    def record(self, closed, duration_ms, at):
+        with self._lock:
+            self.sweeps += 1
+            self.closed_total += closed
+            self.last_closed = closed
+            self.last_duration_ms = duration_ms
+            self.total_duration_ms += duration_ms
+            self.last_sweep_at = at
+
+    def as_dict(self):
+        return {
+            'sweeps': self.sweeps,
+            'closed_total': self.closed_total,
+            'last_closed': self.last_closed,
+            'last_duration_ms': round(self.last_duration_ms, 2),
+            'total_duration_ms': round(self.total_duration_ms, 2),
+            'last_sweep_at': self.last_sweep_at.isoformat() if self.last_sweep_at else None,
+        }
+
+
+sweep_counters = SweepCounters()
+
+
+def _graded_pairs(attempts):
+    return set(db.session.execute(
+        db.select(Score.quiz_id, Score.user_id)
+        .where(Score.quiz_id.in_({row.quiz_id for row in attempts}),
+               Score.user_id.in_({row.user_id for row in attempts}))
+    ).tuples())
+
+
+def _expired_condition(now):
+    # Per quiz "started before now - duration"; quizzes are few, open attempts are many
+    open_quizzes = db.session.execute(
+        db.select(Quiz.id, Quiz.duration, Quiz.end_time)
+        .where(Quiz.id.in_(db.select(QuizAttempt.quiz_id).where(QuizAttempt.submitted_at.is_(None)).distinct()))
+    ).all()
+    conditions = []
+    for quiz_id, duration, end_time in open_quizzes:
+        if end_time and end_time <= now:
+            conditions.append(QuizAttempt.quiz_id == quiz_id)
+        elif duration:
+            conditions.append(and_(QuizAttempt.quiz_id == quiz_id,
+                                   QuizAttempt.started_at <= now - timedelta(minutes=duration)))
+    return or_(*conditions) if conditions else None
+
+
+CLOSING = datetime(1970, 1, 1)  # submitted_at while a sweep claims an attempt; replaced before the commit
+
+
+# Set submitted_at to the deadline where it is still NULL and return the ids of the attempts this call
+# closed. Anything submitted meanwhile (possibly still in the grading queue, so without a Score) is not
+# ours to grade. Per chunk, a guarded UPDATE claims the open rows with the CLOSING placeholder and a
+# SELECT by id reads back which ones it got; one executemany UPDATE then writes their deadlines.
+def _close_attempts(deadlines, chunk_size=1000):
+    table = QuizAttempt.__table__
+    attempt_ids = list(deadlines)
+    closed = set()
+    for start in range(0, len(attempt_ids), chunk_size):
+        chunk = attempt_ids[start:start + chunk_size]
+        db.session.execute(
+            update(table).where(table.c.id.in_(chunk), table.c.submitted_at.is_(None)).values(submitted_at=CLOSING)
+        )
+        closed.update(db.session.execute(
+            db.select(table.c.id).where(table.c.id.in_(chunk), table.c.submitted_at == CLOSING)
+        ).scalars())
+    if closed:
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('attempt_id')).values(submitted_at=bindparam('deadline')),
+            [{'attempt_id': attempt_id, 'deadline': deadlines[attempt_id]} for attempt_id in closed]
+        )
+    return closed
+
+
+# Grade one chunk of expired attempts from their autosaved answers and commit it. Reads come first;
+# the write lock is taken at the guarded UPDATE and held only for the writes. Attempts whose user already
+# has a score are closed but not scored. Returns the Score rows written.
+def _sweep_chunk(expired, deadlines):
+    graded_pairs = _graded_pairs(expired)
+    answers = stored_answers([row.id for row in expired if (row.quiz_id, row.user_id) not in graded_pairs])
+    staged = {}
+    for row in expired:
+        if row.id not in answers:
+            continue
+        answer_key = get_answer_key(row.quiz_id, row.version)
+        graded = [(question_id, option, answer_key.get(question_id) == option)
+                  for question_id, option in answers[row.id].items() if question_id in answer_key]
+        score = sum(1 for _, _, is_correct in graded if is_correct)
+        staged[row.id] = ((row.quiz_id, score, graded),
+                          {'quiz_id': row.quiz_id, 'user_id': row.user_id, 'total_score': score,
+                           'attempted_at': deadlines[row.id]})
+
+    closed_ids = _close_attempts({row.id: deadlines[row.id] for row in expired})
+    # Skip attempts submitted between the SELECT and the UPDATE
+    results = [staged[attempt_id][0] for attempt_id in closed_ids if attempt_id in staged]
+    rows = [staged[attempt_id][1] for attempt_id in closed_ids if attempt_id in staged]
+    score_ids = []
+    if rows:
+        score_ids = db.session.scalars(
+            insert(Score.__table__).returning(Score.__table__.c.id, sort_by_parameter_order=True), rows
+        ).all()
+        stats.record_graded(results)
+    db.session.commit()
+    logger.debug("Sweeper closed %d of %d expired attempt(s)", len(closed_ids), len(expired))
+    leaderboards.record([(score_id, row['quiz_id'], row['user_id'], row['total_score'])
+                         for score_id, row in zip(score_ids, rows)])
+    dashboard_summaries.record([(score_id, row['quiz_id'], row['user_id'], row['total_score'], row['attempted_at'])
+                                for score_id, row in zip(score_ids, rows)])
+    return rows
+
+
+# ✅ Close every expired attempt: one SELECT of the expired rows, then per chunk of `chunk_size` a SELECT
+# of their autosaved answers, a guarded UPDATE of their deadlines, one executemany INSERT for their scores,
+# the stats and a commit, so other writers get the lock between chunks. The score is what had been
+# autosaved by the deadline. Only attempts this sweep's UPDATE closed are graded.
+# `settle_seconds` leaves attempts alone until autosaves sent just before the deadline have been flushed.
+def sweep_expired_attempts(now=None, settle_seconds=0, chunk_size=1000):
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    rows = []
+
+    autosave_buffer.flush()  # This process's pending answers first
+    condition = _expired_condition(now - timedelta(seconds=settle_seconds))
+    if condition is not None:
+        expired = db.session.execute(
+            db.select(QuizAttempt.id, QuizAttempt.quiz_id, QuizAttempt.user_id, QuizAttempt.started_at,
+                      Quiz.duration, Quiz.end_time, Quiz.version)
+            .join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+            .where(QuizAttempt.submitted_at.is_(None), condition)
+        ).all()
+        deadlines = {row.id: deadline(row.started_at, row) for row in expired}
+        for start in range(0, len(expired), chunk_size):
+            rows.extend(_sweep_chunk(expired[start:start + chunk_size], deadlines))
+        db.session.commit()  # Ends the read transaction when nothing expired
+
+    closed = len(rows)
+    sweep_counters.record(closed, (time.perf_counter() - started) * 1000, now)
+    if closed:
+        logger.info("Sweeper closed %d expired attempt(s) in %.1f ms", closed, sweep_counters.last_duration_ms)
+    return closed
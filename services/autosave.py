@@ -0,0 +1,130 @@
+import logging
+import threading
+from sqlalchemy import bindparam, delete, insert
+from extensions import db
+from models.quiz import Quiz, QuizAttempt, QuizAnswer
+
+logger = logging.getLogger(__name__)
+
+_answers = QuizAnswer.__table__
+
+
+# ✅ In-memory buffer of in-progress answers: {attempt_id: {question_id: option}}.
+# Later deltas overwrite earlier ones, so a flush writes each question at most once.
+class AutosaveBuffer:
+    def __init__(self, max_pending=5000):
+        self.max_pending = max_pending
+        self.flushes = 0
+        self.rows_written = 0
+        self.deltas_received = 0
+        self._pending = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def __len__(self):
+        return self._size  # Answers waiting for the next flush
+
+    def add(self, attempt_id, answers):
+        with self._lock:
+            current = self._pending.setdefault(attempt_id, {})
+            before = len(current)
+            current.update(answers)
+            self._size += len(current) - before
+            self.deltas_received += len(answers)
+            full = self._size >= self.max_pending
+        if full:
+            self._wakeup.set()  # Flush early instead of waiting for the interval
+
+    def get(self, attempt_id):
+        with self._lock:
+            return dict(self._pending.get(attempt_id, {}))
+
+    # Take the buffered answers of one attempt, e.g. to grade them on submit
+    def pop(self, attempt_id):
+        with self._lock:
+            answers = self._pending.pop(attempt_id, {})
+            self._size -= len(answers)
+            return answers
+
+    def _take_all(self):
+        with self._lock:
+            pending, self._pending, self._size = self._pending, {}, 0
+            return pending
+
+    def _restore(self, pending):
+        with self._lock:
+            for attempt_id, answers in pending.items():
+                self._pending[attempt_id] = {**answers, **self._pending.get(attempt_id, {})}
+            self._size = sum(len(answers) for answers in self._pending.values())
+
+    # ✅ Write everything buffered in one transaction: one SELECT of the attempts that are still open,
+    # one executemany DELETE of the answers being replaced, one executemany INSERT
+    def flush(self):
+        from services.grading import get_answer_key
+
+        pending = self._take_all()
+        if not pending:
+            return 0
+        try:
+            open_attempts = {attempt_id: (quiz_id, version) for attempt_id, quiz_id, version in db.session.execute(
+                db.select(QuizAttempt.id, QuizAttempt.quiz_id, Quiz.version)
+                .join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+                .where(QuizAttempt.id.in_(pending), QuizAttempt.submitted_at.is_(None))
+            )}
+            rows = []
+            for attempt_id, answers in pending.items():
+                if attempt_id not in open_attempts:
+                    continue  # Submitted in the meantime; the submission already has the final answers
+                answer_key = get_answer_key(*open_attempts[attempt_id])
+                rows.extend(
+                    {'attempt_id': attempt_id, 'question_id': question_id, 'selected_option': option,
+                     'is_correct': answer_key.get(question_id) == option}
+                    for question_id, option in answers.items()
+                )
+            write_answers(rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self._restore(pending)
+            raise
+        self.flushes += 1
+        self.rows_written += len(rows)
+        return len(rows)
+
+    def wait(self, timeout):
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+
+# Replace the stored answers for these (attempt_id, question_id) pairs; the caller commits.
+# replace=False skips the DELETE when none of the pairs can exist yet.
+def write_answers(rows, replace=True):
+    if not rows:
+        return
+    if replace:
+        db.session.execute(
+            delete(_answers).where(_answers.c.attempt_id == bindparam('a_id'), _answers.c.question_id == bindparam('q_id')),
+            [{'a_id': row['attempt_id'], 'q_id': row['question_id']} for row in rows]
+        )
+    db.session.execute(insert(_answers), rows)
+
+
+autosave_buffer = AutosaveBuffer()
+
+
+def _flusher(app, interval):
+    while True:
+        autosave_buffer.wait(interval)
+        with app.app_context():
+            try:
+                autosave_buffer.flush()
+            except Exception:
+                logger.exception("Autosave flush failed; answers kept for the next flush")
+
+
+def init_app(app):
+    autosave_buffer.max_pending = app.config['AUTOSAVE_MAX_PENDING']
+    if app.config['AUTOSAVE_FLUSH_INTERVAL']:
+        threading.Thread(target=_flusher, name='autosave-flusher', daemon=True,
+                         args=(app, app.config['AUTOSAVE_FLUSH_INTERVAL'])).start()
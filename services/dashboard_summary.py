@@ -0,0 +1,135 @@
+import threading
+from datetime import datetime
+from extensions import db
+from models.quiz import Quiz
+from models.score import Score
+from services.sampled_log import SampledLogger
+from services.ttl_cache import TTLCache
+
+
+def _percentage(score, max_marks):
+    return round(score / max_marks * 100, 2) if max_marks and score is not None else None
+
+
+# ✅ One line of the dashboard's score table: every attempt of one quiz folded into best / latest
+class QuizSummary:
+    __slots__ = ('quiz_id', 'quiz_name', 'max_marks', 'attempts', 'best_score', 'latest_score', 'latest_at')
+
+    def __init__(self, quiz_id, quiz_name, max_marks):
+        self.quiz_id = quiz_id
+        self.quiz_name = quiz_name
+        self.max_marks = max_marks
+        self.attempts = 0
+        self.best_score = None
+        self.latest_score = None
+        self.latest_at = None
+
+    def add(self, score, attempted_at):
+        self.attempts += 1
+        if score is not None and (self.best_score is None or score > self.best_score):
+            self.best_score = score
+        if self.latest_at is None or (attempted_at is not None and attempted_at >= self.latest_at):
+            self.latest_score, self.latest_at = score, attempted_at
+
+    def copy(self):
+        clone = QuizSummary(self.quiz_id, self.quiz_name, self.max_marks)
+        clone.attempts, clone.best_score = self.attempts, self.best_score
+        clone.latest_score, clone.latest_at = self.latest_score, self.latest_at
+        return clone
+
+    @property
+    def best_percentage(self):
+        return _percentage(self.best_score, self.max_marks)
+
+    @property
+    def latest_percentage(self):
+        return _percentage(self.latest_score, self.max_marks)
+
+
+# ✅ Per-user dashboard summaries, built with one query on a miss and updated write-through after grading.
+# Entries are replaced, never mutated, so a request can keep using the one it read.
+# Scores graded by other processes (the leader's sweeper, queue workers) show up after `ttl` seconds.
+# Each entry keeps the highest Score.id it was built from; record() skips scores at or below it, and a
+# summary built while one of the user's scores was being recorded is not cached.
+class DashboardSummaries:
+    def __init__(self, max_size=10000, ttl=60):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)  # user_id -> (watermark, summary)
+        self._building = 0  # Summaries being built
+        self._recent = {}  # user_id -> highest Score.id recorded while they were built
+        self._lock = threading.Lock()
+
+    def configure(self, max_size, ttl):
+        self._cache.max_size, self._cache.ttl = max_size, ttl
+
+    def __len__(self):
+        return len(self._cache)
+
+    # {quiz_id: QuizSummary}, newest attempt first
+    def get(self, user_id):
+        cached = self._cache.get(user_id)
+        if cached is not None:
+            return cached[1]
+        with self._lock:
+            self._building += 1
+        built = None
+        try:
+            summary, watermark = {}, 0
+            for score_id, quiz_id, name, max_marks, score, attempted_at in db.session.execute(
+                db.select(Score.id, Score.quiz_id, Quiz.name, Quiz.max_marks, Score.total_score, Score.attempted_at)
+                .join(Quiz, Quiz.id == Score.quiz_id)
+                .where(Score.user_id == user_id)
+                .order_by(Score.attempted_at)
+            ):
+                watermark = max(watermark, score_id)
+                if quiz_id not in summary:
+                    summary[quiz_id] = QuizSummary(quiz_id, name, max_marks)
+                summary[quiz_id].add(score, attempted_at)
+            built = dict(sorted(summary.items(), key=lambda item: item[1].latest_at or datetime.min, reverse=True))
+        finally:
+            with self._lock:
+                self._building -= 1
+                # Not cached if one of the user's scores was graded after the query read them
+                if built is not None and self._recent.get(user_id, 0) <= watermark:
+                    self._cache.set(user_id, (watermark, built))
+                if not self._building:
+                    self._recent.clear()
+        return built
+
+    # Apply committed scores [(score_id, quiz_id, user_id, score, attempted_at)] to the summaries that are cached
+    def record(self, scores):
+        with self._lock:
+            if self._building:
+                for score_id, _, user_id, _, _ in scores:
+                    self._recent[user_id] = max(self._recent.get(user_id, 0), score_id)
+            cached = [(row, self._cache.get(row[2])) for row in scores]
+            cached = [(row, entry) for row, entry in cached if entry is not None and row[0] > entry[0]]
+            if not cached:
+                return
+            missing = {quiz_id for (_, quiz_id, _, _, _), (_, summary) in cached if quiz_id not in summary}
+            quizzes = {}
+            if missing:
+                quizzes = {row.id: row for row in db.session.execute(
+                    db.select(Quiz.id, Quiz.name, Quiz.max_marks).where(Quiz.id.in_(missing)))}
+
+            for (_, quiz_id, user_id, score, attempted_at), cached_entry in cached:
+                # A batch can hold several scores of one user
+                watermark, summary = self._cache.get(user_id) or cached_entry
+                entry = summary[quiz_id].copy() if quiz_id in summary else None
+                if entry is None:
+                    if quiz_id not in quizzes:
+                        continue  # Quiz deleted meanwhile
+                    entry = QuizSummary(quiz_id, quizzes[quiz_id].name, quizzes[quiz_id].max_marks)
+                entry.add(score, attempted_at)
+                self._cache.set(user_id, (watermark, {quiz_id: entry,
+                                                      **{k: v for k, v in summary.items() if k != quiz_id}}))
+
+    def forget(self, user_id):
+        self._cache.pop(user_id)
+
+    # Quiz renamed, re-marked or deleted: rebuilt on each user's next visit
+    def clear(self):
+        self._cache.clear()
+
+
+dashboard_summaries = DashboardSummaries()
+dashboard_log = SampledLogger('quiz.dashboard')  # Rate from DASHBOARD_LOG_SAMPLE_RATE
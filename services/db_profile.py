@@ -0,0 +1,93 @@
+import logging
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+# ✅ Per-connection SQLite settings by profile. 'default' keeps SQLite's own behaviour
+# (rollback journal: a writer blocks every reader); 'production' lets readers and a writer work side by side.
+PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',  # Readers see the last commit while a write is in progress
+        'synchronous': 'NORMAL',  # fsync at checkpoints only; a crash can lose the last commits, never corrupt
+        'cache_size': -65536,  # Negative = KiB, so 64 MiB of page cache per connection
+        'mmap_size': 256 * 1024 * 1024,  # Read pages through a memory map instead of read() calls
+        'temp_store': 'MEMORY',  # Sorts and temporary indexes stay off disk
+    },
+}
+
+
+def _is_file_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+# ✅ SQLALCHEMY_ENGINE_OPTIONS for the configured database (or `url`, e.g. the read replica). Pool sizing
+# applies to server databases and SQLite files (an in-memory SQLite database uses a single connection);
+# options set by hand win.
+def engine_options(app, url=None):
+    url = make_url(url or app.config['SQLALCHEMY_DATABASE_URI'])
+    options = {}
+    if url.get_backend_name() != 'sqlite' or _is_file_sqlite(url):
+        options.update(
+            pool_size=app.config['DB_POOL_SIZE'],
+            max_overflow=app.config['DB_MAX_OVERFLOW'],
+            pool_timeout=app.config['DB_POOL_TIMEOUT'],
+            pool_recycle=app.config['DB_POOL_RECYCLE'],
+        )
+    if url.get_backend_name() != 'sqlite':
+        options['pool_pre_ping'] = True  # Drop connections the server closed while they sat in the pool
+    return {**options, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+
+
+def pragmas_for(app):
+    profile = app.config['DB_PROFILE']
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}; expected one of {', '.join(PROFILES)}")
+    pragmas = dict(PROFILES[profile])
+    if profile == 'production':
+        pragmas['busy_timeout'] = app.config['SQLITE_BUSY_TIMEOUT']  # ms a writer waits for the lock before "database is locked"
+    return {**pragmas, **app.config['SQLITE_PRAGMAS']}
+
+
+def is_locked(error):
+    return 'database is locked' in str(getattr(error, 'orig', error))
+
+
+# ✅ Run `write` again, after a rollback, when SQLite stayed locked for the whole busy timeout.
+# `write` must be safe to repeat after a rollback. After DB_LOCKED_RETRIES the OperationalError is raised
+# for the caller to answer "try again".
+def retry_locked(write, *args, **kwargs):
+    retries = current_app.config['DB_LOCKED_RETRIES']
+    for attempt in range(retries + 1):
+        try:
+            return write(*args, **kwargs)
+        except OperationalError as error:
+            db.session.rollback()
+            if attempt == retries or not is_locked(error):
+                raise
+            logger.warning("Database locked in %s; retrying (%d of %d)", write.__name__, attempt + 1, retries)
+
+
+# Run the PRAGMAs on every new DBAPI connection, before the pool hands it out
+def apply_pragmas(engine, pragmas):
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+# ✅ Must run right after db.init_app, before anything opens a connection
+def init_app(app):
+    pragmas = pragmas_for(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_pragmas(engine, pragmas)
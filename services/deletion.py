@@ -0,0 +1,114 @@
+from flask import current_app
+from sqlalchemy import delete
+from extensions import db
+from models.quiz import Subject, Chapter, Quiz, Question, QuizAttempt, QuizAnswer, quiz_questions
+from models.score import Score
+from models.user import User
+from services import stats
+
+
+# ✅ Set-based subtree deletes: a handful of DELETE ... WHERE ... IN (subquery) statements
+# instead of walking relationships in Python. Each function returns the ids of the quizzes it removed
+# so callers can drop cached data for them.
+#
+# With `chunked`, the leaf rows (answers, attempts, scores) go first, in committed chunks. The parent
+# rows (quizzes, questions, chapters, subject, user) and their statistics go last, in one transaction.
+# A delete that fails part-way leaves the tree in place, minus some leaf rows. Running it again
+# finishes the job.
+
+def _delete(table_or_model, condition):
+    return db.session.execute(
+        delete(table_or_model).where(condition).execution_options(synchronize_session=False)
+    ).rowcount
+
+
+# Delete rows in committed chunks so other writers get the lock between chunks. `forget(ids)` takes
+# the rows out of the statistics in the same transaction that deletes them. Without a chunk size,
+# nothing is committed here.
+def _delete_in_chunks(model, condition, chunk_size, forget=None):
+    if not chunk_size:
+        if forget is not None:
+            forget(db.select(model.id).where(condition))
+        return _delete(model, condition)
+
+    total = 0
+    while True:
+        ids = db.session.scalars(db.select(model.id).where(condition).limit(chunk_size)).all()
+        if ids:
+            if forget is not None:
+                forget(ids)
+            total += _delete(model, model.id.in_(ids))
+        db.session.commit()
+        if len(ids) < chunk_size:
+            return total
+
+
+def _chunk_size(chunked):
+    return current_app.config['DELETE_CHUNK_SIZE'] if chunked else None
+
+
+# Leaf rows of whole quizzes and questions; their stats rows are dropped with the parents
+def _delete_leaf_rows(quiz_ids, question_ids, chunk_size):
+    attempt_ids = db.select(QuizAttempt.id).where(QuizAttempt.quiz_id.in_(quiz_ids))
+    _delete_in_chunks(QuizAnswer, QuizAnswer.attempt_id.in_(attempt_ids), chunk_size)
+    _delete_in_chunks(QuizAnswer, QuizAnswer.question_id.in_(question_ids), chunk_size)
+    _delete_in_chunks(QuizAttempt, QuizAttempt.quiz_id.in_(quiz_ids), chunk_size)
+    _delete_in_chunks(Score, Score.quiz_id.in_(quiz_ids), chunk_size)
+
+
+def _delete_parent_rows(quiz_ids, question_ids):
+    if quiz_ids:
+        _delete(quiz_questions, quiz_questions.c.quiz_id.in_(quiz_ids))
+        stats.forget_quizzes(quiz_ids)
+        _delete(Quiz, Quiz.id.in_(quiz_ids))
+    if question_ids:
+        _delete(quiz_questions, quiz_questions.c.question_id.in_(question_ids))
+        stats.forget_questions(question_ids)
+        _delete(Question, Question.id.in_(question_ids))
+
+
+def delete_quiz(quiz_id, chunked=False):
+    _delete_leaf_rows([quiz_id], [], _chunk_size(chunked))
+    _delete_parent_rows([quiz_id], [])
+    db.session.commit()
+    return [quiz_id]
+
+
+def delete_question(question_id, chunked=False):
+    _delete_leaf_rows([], [question_id], _chunk_size(chunked))
+    _delete_parent_rows([], [question_id])
+    db.session.commit()
+
+
+def _delete_chapters(chapter_ids, chunk_size):
+    quiz_ids = db.session.scalars(db.select(Quiz.id).where(Quiz.chapter_id.in_(chapter_ids))).all()
+    question_ids = db.session.scalars(db.select(Question.id).where(Question.chapter_id.in_(chapter_ids))).all()
+    _delete_leaf_rows(quiz_ids, question_ids, chunk_size)
+    _delete_parent_rows(quiz_ids, question_ids)
+    _delete(Chapter, Chapter.id.in_(chapter_ids))
+    return quiz_ids
+
+
+def delete_chapter(chapter_id, chunked=False):
+    quiz_ids = _delete_chapters([chapter_id], _chunk_size(chunked))
+    db.session.commit()
+    return quiz_ids
+
+
+def delete_subject(subject_id, chunked=False):
+    chapter_ids = db.session.scalars(db.select(Chapter.id).where(Chapter.subject_id == subject_id)).all()
+    quiz_ids = _delete_chapters(chapter_ids, _chunk_size(chunked))
+    _delete(Subject, Subject.id == subject_id)
+    db.session.commit()
+    return quiz_ids
+
+
+# A user's answers and scores leave the stats chunk by chunk, with the rows themselves
+def delete_user(user_id, chunked=False):
+    chunk_size = _chunk_size(chunked)
+    attempt_ids = db.select(QuizAttempt.id).where(QuizAttempt.user_id == user_id)
+    _delete_in_chunks(QuizAnswer, QuizAnswer.attempt_id.in_(attempt_ids), chunk_size, stats.forget_answers)
+    _delete_in_chunks(Score, Score.user_id == user_id, chunk_size, stats.forget_scores)
+    _delete_in_chunks(QuizAttempt, QuizAttempt.user_id == user_id, chunk_size)
+    _delete(User, User.id == user_id)
+    db.session.commit()
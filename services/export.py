@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from extensions import db
+from models.quiz import Quiz, Chapter, QuizAttempt, QuizAnswer
+from models.score import Score
+from models.user import User
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+# ✅ Column-only selects (no ORM entities) so nothing piles up in the session's identity map.
+# Each dataset: (select, column that the date range applies to)
+def _datasets():
+    return {
+        'scores': (
+            db.select(Score.id.label('score_id'), Score.quiz_id, Quiz.name.label('quiz_name'),
+                      Chapter.subject_id, Quiz.chapter_id, Score.user_id, User.email.label('user_email'),
+                      Score.total_score, Quiz.max_marks, Score.attempted_at)
+            .join(Quiz, Quiz.id == Score.quiz_id)
+            .outerjoin(Chapter, Chapter.id == Quiz.chapter_id)
+            .join(User, User.id == Score.user_id)
+            .order_by(Score.id),
+            Score.attempted_at,
+        ),
+        'attempts': (
+            db.select(QuizAttempt.id.label('attempt_id'), QuizAttempt.quiz_id, Chapter.subject_id, Quiz.chapter_id,
+                      QuizAttempt.user_id, QuizAttempt.started_at, QuizAttempt.submitted_at)
+            .join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+            .outerjoin(Chapter, Chapter.id == Quiz.chapter_id)
+            .order_by(QuizAttempt.id),
+            QuizAttempt.started_at,
+        ),
+        'answers': (
+            db.select(QuizAnswer.id.label('answer_id'), QuizAnswer.attempt_id, QuizAttempt.quiz_id,
+                      QuizAttempt.user_id, QuizAnswer.question_id, QuizAnswer.selected_option,
+                      QuizAnswer.is_correct, QuizAttempt.submitted_at)
+            .join(QuizAttempt, QuizAttempt.id == QuizAnswer.attempt_id)
+            .join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+            .outerjoin(Chapter, Chapter.id == Quiz.chapter_id)
+            .order_by(QuizAnswer.id),
+            QuizAttempt.submitted_at,
+        ),
+    }
+
+
+DATASETS = ('scores', 'attempts', 'answers')
+
+
+def build_query(dataset, quiz_id=None, chapter_id=None, subject_id=None, since=None, until=None):
+    if dataset not in DATASETS:
+        raise ValueError(f"unknown dataset: {dataset}")
+    stmt, date_column = _datasets()[dataset]
+    if quiz_id:
+        stmt = stmt.where(Quiz.id == quiz_id)
+    if chapter_id:
+        stmt = stmt.where(Quiz.chapter_id == chapter_id)
+    if subject_id:
+        stmt = stmt.where(Chapter.subject_id == subject_id)
+    if since:
+        stmt = stmt.where(date_column >= since)
+    if until:
+        stmt = stmt.where(date_column < until)  # `until` is exclusive
+    return stmt
+
+
+def _value(value):
+    return value.isoformat(sep=' ') if isinstance(value, datetime) else value
+
+
+# ✅ Yields encoded chunks (bytes), one per `yield_per` partition of rows fetched from the cursor.
+# Memory stays at one partition whatever the size of the export.
+def iter_export(stmt, fmt='csv', yield_per=1000):
+    if fmt not in FORMATS:  # Checked up front, before the response starts streaming
+        raise ValueError(f"unsupported export format: {fmt}")
+    return _generate(stmt, fmt, yield_per)
+
+
+def _generate(stmt, fmt, yield_per):
+    result = db.session.execute(stmt.execution_options(yield_per=yield_per))
+    columns = list(result.keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(columns)
+
+    for partition in result.partitions():
+        for row in partition:
+            if writer:
+                writer.writerow([_value(value) for value in row])
+            else:
+                buffer.write(json.dumps(dict(zip(columns, map(_value, row)))) + '\n')
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():  # Header of an empty CSV export
+        yield buffer.getvalue().encode()
+
+
+# e.g. scores_quiz-3.csv
+def export_filename(dataset, fmt, **ids):
+    parts = [dataset] + [f"{name}-{value}" for name, value in ids.items() if value]
+    return '_'.join(parts) + f'.{fmt}'
+
+
+# 'YYYY-MM-DD' -> datetime at midnight, '' -> None; `inclusive_end` moves it to the next day
+def parse_date(value, inclusive_end=False):
+    if not value:
+        return None
+    day = date.fromisoformat(value)
+    start = datetime(day.year, day.month, day.day)
+    return start + timedelta(days=1) if inclusive_end else start
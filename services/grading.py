@@ -0,0 +1,215 @@
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+from extensions import db
+from models.quiz import Quiz, Question, QuizAttempt, QuizAnswer, quiz_questions
+from models.score import Score
+from services.answer_key_cache import answer_key_cache
+from services import stats
+from services.leaderboard import leaderboards
+from services.dashboard_summary import dashboard_summaries
+from services.shuffle import for_attempt
+from services.autosave import autosave_buffer, write_answers
+from services.read_replica import reading_from_primary
+
+
+# ✅ Answer key for a quiz in a single query: {question_id: correct_option}
+def load_answer_key(quiz_id):
+    rows = db.session.execute(
+        db.select(Question.id, Question.correct_option)
+        .join(quiz_questions, quiz_questions.c.question_id == Question.id)
+        .where(quiz_questions.c.quiz_id == quiz_id)
+    ).all()
+    return {question_id: correct_option for question_id, correct_option in rows}
+
+
+def _load_answer_key_from_primary(quiz_id):
+    with reading_from_primary():  # Grading trusts the cache, so never fill it from a lagging replica
+        return load_answer_key(quiz_id)
+
+
+# Current Quiz.version of each quiz, from the primary: {quiz_id: version}
+def quiz_versions(quiz_ids):
+    with reading_from_primary():
+        return dict(db.session.execute(db.select(Quiz.id, Quiz.version).where(Quiz.id.in_(quiz_ids))).all())
+
+
+# ✅ Cached answer key for the quiz's current version; falls back to the database on a miss.
+# Pass `version` when it was already read with the attempt, otherwise it costs one primary-key lookup.
+def get_answer_key(quiz_id, version=None):
+    if version is None:
+        version = quiz_versions([quiz_id]).get(quiz_id)
+    return answer_key_cache.get(quiz_id, version, _load_answer_key_from_primary)
+
+
+# ✅ Grade the submitted form in memory. Only questions that belong to the quiz are kept.
+def grade_answers(answer_key, selected_options):
+    graded = []
+    for question_id, selected_option in selected_options.items():
+        if not question_id.isdecimal():  # Skip hidden fields like quiz_id (and '²', which int() rejects)
+            continue
+        correct_option = answer_key.get(int(question_id))
+        if correct_option is None:
+            continue
+        graded.append((int(question_id), selected_option, selected_option == correct_option))
+    return graded
+
+
+# ✅ Stored answers {attempt_id: {question_id: option}} for a batch of attempts,
+# one query per `chunk_size` attempts to stay under SQLite's bound-parameter limit
+def stored_answers(attempt_ids, chunk_size=1000):
+    attempt_ids = list(attempt_ids)
+    stored = {attempt_id: {} for attempt_id in attempt_ids}
+    for start in range(0, len(attempt_ids), chunk_size):
+        for attempt_id, question_id, option in db.session.execute(
+            db.select(QuizAnswer.attempt_id, QuizAnswer.question_id, QuizAnswer.selected_option)
+            .where(QuizAnswer.attempt_id.in_(attempt_ids[start:start + chunk_size]))
+        ):
+            stored[attempt_id][question_id] = option
+    return stored
+
+
+# Rows to write for a batch: answers replacing a stored answer, answers that are new, and the scores
+class _AnswerWrites:
+    def __init__(self):
+        self.replaced = []
+        self.fresh = []
+        self.scores = []
+
+    # For an attempt that had no id yet when its answers were staged
+    def assign(self, attempt_id):
+        for row in self.replaced + self.fresh:
+            row['attempt_id'] = attempt_id
+
+    # replace_all: the stored answers were read before the write transaction and may have changed since
+    def write(self, replace_all=False):
+        db.session.add_all(self.scores)
+        db.session.flush()  # Score ids, which the leaderboards and dashboard summaries use as watermarks
+        if replace_all:
+            write_answers(self.replaced + self.fresh)
+        else:
+            write_answers(self.replaced)
+            write_answers(self.fresh, replace=False)
+
+
+# Stage the graded answers and the score for an attempt; the caller writes `writes` and commits.
+# The final answers are the autosaved ones overlaid with anything still buffered and then the submitted
+# form; only answers that differ from what is stored are written. Nothing touches the database here.
+# Returns (correct_answers, graded) for the stats.
+def _stage_grading(attempt, answer_key, selected_options, stored, submitted_at, writes):
+    shuffle = for_attempt(attempt)
+    if shuffle is not None:
+        selected_options = shuffle.unshuffle(selected_options)  # Shown letters -> Question.correct_option letters
+    submitted = {question_id: option for question_id, option, _ in grade_answers(answer_key, selected_options)}
+    final = {**stored, **autosave_buffer.get(attempt.id), **submitted}  # Popped once committed
+
+    for question_id, option in final.items():
+        if stored.get(question_id) != option:
+            (writes.replaced if question_id in stored else writes.fresh).append({
+                'attempt_id': attempt.id, 'question_id': question_id,
+                'selected_option': option, 'is_correct': answer_key.get(question_id) == option
+            })
+
+    graded = [(question_id, option, answer_key.get(question_id) == option)
+              for question_id, option in final.items() if question_id in answer_key]
+    correct_answers = sum(1 for _, _, is_correct in graded if is_correct)
+    writes.scores.append(Score(quiz_id=attempt.quiz_id, user_id=attempt.user_id,
+                               total_score=correct_answers, attempted_at=submitted_at))
+    return correct_answers, graded
+
+
+# ✅ Mark an open attempt submitted, only if nobody else has (another tab, another device, the sweeper).
+# Returns False, with the transaction rolled back, if it was already submitted.
+def close_attempt(attempt, submitted_at):
+    closed = db.session.execute(
+        update(QuizAttempt)
+        .where(QuizAttempt.id == attempt.id, QuizAttempt.submitted_at.is_(None))
+        .values(submitted_at=submitted_at)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not closed:
+        db.session.rollback()
+        return False
+    set_committed_value(attempt, 'submitted_at', submitted_at)
+    return True
+
+
+# ✅ Keep a submission that could not be written (the database stayed locked) as autosaved answers,
+# so the reopened paper shows them and the next submit, or the sweeper, counts them
+def keep_answers(attempt, selected_options):
+    answer_key = get_answer_key(attempt.quiz_id)
+    shuffle = for_attempt(attempt)
+    if shuffle is not None:
+        selected_options = shuffle.unshuffle(selected_options)
+    autosave_buffer.add(attempt.id, {question_id: option
+                                     for question_id, option, _ in grade_answers(answer_key, selected_options)})
+
+
+# ✅ Persist answers, score and submission time in one transaction
+# `submitted_at` is the deadline when a late submission is cut off.
+# Returns (attempt, correct_answers), or (attempt, None) if the attempt had already been submitted.
+def submit_attempt(quiz_id, user_id, selected_options, attempt=None, submitted_at=None):
+    now = datetime.utcnow()
+    submitted_at = submitted_at or now
+    new_attempt = attempt is None
+    if new_attempt:
+        attempt = QuizAttempt(user_id=user_id, quiz_id=quiz_id, started_at=now, submitted_at=submitted_at)
+
+    # ⏳ Read and grade first: SQLite holds the write lock from the first write until the commit,
+    # so only the guarded UPDATE (or INSERT) and the batched writes run while it is held
+    answer_key = get_answer_key(quiz_id)
+    stored = {} if new_attempt else stored_answers([attempt.id])[attempt.id]  # Nothing autosaved without an attempt
+    writes = _AnswerWrites()
+    correct_answers, graded = _stage_grading(attempt, answer_key, selected_options, stored, submitted_at, writes)
+
+    if new_attempt:
+        # A concurrent first submission fails the flush on unique_user_quiz_attempt (IntegrityError)
+        db.session.add(attempt)
+        db.session.flush()  # Assigns attempt.id without committing
+        writes.assign(attempt.id)
+    elif not close_attempt(attempt, submitted_at):
+        return attempt, None
+    writes.write(replace_all=not new_attempt)  # An autosave flush may have stored answers since the read
+    stats.record_graded([(attempt.quiz_id, correct_answers, graded)])
+    score_id = writes.scores[0].id
+    db.session.commit()
+    autosave_buffer.pop(attempt.id)
+    leaderboards.record([(score_id, quiz_id, user_id, correct_answers)])
+    dashboard_summaries.record([(score_id, quiz_id, user_id, correct_answers, submitted_at)])
+    return attempt, correct_answers
+
+
+# ✅ Grade a batch of queued submissions [(attempt_id, selected_options)] in one transaction.
+# Attempts that were deleted or already have a score are skipped, so redelivery is harmless.
+def grade_submitted_attempts(submissions):
+    submissions = dict(submissions)
+    if not submissions:
+        return 0
+    attempts = QuizAttempt.query.filter(QuizAttempt.id.in_(submissions)).all()
+    graded_pairs = set(db.session.execute(
+        db.select(Score.quiz_id, Score.user_id)
+        .where(Score.user_id.in_({attempt.user_id for attempt in attempts}),
+               Score.quiz_id.in_({attempt.quiz_id for attempt in attempts}))
+    ).all())
+
+    stored = stored_answers([attempt.id for attempt in attempts])
+    versions = quiz_versions({attempt.quiz_id for attempt in attempts})
+
+    results, scores, writes = [], [], _AnswerWrites()
+    for attempt in attempts:
+        if (attempt.quiz_id, attempt.user_id) in graded_pairs:
+            continue
+        answer_key = get_answer_key(attempt.quiz_id, versions.get(attempt.quiz_id))
+        correct_answers, graded = _stage_grading(attempt, answer_key, submissions[attempt.id],
+                                                 stored[attempt.id], attempt.submitted_at, writes)
+        results.append((attempt.quiz_id, correct_answers, graded))
+        scores.append((attempt.quiz_id, attempt.user_id, correct_answers, attempt.submitted_at))
+    writes.write()  # One executemany per kind of write for the whole batch
+    stats.record_graded(results)
+    scores = [(score.id, *row) for score, row in zip(writes.scores, scores)]
+    db.session.commit()
+    for attempt in attempts:
+        autosave_buffer.pop(attempt.id)
+    leaderboards.record([score[:4] for score in scores])
+    dashboard_summaries.record(scores)
+    return len(results)
@@ -0,0 +1,219 @@
+import threading
+import time
+from sqlalchemy import func
+from extensions import db
+from models.quiz import Quiz, Chapter
+from models.score import Score
+from services.read_replica import reading_from_primary
+
+
+# ✅ Fenwick tree of how many users hold each score, plus the users per score.
+# rank, percentile and updates are O(log max_score); top(n) is O(n log max_score).
+class Ranking:
+    def __init__(self, scores=(), watermark=0):
+        self.watermark = watermark  # Highest Score.id in the loaded scores
+        self.scores = {}  # user_id -> score
+        self.buckets = {}  # score -> {user_id: None}, in the order users reached the score
+        self._size = 64
+        for user_id, score in scores:  # Bulk load: fill the buckets, then build the tree once
+            score = max(int(score or 0), 0)
+            self.scores[user_id] = score
+            self.buckets.setdefault(score, {})[user_id] = None
+        self._grow(max(self.buckets, default=0))
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _add(self, score, delta):
+        i = score + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+
+    # Number of users with a score <= `score`
+    def _count_upto(self, score):
+        i, total = min(score + 1, self._size), 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    # Smallest score s such that _count_upto(s) >= k
+    def _kth(self, k):
+        pos, step = 0, 1 << self._size.bit_length()
+        while step:
+            if pos + step <= self._size and self._tree[pos + step] < k:
+                pos += step
+                k -= self._tree[pos]
+            step >>= 1
+        return pos
+
+    def _grow(self, score):
+        while self._size <= score:
+            self._size *= 2
+        self._tree = [0] * (self._size + 1)
+        for bucket_score, users in self.buckets.items():
+            self._add(bucket_score, len(users))
+
+    def set(self, user_id, score):
+        score = max(int(score or 0), 0)
+        self.remove(user_id)
+        if score >= self._size:
+            self._grow(score)  # Rebuilds the tree at the next power of two
+        self.scores[user_id] = score
+        self.buckets.setdefault(score, {})[user_id] = None
+        self._add(score, 1)
+
+    def remove(self, user_id):
+        score = self.scores.pop(user_id, None)
+        if score is None:
+            return
+        bucket = self.buckets[score]
+        del bucket[user_id]
+        if not bucket:
+            del self.buckets[score]
+        self._add(score, -1)
+
+    # 1-based competition rank (ties share a rank), or None if the user has no score
+    def rank(self, user_id):
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return len(self.scores) - self._count_upto(score) + 1
+
+    # Percentile rank: share of users below, counting ties as half
+    def percentile(self, user_id):
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        below = self._count_upto(score - 1) if score > 0 else 0
+        equal = len(self.buckets[score])
+        return round((below + equal / 2) / len(self.scores) * 100, 2)
+
+    # [(user_id, score, rank)] for the best n scores
+    def top(self, n):
+        result, total = [], len(self.scores)
+        while len(result) < n and len(result) < total:
+            score = self._kth(total - len(result))  # Highest score not yet listed
+            rank = len(result) + 1
+            for user_id in self.buckets[score]:
+                if len(result) == n:
+                    break
+                result.append((user_id, score, rank))
+        return result
+
+
+# ✅ Lazily loaded rankings per quiz and per subject (a user's total over the subject's quizzes).
+# Rankings are updated in place after each graded submission and reloaded after `ttl` seconds
+# so that scores written by other worker processes show up. They are loaded from the primary, since the
+# in-place updates assume the loaded ranking already holds every committed score.
+# A reload runs outside the lock and is swapped in; scores recorded meanwhile are replayed onto it.
+# Score ids only grow (SQLite has one writer), so a score at or below a ranking's watermark is already in it.
+class Leaderboards:
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._quizzes = {}
+        self._subjects = {}
+        self._quiz_subject = {}
+        self._building = 0  # Reloads in progress
+        self._recent = []  # (score_id, quiz_id, subject_id, user_id, score) recorded during those reloads
+        self._generation = 0  # Bumped by invalidations, so a reload that started before one is not kept
+        self._lock = threading.RLock()
+
+    def _fresh(self, ranking):
+        return ranking is not None and time.monotonic() - ranking.loaded_at < self.ttl
+
+    def subject_of(self, quiz_id):
+        if quiz_id not in self._quiz_subject:
+            with reading_from_primary():
+                self._quiz_subject[quiz_id] = db.session.scalar(
+                    db.select(Chapter.subject_id).join(Quiz, Quiz.chapter_id == Chapter.id).where(Quiz.id == quiz_id)
+                )
+        return self._quiz_subject[quiz_id]
+
+    # `statement` yields (score_id, user_id, score) rows, score_id being the newest Score.id behind the score
+    def _load(self, rankings, key, statement, by_subject):
+        with self._lock:
+            ranking = rankings.get(key)
+            if self._fresh(ranking):
+                return ranking
+            self._building += 1
+            start, generation = len(self._recent), self._generation
+        ranking = None
+        try:
+            with reading_from_primary():
+                rows = db.session.execute(statement).all()
+            ranking = Ranking([(user_id, score) for _, user_id, score in rows], max((row[0] for row in rows), default=0))
+        finally:
+            with self._lock:
+                self._building -= 1
+                if ranking is not None and generation == self._generation:
+                    for score_id, quiz_id, subject_id, user_id, score in self._recent[start:]:
+                        if (subject_id if by_subject else quiz_id) == key:
+                            self._apply(ranking, score_id, user_id, score, by_subject)
+                    rankings[key] = ranking
+                if not self._building:
+                    self._recent.clear()
+        return ranking
+
+    def quiz(self, quiz_id):
+        return self._load(self._quizzes, quiz_id, db.select(Score.id, Score.user_id, Score.total_score)
+                          .where(Score.quiz_id == quiz_id), by_subject=False)
+
+    def subject(self, subject_id):
+        return self._load(self._subjects, subject_id, db.select(func.max(Score.id), Score.user_id,
+                                                                func.sum(Score.total_score))
+                          .join(Quiz, Quiz.id == Score.quiz_id)
+                          .join(Chapter, Chapter.id == Quiz.chapter_id)
+                          .where(Chapter.subject_id == subject_id)
+                          .group_by(Score.user_id), by_subject=True)
+
+    @staticmethod
+    def _apply(ranking, score_id, user_id, score, total):
+        if score_id <= ranking.watermark:
+            return  # Committed before the ranking was loaded, so already counted
+        ranking.set(user_id, (ranking.scores.get(user_id) or 0) + score if total else score)
+
+    # Apply committed scores [(score_id, quiz_id, user_id, score)] to the rankings that are loaded
+    def record(self, scores):
+        if not scores:
+            return
+        subjects = {quiz_id: self.subject_of(quiz_id) for _, quiz_id, _, _ in scores}
+        with self._lock:
+            for score_id, quiz_id, user_id, score in scores:
+                ranking = self._quizzes.get(quiz_id)
+                if ranking is not None:
+                    self._apply(ranking, score_id, user_id, score, total=False)
+                subject_ranking = self._subjects.get(subjects[quiz_id])
+                if subject_ranking is not None:
+                    self._apply(subject_ranking, score_id, user_id, score, total=True)
+                if self._building:
+                    self._recent.append((score_id, quiz_id, subjects[quiz_id], user_id, score))
+
+    def invalidate_quiz(self, quiz_id):
+        with self._lock:
+            self._generation += 1
+            self._quizzes.pop(quiz_id, None)
+            self._subjects.pop(self._quiz_subject.pop(quiz_id, None), None)
+
+    def invalidate_subject(self, subject_id):
+        with self._lock:
+            self._generation += 1
+            self._subjects.pop(subject_id, None)
+
+    def remove_user(self, user_id):
+        with self._lock:
+            self._generation += 1
+            for ranking in (*self._quizzes.values(), *self._subjects.values()):
+                ranking.remove(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._quizzes.clear()
+            self._subjects.clear()
+            self._quiz_subject.clear()
+
+
+leaderboards = Leaderboards()
@@ -0,0 +1,233 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from flask import before_render_template, template_rendered, g, has_request_context, request
+from sqlalchemy import event
+from extensions import db
+
+slow_query_logger = logging.getLogger('quiz.slow_query')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+BACKGROUND = 'background'  # Endpoint label for SQL run outside a request (scheduler, workers, flusher)
+
+
+# ✅ Cumulative histogram per label value, rendered in the Prometheus text format
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._series = {}  # label -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, label, value):
+        series = self._series.get(label)
+        if series is None:
+            series = self._series[label] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self, name, label_name):
+        lines = []
+        for label, series in sorted(self._series.items()):
+            for bound, count in zip((*self.buckets, '+Inf'), series):
+                lines.append(f'{name}_bucket{{{label_name}="{label}",le="{bound}"}} {count}')
+            lines.append(f'{name}_count{{{label_name}="{label}"}} {series[-2]}')
+            lines.append(f'{name}_sum{{{label_name}="{label}"}} {series[-1]:.6f}')
+        return lines
+
+
+# ✅ Per-endpoint request, SQL and template timings for this process
+class RequestMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.requests = defaultdict(int)  # (endpoint, method, status) -> count
+        self.sql_statements = defaultdict(int)  # endpoint -> count
+        self.sql_seconds = defaultdict(float)
+        self.template_seconds = defaultdict(float)
+        self.slow_queries = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record_request(self, endpoint, method, status, seconds, sql_count, sql_seconds, template_seconds):
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            self.latency.observe(endpoint, seconds)
+            self.statements.observe(endpoint, sql_count)
+            self.sql_statements[endpoint] += sql_count
+            self.sql_seconds[endpoint] += sql_seconds
+            self.template_seconds[endpoint] += template_seconds
+
+    # SQL outside a request is counted straight away under the "background" endpoint
+    def record_background_sql(self, seconds):
+        with self._lock:
+            self.sql_statements[BACKGROUND] += 1
+            self.sql_seconds[BACKGROUND] += seconds
+
+    def record_slow_query(self, endpoint):
+        with self._lock:
+            self.slow_queries[endpoint] += 1
+
+
+request_metrics = RequestMetrics()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _counter(name, help_text, values, label_names):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+    for labels, value in sorted(values.items()):
+        labels = labels if isinstance(labels, tuple) else (labels,)
+        rendered = ','.join(f'{label}="{_escape(value)}"' for label, value in zip(label_names, labels))
+        lines.append(f'{name}{{{rendered}}} {value:g}' if rendered else f'{name} {value:g}')
+    return lines
+
+
+def _gauges(prefix, values):
+    lines = []
+    for key, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines += [f'# TYPE {prefix}_{key} gauge', f'{prefix}_{key} {value:g}']
+    return lines
+
+
+# ✅ Everything as Prometheus text (exposition format 0.0.4)
+def render():
+    from services.answer_key_cache import answer_key_cache
+    from services.attempt_timer import sweep_counters
+    from services.autosave import autosave_buffer
+    from services.dashboard_summary import dashboard_summaries
+    from services.principal_cache import principal_cache
+    from services.quiz_paper import paper_cache
+
+    metrics = request_metrics
+    with metrics._lock:
+        lines = _counter('quiz_http_requests_total', 'Requests by endpoint, method and status.',
+                         metrics.requests, ('endpoint', 'method', 'status'))
+        lines += ['# HELP quiz_http_request_duration_seconds Request latency by endpoint.',
+                  '# TYPE quiz_http_request_duration_seconds histogram']
+        lines += metrics.latency.render('quiz_http_request_duration_seconds', 'endpoint')
+        lines += ['# HELP quiz_http_request_sql_statements SQL statements per request by endpoint.',
+                  '# TYPE quiz_http_request_sql_statements histogram']
+        lines += metrics.statements.render('quiz_http_request_sql_statements', 'endpoint')
+        lines += _counter('quiz_sql_statements_total', 'SQL statements by endpoint.',
+                          metrics.sql_statements, ('endpoint',))
+        lines += _counter('quiz_sql_seconds_total', 'Time spent executing SQL by endpoint.',
+                          metrics.sql_seconds, ('endpoint',))
+        lines += _counter('quiz_template_render_seconds_total', 'Time spent rendering templates by endpoint.',
+                          metrics.template_seconds, ('endpoint',))
+        lines += _counter('quiz_slow_queries_total', 'Statements slower than SLOW_QUERY_MS by endpoint.',
+                          metrics.slow_queries, ('endpoint',))
+
+    lines += _gauges('quiz_sweeper', sweep_counters.as_dict())
+    lines += _gauges('quiz_autosave', {
+        'flushes': autosave_buffer.flushes,
+        'rows_written': autosave_buffer.rows_written,
+        'deltas_received': autosave_buffer.deltas_received,
+        'pending_answers': len(autosave_buffer),
+    })
+    lines += _gauges('quiz_cache', {
+        'answer_key_bytes': answer_key_cache.size_bytes,
+        'answer_keys': len(answer_key_cache),
+        'principals': len(principal_cache),
+        'papers': len(paper_cache),
+        'dashboard_summaries': len(dashboard_summaries),
+    })
+    return '\n'.join(lines) + '\n'
+
+
+def _endpoint():
+    rule = request.url_rule
+    return rule.endpoint if rule is not None else 'unmatched'  # 404s share one label
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_sql = [0, 0.0]
+    g.metrics_template = [0.0, []]  # total, stack of start times for nested renders
+
+
+def _after_request(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def _teardown_request(exc):
+    started = g.get('metrics_started')
+    if started is None:
+        return
+    sql_count, sql_seconds = g.metrics_sql
+    request_metrics.record_request(
+        _endpoint(), request.method, g.get('metrics_status', 500), time.perf_counter() - started,
+        sql_count, sql_seconds, g.metrics_template[0],
+    )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append((context, time.perf_counter()))
+
+
+def _after_cursor_execute(slow_query_ms, conn, statement):
+    seconds = time.perf_counter() - conn.info['metrics_started'].pop()[1]
+    in_request = has_request_context() and 'metrics_sql' in g
+    if in_request:
+        g.metrics_sql[0] += 1
+        g.metrics_sql[1] += seconds
+    else:
+        request_metrics.record_background_sql(seconds)
+
+    if slow_query_ms is not None and seconds * 1000 >= slow_query_ms:
+        endpoint = _endpoint() if in_request else BACKGROUND
+        request_metrics.record_slow_query(endpoint)
+        slow_query_logger.warning("Slow query (%.1f ms) from %s: %s", seconds * 1000, endpoint, statement)
+
+
+# A statement that raised never reaches after_cursor_execute: drop its start time so the next statement
+# on the connection is not timed from it. Errors fetching rows come here too, after the pop.
+def _handle_error(context):
+    stack = context.connection.info.get('metrics_started') if context.connection is not None else None
+    if stack and stack[-1][0] is context.execution_context:
+        stack.pop()
+
+
+def _before_render(sender, template, context, **extra):
+    if has_request_context() and 'metrics_template' in g:
+        g.metrics_template[1].append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    if has_request_context() and 'metrics_template' in g and g.metrics_template[1]:
+        started = g.metrics_template[1].pop()
+        if not g.metrics_template[1]:  # Nested renders (paper fragments) are part of the outer one
+            g.metrics_template[0] += time.perf_counter() - started
+
+
+def _instrument(engine, slow_query_ms):
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _after_cursor_execute(slow_query_ms, conn, statement)
+
+
+# ✅ Request timing hooks, SQL timing on every engine (replica included) and template timing
+def init_app(app):
+    if not app.config['METRICS_ENABLED']:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+    with app.app_context():
+        engines = [*db.engines.values()]
+    if 'read_replica' in app.extensions:
+        engines.append(app.extensions['read_replica'])
+    for engine in engines:
+        _instrument(engine, app.config['SLOW_QUERY_MS'])
@@ -0,0 +1,67 @@
+from flask import request, current_app
+
+
+# ✅ One page of a keyset (cursor) listing. Cursors are the key column values at the page edges.
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+# ✅ Seek past the cursor on a unique, indexed column instead of using OFFSET,
+# so every page costs the same no matter how deep it is
+def keyset_paginate(query, column, after=None, before=None, per_page=50):
+    if before is not None:
+        rows = query.filter(column < before).order_by(column.desc()).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after is not None:
+            query = query.filter(column > after)
+        rows = query.order_by(column).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = after is not None
+
+    key = column.key
+    next_cursor = getattr(rows[-1], key) if rows and has_next else None
+    prev_cursor = getattr(rows[0], key) if rows and has_prev else None
+    return KeysetPage(rows, next_cursor, prev_cursor)
+
+
+# ✅ Read after / before / per_page from the query string
+def page_args(default_per_page=None, max_per_page=500):
+    per_page = request.args.get('per_page', type=int) or default_per_page or current_app.config['ADMIN_PAGE_SIZE']
+    return {
+        'after': request.args.get('after', type=int),
+        'before': request.args.get('before', type=int),
+        'per_page': max(1, min(per_page, max_per_page)),
+    }
+
+
+# ✅ "starts with" filter (LIKE 'value%') so an index on the column can still be used;
+# wildcards in the user's text are escaped
+def prefix_filter(column, value):
+    return column.startswith(value, autoescape=True)
+
+
+# ✅ '1' / '0' from a select box -> True / False, anything else -> None (no filter)
+def flag_arg(name):
+    value = request.args.get(name, '')
+    return {'1': True, '0': False}.get(value)
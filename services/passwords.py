@@ -0,0 +1,94 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+# Set from PASSWORD_HASH_METHOD / PASSWORD_SALT_LENGTH / PASSWORD_HASH_WORKERS by init_app
+method = 'scrypt:32768:8:1'
+salt_length = 16
+workers = 0
+
+_stored_prefix = None  # How werkzeug writes `method` at the front of a hash, e.g. 'pbkdf2:sha256:1000000'
+_pool = None
+_pool_pid = None  # The process that forked the pool
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+# ✅ Hashing runs in worker processes, so a login storm does not hold the GIL that the other request
+# threads need. init_app forks the pool while the app is being built, before the scheduler, the grading
+# workers and the autosave flusher start their threads: a child forked from a threaded process can
+# inherit a lock that another thread was holding. spawn/forkserver children would re-import the main
+# module (run.py builds the whole app at import), so without fork (Windows), in CLI commands, and in a
+# process forked from the one that built the app, passwords are hashed on the request thread.
+def _start_pool():
+    global _pool, _pool_pid, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid() and _pool_workers == workers:
+            return
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+        _pool.submit(int).result()  # With fork, the first task starts every worker process now
+        _pool_pid, _pool_workers = os.getpid(), workers
+
+
+def _get_pool():
+    if not workers or _pool_pid != os.getpid():
+        return None  # An inherited pool's manager thread did not survive the fork
+    return _pool
+
+
+def _run(function, *args):
+    global _pool
+    pool = _get_pool()
+    if pool is not None:
+        try:
+            return pool.submit(function, *args).result()
+        except BrokenProcessPool:
+            # Not re-forked: by now this process runs threads
+            logger.exception("Password hashing pool died; hashing on the request thread from now on")
+            with _pool_lock:
+                _pool = None
+    return function(*args)
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, method, salt_length)
+
+
+def verify(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+# ✅ A hash made with other parameters (older method, cost or salt length) than the configured ones
+def needs_rehash(password_hash):
+    prefix, _, rest = password_hash.partition('$')
+    salt = rest.partition('$')[0]
+    return prefix != _stored_prefix or len(salt) != salt_length
+
+
+# ✅ After a successful login: re-hash with the current parameters if they changed; the caller commits
+def upgrade(account, password):
+    if not needs_rehash(account.password_hash):
+        return False
+    account.password_hash = hash_password(password)
+    return True
+
+
+def init_app(app):
+    global method, salt_length, workers, _stored_prefix
+    method = app.config['PASSWORD_HASH_METHOD']
+    salt_length = app.config['PASSWORD_SALT_LENGTH']
+    workers = app.config['PASSWORD_HASH_WORKERS']
+    # werkzeug fills in defaults ('pbkdf2' -> 'pbkdf2:sha256:1000000'), so read the prefix off a real hash
+    _stored_prefix = generate_password_hash('', method, 1).partition('$')[0]
+
+    from services.scheduler import serving
+    if workers and serving() and 'fork' in multiprocessing.get_all_start_methods():
+        _start_pool()
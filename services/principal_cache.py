@@ -0,0 +1,65 @@
+from sqlalchemy import event
+from extensions import db
+from services.ttl_cache import TTLCache
+
+principal_cache = TTLCache(max_size=10000, ttl=30)
+
+
+# ✅ Read-only snapshot of a User/Admin row that Flask-Login can use as current_user.
+# It holds column values only, so it can be shared between requests without a session.
+class Principal:
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_type, row):
+        self.user_type = user_type
+        self._columns = {column.key: getattr(row, column.key) for column in row.__table__.columns}
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['_columns'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def is_active(self):
+        return self._columns.get('is_active', True)
+
+    def get_id(self):
+        return str(self.id)
+
+
+def _model(user_type):
+    from models.user import User
+    from models.admin import Admin
+    return {'user': User, 'admin': Admin}[user_type]
+
+
+def load_principal(user_type, principal_id):
+    key = (user_type, principal_id)
+    principal = principal_cache.get(key)
+    if principal is None:
+        row = db.session.get(_model(user_type), principal_id)
+        if row is None:
+            return None
+        principal = Principal(user_type, row)
+        principal_cache.set(key, principal)
+    return principal
+
+
+def invalidate(user_type, principal_id):
+    principal_cache.pop((user_type, principal_id))
+
+
+# ✅ Any flushed change to a user (edit, is_active toggle, delete) drops its cached principal
+def _register_invalidation():
+    from models.user import User
+    from models.admin import Admin
+
+    for model, user_type in ((User, 'user'), (Admin, 'admin')):
+        for event_name in ('after_update', 'after_delete'):
+            event.listen(model, event_name, lambda mapper, connection, target, user_type=user_type:
+                         invalidate(user_type, target.id))
+
+
+_register_invalidation()
@@ -0,0 +1,19 @@
+from sqlalchemy.orm import joinedload, selectinload
+from models.quiz import Quiz, Chapter, Subject
+
+
+# ✅ Quizzes with their chapter and subject in one joined SELECT (user listings)
+def quizzes_with_subject():
+    return Quiz.query.options(joinedload(Quiz.chapter).joinedload(Chapter.subject))
+
+
+# ✅ Same as above plus every chapter of each subject in one extra SELECT (admin edit modals)
+def quizzes_with_subject_chapters():
+    return Quiz.query.options(
+        joinedload(Quiz.chapter).joinedload(Chapter.subject).selectinload(Subject.chapters)
+    )
+
+
+# ✅ Subjects with all their chapters in two SELECTs
+def subjects_with_chapters():
+    return Subject.query.options(selectinload(Subject.chapters))
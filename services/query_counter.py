@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from extensions import db
+
+
+# ✅ Collects every SQL statement sent to the engine while the block runs
+@contextmanager
+def count_queries(engine=None):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = engine or db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# ✅ Fails when the block emits more than `max_queries` statements
+@contextmanager
+def assert_max_queries(max_queries, label='block', engine=None):
+    with count_queries(engine) as statements:
+        yield statements
+    if len(statements) > max_queries:
+        listing = '\n'.join(f'  {i + 1}. {sql}' for i, sql in enumerate(statements))
+        raise QueryBudgetExceeded(f"{label} ran {len(statements)} queries (budget {max_queries}):\n{listing}")
+
+
+# ✅ GET each url with a logged-in test client and check it against its budget.
+# budgets: {url: max_queries}. Returns {url: queries_used}.
+def check_route_budgets(app, client, budgets):
+    used = {}
+    with app.app_context():
+        engine = db.engine
+    for url, max_queries in budgets.items():
+        with assert_max_queries(max_queries, label=url, engine=engine) as statements:
+            response = client.get(url)
+        if response.status_code != 200:
+            raise QueryBudgetExceeded(f"{url} returned {response.status_code}")
+        used[url] = len(statements)
+    return used
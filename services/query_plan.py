@@ -0,0 +1,54 @@
+import re
+from contextlib import contextmanager
+from sqlalchemy import event
+
+SCAN_RE = re.compile(r'\bSCAN (?:TABLE )?(\w+)')
+INDEX_WALK_RE = re.compile(r'\bSCAN (?:TABLE )?\w+ USING (?:COVERING )?INDEX\b')
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+
+# ✅ Records (statement, parameters) for every distinct SQL statement sent to the engine
+@contextmanager
+def capture_statements(engine):
+    captured = {}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        captured.setdefault(statement, parameters)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def explain(engine, statement, parameters):
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+
+
+# A LIMIT query that walks an index in ORDER BY order stops after LIMIT rows ("latest N", keyset pages).
+# Behind a temp B-tree sort, the same walk reads the whole index first.
+def _bounded_index_walk(statement, plan, detail):
+    return (INDEX_WALK_RE.search(detail) is not None and re.search(r'\bLIMIT\b', statement, re.IGNORECASE)
+            and not any('USE TEMP B-TREE FOR ORDER BY' in step for step in plan))
+
+
+# ✅ Statements whose SQLite plan reads a whole table.
+# A scan is accepted when it is a bounded index walk or when allowed(statement, table) says so.
+# Returns [(statement, table, plan)].
+def find_table_scans(engine, captured, allowed=lambda statement, table: False):
+    violations = []
+    for statement, parameters in captured.items():
+        if not statement.lstrip().upper().startswith(EXPLAINABLE):
+            continue
+        plan = explain(engine, statement, parameters)
+        for detail in plan:
+            match = SCAN_RE.search(detail)
+            if match and match.group(1) != 'CONSTANT' and not _bounded_index_walk(statement, plan, detail) \
+                    and not allowed(statement, match.group(1)):
+                violations.append((statement, match.group(1), plan))
+                break
+    return violations
@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+from itertools import islice
+from sqlalchemy import insert
+from extensions import db
+from models.quiz import Chapter, Question
+
+FIELDS = ('question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_option')
+MAX_LENGTHS = {'question_text': 500, 'option_a': 200, 'option_b': 200, 'option_c': 200, 'option_d': 200}
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors = []  # [(line, message)], the first MAX_REPORTED_ERRORS only
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def summary(self):
+        return (f"{self.rows} row(s): {self.inserted} imported, {self.duplicates} duplicate(s) skipped, "
+                f"{self.error_count} error(s)")
+
+
+def detect_format(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+# ✅ Yields (line, row) one at a time; row is a dict, or an error message for unparsable lines
+def iter_rows(stream, fmt):
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as e:
+                yield line, f"invalid JSON: {e}"
+                continue
+            yield line, row if isinstance(row, dict) else "expected a JSON object"
+    else:
+        raise ValueError(f"unsupported import format: {fmt}")
+
+
+# ✅ Normalised Question values, or an error message
+def validate_row(row, chapter_id=None):
+    if isinstance(row, str):
+        return row
+    values = {field: str(row.get(field) or '').strip() for field in FIELDS}
+    missing = [field for field in FIELDS if not values[field]]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    for field, limit in MAX_LENGTHS.items():
+        if len(values[field]) > limit:
+            return f"{field} is longer than {limit} characters"
+    values['correct_option'] = values['correct_option'].upper()
+    if values['correct_option'] not in ('A', 'B', 'C', 'D'):
+        return "correct_option must be one of A, B, C, D"
+
+    raw_chapter = row.get('chapter_id') or chapter_id
+    try:
+        values['chapter_id'] = int(raw_chapter)
+    except (TypeError, ValueError):
+        return "missing or invalid chapter_id"
+    return values
+
+
+# ✅ Dedupe and insert one batch: one lookup for chapters, one for existing questions, one executemany
+def _import_batch(batch, report):
+    chapter_ids = {values['chapter_id'] for _, values in batch}
+    texts = {values['question_text'] for _, values in batch}
+    known_chapters = set(db.session.scalars(db.select(Chapter.id).where(Chapter.id.in_(chapter_ids))))
+    existing = set(db.session.execute(
+        db.select(Question.chapter_id, Question.question_text)
+        .where(Question.chapter_id.in_(chapter_ids), Question.question_text.in_(texts))
+    ).tuples())
+
+    rows = []
+    for line, values in batch:
+        key = (values['chapter_id'], values['question_text'])
+        if values['chapter_id'] not in known_chapters:
+            report.error(line, f"chapter {values['chapter_id']} does not exist")
+        elif key in existing:
+            report.duplicates += 1  # Already in the database or earlier in the file
+        else:
+            existing.add(key)
+            rows.append(values)
+
+    if rows:
+        db.session.execute(insert(Question), rows)
+    db.session.commit()
+    report.inserted += len(rows)
+
+
+# ✅ Stream `stream` (text) into the question bank in batches of `batch_size` rows.
+# Memory stays bounded by the batch size; bad rows are reported and skipped, never fatal.
+def import_questions(stream, fmt='csv', chapter_id=None, batch_size=1000):
+    report = ImportReport()
+    rows = iter_rows(stream, fmt)
+    try:
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                return report
+            batch = []
+            for line, row in chunk:
+                report.rows += 1
+                values = validate_row(row, chapter_id)
+                if isinstance(values, str):
+                    report.error(line, values)
+                else:
+                    batch.append((line, values))
+            if batch:
+                _import_batch(batch, report)
+    except (csv.Error, UnicodeDecodeError) as e:
+        db.session.rollback()
+        report.error(report.rows + 1, f"could not read file: {e}")
+        return report
+
+
+# Uploaded files arrive as binary streams; BOM-tolerant for spreadsheets saved as "CSV UTF-8"
+def text_stream(binary):
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
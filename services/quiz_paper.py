@@ -0,0 +1,90 @@
+import json
+from flask import render_template
+from sqlalchemy import update
+from extensions import db
+from models.quiz import Quiz, Chapter, Subject, Question, quiz_questions
+from services.ttl_cache import TTLCache
+
+# Keyed by (quiz_id, version): an edit bumps the version, so a cached paper is never stale,
+# only unused until the LRU drops it
+paper_cache = TTLCache(max_size=1000, ttl=3600)
+
+
+# ✅ The part of the attempt page that is the same for every candidate, built once per quiz version:
+# a compact payload (no answers), its JSON encoding and the rendered question fragment
+class QuizPaper:
+    def __init__(self, quiz_id, version, payload):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.payload = payload
+        self.json = json.dumps(payload, separators=(',', ':')).encode()
+        self.html = render_template('users/_quiz_paper.html', paper=payload)
+        self.etag = f'quiz-{quiz_id}-v{version}'
+        self._question_html = {}  # (question_id, option order) -> rendered block, for shuffled attempts
+
+    # One question's block with its options in `order` (original letters in display order)
+    def question_html(self, question, order):
+        key = (question['id'], order)
+        html = self._question_html.get(key)
+        if html is None:
+            options = [question['options']['ABCD'.index(letter)] for letter in order]
+            html = self._question_html[key] = render_template(
+                'users/_quiz_question.html', question={**question, 'options': options})
+        return html
+
+
+# Two queries: the quiz with its chapter and subject names, then its questions
+def load_payload(quiz_id):
+    quiz = db.session.execute(
+        db.select(Quiz.id, Quiz.name, Quiz.duration, Quiz.max_marks,
+                  Chapter.name.label('chapter'), Subject.name.label('subject'))
+        .outerjoin(Chapter, Chapter.id == Quiz.chapter_id)
+        .outerjoin(Subject, Subject.id == Chapter.subject_id)
+        .where(Quiz.id == quiz_id)
+    ).one()
+    questions = db.session.execute(
+        db.select(Question.id, Question.question_text, Question.option_a, Question.option_b,
+                  Question.option_c, Question.option_d)
+        .join(quiz_questions, quiz_questions.c.question_id == Question.id)
+        .where(quiz_questions.c.quiz_id == quiz_id)
+        .order_by(Question.id)
+    ).all()
+    return {
+        'id': quiz.id, 'name': quiz.name, 'subject': quiz.subject, 'chapter': quiz.chapter,
+        'duration': quiz.duration, 'max_marks': quiz.max_marks,
+        'questions': [{'id': q.id, 'text': q.question_text, 'options': [q.option_a, q.option_b, q.option_c, q.option_d]}
+                      for q in questions],
+    }
+
+
+def get_paper(quiz_id, version):
+    key = (quiz_id, version)
+    paper = paper_cache.get(key)
+    if paper is None:
+        paper = QuizPaper(quiz_id, version, load_payload(quiz_id))
+        paper_cache.set(key, paper)
+    return paper
+
+
+# ✅ Version bumps, in the caller's transaction. Other processes see the new version on their next read.
+def _bump(condition):
+    db.session.execute(
+        update(Quiz).where(condition).values(version=Quiz.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bump_quiz(quiz_id):
+    _bump(Quiz.id == quiz_id)
+
+
+def bump_question(question_id):
+    _bump(Quiz.id.in_(db.select(quiz_questions.c.quiz_id).where(quiz_questions.c.question_id == question_id)))
+
+
+def bump_chapter(chapter_id):
+    _bump(Quiz.chapter_id == chapter_id)
+
+
+def bump_subject(subject_id):
+    _bump(Quiz.chapter_id.in_(db.select(Chapter.id).where(Chapter.subject_id == subject_id)))
@@ -0,0 +1,103 @@
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g, session
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from extensions import db
+from services import db_profile
+
+logger = logging.getLogger(__name__)
+
+STICKY_KEY = 'db_primary_until'  # Session key: read from the primary until this time after writing
+
+
+# ✅ Reads inside the block go to the replica (when one is configured); writes still go to the primary
+@contextmanager
+def reading_from_replica():
+    previous = g.get('db_route')
+    g.db_route = 'replica'
+    try:
+        yield
+    finally:
+        g.db_route = previous
+
+
+# ✅ Reads inside the block go to the primary, e.g. when filling a cache that later writes rely on
+@contextmanager
+def reading_from_primary():
+    previous = g.get('db_route')
+    g.db_route = 'primary'
+    try:
+        yield
+    finally:
+        g.db_route = previous
+
+
+# ✅ Route a read-heavy view to the replica, unless this visitor wrote something in the last
+# REPLICA_STICKY_SECONDS (read-your-writes, e.g. the redirect to quiz_result after a submission)
+def replica_reads(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get(STICKY_KEY, 0) <= time.time():
+            g.db_route = 'replica'
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _remember_writes(response):
+    if g.get('db_wrote'):
+        session[STICKY_KEY] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+    return response
+
+
+def _resolve(app, url):
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:') \
+            and not os.path.isabs(url.database):
+        os.makedirs(app.instance_path, exist_ok=True)  # Same place Flask-SQLAlchemy puts relative SQLite files
+        url = url.set(database=os.path.join(app.instance_path, url.database))
+    return url
+
+
+def is_snapshot(app):
+    replica = app.extensions.get('read_replica')
+    return (replica is not None and replica.dialect.name == 'sqlite'
+            and make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'sqlite'
+            and bool(app.config['REPLICA_SNAPSHOT_INTERVAL']))
+
+
+# ✅ Copy the primary SQLite file into the replica file with the online backup API.
+# The copy is one consistent snapshot; replica readers wait (busy_timeout) while it is written.
+def refresh_snapshot(app):
+    started = time.perf_counter()
+    source = db.engines[None].raw_connection()
+    target = sqlite3.connect(app.extensions['read_replica'].url.database, timeout=30)
+    try:
+        source.driver_connection.backup(target)
+    finally:
+        target.close()
+        source.close()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info("Read replica snapshot refreshed in %.1f ms", elapsed_ms)
+    return elapsed_ms
+
+
+# ✅ REPLICA_DATABASE_URL binds the replica engine: a second PostgreSQL URL, or a local SQLite file that
+# is refreshed from the primary every REPLICA_SNAPSHOT_INTERVAL seconds. Without it every read uses the primary.
+def init_app(app):
+    app.after_request(_remember_writes)
+    if not app.config['REPLICA_DATABASE_URL']:
+        return
+
+    url = _resolve(app, app.config['REPLICA_DATABASE_URL'])
+    replica = create_engine(url, **db_profile.engine_options(app, url))
+    db_profile.apply_pragmas(replica, db_profile.pragmas_for(app))
+    app.extensions['read_replica'] = replica
+
+    if is_snapshot(app) and not os.path.exists(url.database):
+        with app.app_context():
+            refresh_snapshot(app)  # First start: the replica must have the tables before anything reads it
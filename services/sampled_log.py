@@ -0,0 +1,21 @@
+import json
+import logging
+import random
+
+
+def _format(value):
+    text = str(value)
+    return json.dumps(text) if not text or any(c in text for c in ' "=') else text
+
+
+# ✅ key=value log lines for events that happen on every request, kept for a `rate` share of the calls.
+# The fields also go to handlers as record.event / record.fields, e.g. for a JSON formatter.
+class SampledLogger:
+    def __init__(self, name, rate=0.01):
+        self.logger = logging.getLogger(name)
+        self.rate = rate
+
+    def info(self, event, **fields):
+        if self.rate and random.random() < self.rate and self.logger.isEnabledFor(logging.INFO):
+            self.logger.info('%s %s', event, ' '.join(f'{key}={_format(value)}' for key, value in fields.items()),
+                             extra={'event': event, 'fields': fields})
@@ -0,0 +1,172 @@
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+import click
+from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models.quiz import Quiz
+from models.scheduler import SchedulerLease
+from services.answer_key_cache import answer_key_cache
+from services.attempt_timer import sweep_expired_attempts
+from services.quiz_paper import get_paper
+from services.read_replica import is_snapshot, refresh_snapshot
+from services import session_store
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'quiz-scheduler'
+REPLICA_LEASE_NAME = 'replica-snapshot'
+HOLDER = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+scheduler = None  # BackgroundScheduler once init_app has started it
+
+
+# ✅ Take or renew the leader lease. Returns the lease row if this process is the leader, else None.
+def acquire_lease(ttl, now=None, name=LEASE_NAME):
+    now = now or datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+    renewed = db.session.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name,
+               or_(SchedulerLease.holder == HOLDER, SchedulerLease.expires_at < now))
+        .values(holder=HOLDER, expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not renewed:
+        try:
+            db.session.execute(insert(SchedulerLease).values(name=name, holder=HOLDER, expires_at=expires_at))
+        except IntegrityError:
+            db.session.rollback()  # Another process holds the lease
+            return None
+    db.session.commit()
+    return db.session.get(SchedulerLease, name, populate_existing=True)
+
+
+# ✅ Flip `active` for quizzes whose window opened or closed in (since, now], two UPDATEs.
+# Only boundary crossings are applied, so an admin's manual toggle inside a window is kept.
+def sync_quiz_windows(since, now):
+    activated = db.session.execute(
+        update(Quiz)
+        .where(Quiz.active.is_(False), Quiz.start_time > since, Quiz.start_time <= now, Quiz.end_time > now)
+        .values(active=True).execution_options(synchronize_session=False)
+    ).rowcount
+    deactivated = db.session.execute(
+        update(Quiz)
+        .where(Quiz.active.is_(True), Quiz.end_time > since, Quiz.end_time <= now)
+        .values(active=False).execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return activated, deactivated
+
+
+# ✅ Load the answer keys and papers of quizzes that open within `lead` seconds into this process's caches
+def prewarm(now, lead):
+    from services.grading import load_answer_key
+
+    quizzes = db.session.execute(
+        db.select(Quiz.id, Quiz.version).where(Quiz.start_time > now, Quiz.start_time <= now + timedelta(seconds=lead))
+    ).all()
+    for quiz_id, version in quizzes:
+        answer_key_cache.get(quiz_id, version, load_answer_key)
+        get_paper(quiz_id, version)
+    return len(quizzes)
+
+
+# Leader only: apply window changes since the last run, then close expired attempts
+def run_leader_jobs(lease, now, interval, settle_seconds=0):
+    since = lease.last_run_at or now - timedelta(seconds=interval)
+    activated, deactivated = sync_quiz_windows(since, now)
+    lease.last_run_at = now
+    db.session.commit()
+    finalized = sweep_expired_attempts(now, settle_seconds)
+    if activated or deactivated or finalized:
+        logger.info("Scheduler: %d quiz(zes) activated, %d deactivated, %d attempt(s) finalized",
+                    activated, deactivated, finalized)
+
+
+# ✅ Add one-off jobs for the window boundaries that fall before the next tick,
+# so quizzes open and close on time instead of up to one interval late
+def _schedule_boundaries(app, now):
+    horizon = now + timedelta(seconds=app.config['SCHEDULER_INTERVAL'])
+    boundaries = db.session.execute(
+        db.select(Quiz.start_time, Quiz.end_time)
+        .where(or_(Quiz.start_time.between(now, horizon), Quiz.end_time.between(now, horizon)))
+    ).all()
+    for run_at in {moment for row in boundaries for moment in row if now < moment <= horizon}:
+        scheduler.add_job(_leader_tick, 'date', run_date=run_at, args=(app,),
+                          id=f'boundary-{run_at.isoformat()}', replace_existing=True)
+
+
+def _leader_tick(app, schedule=False):
+    with app.app_context():
+        try:
+            now = datetime.utcnow()
+            lease = acquire_lease(app.config['SCHEDULER_LEASE_TTL'], now)
+            if lease is not None:
+                # Late submissions and the last autosaves get the grace period plus one flush to arrive
+                settle = app.config['ATTEMPT_GRACE_SECONDS'] + (app.config['AUTOSAVE_FLUSH_INTERVAL'] or 0)
+                run_leader_jobs(lease, now, app.config['SCHEDULER_INTERVAL'], settle)
+                if schedule:
+                    _schedule_boundaries(app, now)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Scheduler tick failed")
+
+
+# One process at a time copies the primary into the SQLite snapshot replica
+def _replica_tick(app):
+    with app.app_context():
+        try:
+            interval = app.config['REPLICA_SNAPSHOT_INTERVAL']
+            if acquire_lease(interval * 3, name=REPLICA_LEASE_NAME) is not None:
+                refresh_snapshot(app)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Read replica refresh failed")
+
+
+# The session store is local to this host, so any process may purge it; the DELETE is idempotent
+def _purge_sessions_tick(app):
+    try:
+        session_store.purge_expired()
+    except Exception:
+        logger.exception("Session purge failed")
+
+
+# Every process: keep its own caches warm, then try to act as the leader
+def _tick(app):
+    with app.app_context():
+        try:
+            prewarm(datetime.utcnow(), app.config['SCHEDULER_PREWARM_LEAD'])
+        except Exception:
+            db.session.rollback()
+            logger.exception("Cache pre-warm failed")
+    _leader_tick(app, schedule=True)
+
+
+# `flask db upgrade`, `flask import-questions` and the other commands build the app too, but only a
+# serving process (run.py, `flask run`, a WSGI server) should start the scheduler and other background threads
+def serving():
+    ctx = click.get_current_context(silent=True)
+    return ctx is None or ctx.info_name == 'run'
+
+
+def init_app(app):
+    global scheduler
+    if not app.config['SCHEDULER_ENABLED'] or not serving():
+        return
+
+    scheduler = BackgroundScheduler(timezone='UTC', job_defaults={'coalesce': True, 'misfire_grace_time': 60})
+    scheduler.add_job(_tick, 'interval', seconds=app.config['SCHEDULER_INTERVAL'], args=(app,),
+                      id='tick', next_run_time=datetime.utcnow())
+    if is_snapshot(app):
+        scheduler.add_job(_replica_tick, 'interval', seconds=app.config['REPLICA_SNAPSHOT_INTERVAL'],
+                          args=(app,), id='replica-snapshot')
+    if session_store.session_store is not None:
+        scheduler.add_job(_purge_sessions_tick, 'interval', seconds=app.config['SESSION_PURGE_INTERVAL'],
+                          args=(app,), id='purge-sessions')
+    scheduler.start()
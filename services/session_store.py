@@ -0,0 +1,292 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+session_store = None  # Set by init_app unless SESSION_BACKEND == 'cookie'
+session_cache = TTLCache(max_size=10000, ttl=3600)  # key -> (version, decoded data, expires_at)
+
+SID_BYTES = 32
+SID_LENGTH = 43  # token_urlsafe(32): the cookie is always this long
+
+
+def _key(sid):
+    return hashlib.sha256(sid.encode()).hexdigest()  # A leaked store does not leak usable cookies
+
+
+# ✅ "user:42" / "admin:1", the account a session belongs to, so its sessions can be revoked together
+def _principal(data):
+    if data.get('user_type') and data.get('user_id'):
+        return f"{data['user_type']}:{data['user_id']}"
+    return None
+
+
+# ✅ Sessions in their own SQLite file, like the submission queue, so they never wait on the main database
+class SQLiteSessionStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS session ('
+            ' key TEXT PRIMARY KEY,'
+            ' payload TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' principal TEXT,'
+            ' version INTEGER NOT NULL DEFAULT 0)'
+        )
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(session)')}
+        if 'version' not in columns:  # Session files created before the version check
+            conn.execute('ALTER TABLE session ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_session_expires_at ON session (expires_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_session_principal ON session (principal)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')  # A session lost in a power cut only means logging in again
+            self._local.conn = conn
+        return conn
+
+    # (payload, expires_at, principal, version) or None
+    def load(self, key):
+        return self._connect().execute(
+            'SELECT payload, expires_at, principal, version FROM session WHERE key = ? AND expires_at > ?',
+            (key, time.time())
+        ).fetchone()
+
+    # Bumped by every save, so a reader can tell whether its decoded copy is still current
+    def version(self, key):
+        row = self._connect().execute(
+            'SELECT version FROM session WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def save(self, key, payload, expires_at, principal):
+        self._connect().execute(
+            'INSERT INTO session (key, payload, expires_at, principal) VALUES (?, ?, ?, ?)'
+            ' ON CONFLICT (key) DO UPDATE SET payload = excluded.payload, expires_at = excluded.expires_at,'
+            ' principal = excluded.principal, version = session.version + 1',
+            (key, payload, expires_at, principal)
+        )
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM session WHERE key = ?', (key,))
+
+    def revoke(self, principal):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            keys = [key for key, in conn.execute('SELECT key FROM session WHERE principal = ?', (principal,))]
+            conn.execute('DELETE FROM session WHERE principal = ?', (principal,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return keys
+
+    def purge_expired(self, now=None):
+        return self._connect().execute(
+            'DELETE FROM session WHERE expires_at <= ?', (now or time.time(),)
+        ).rowcount
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM session').fetchone()[0]
+
+
+# ✅ One JSON file per session. Revoking and purging scan the directory, so prefer SQLite for many sessions.
+class FilesystemSessionStore:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _read(self, key):
+        try:
+            with open(os.path.join(self.directory, key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _entries(self):
+        for key in os.listdir(self.directory):
+            if not key.endswith('.tmp'):
+                entry = self._read(key)
+                if entry is not None:
+                    yield key, entry
+
+    def load(self, key):
+        version = self.version(key)  # Before the read: a file replaced in between only looks older
+        entry = self._read(key)
+        if entry is None or entry['expires_at'] <= time.time():
+            return None
+        return entry['payload'], entry['expires_at'], entry['principal'], version
+
+    # Every save replaces the file, so its mtime and inode change
+    def version(self, key):
+        try:
+            stat = os.stat(os.path.join(self.directory, key))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino
+
+    def save(self, key, payload, expires_at, principal):
+        path = os.path.join(self.directory, key)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'payload': payload, 'expires_at': expires_at, 'principal': principal}, f)
+        os.replace(temp_path, path)  # Readers never see a half-written file
+
+    def delete(self, key):
+        try:
+            os.remove(os.path.join(self.directory, key))
+        except FileNotFoundError:
+            pass
+
+    def revoke(self, principal):
+        keys = [key for key, entry in self._entries() if entry['principal'] == principal]
+        for key in keys:
+            self.delete(key)
+        return keys
+
+    def purge_expired(self, now=None):
+        now = now or time.time()
+        keys = [key for key, entry in self._entries() if entry['expires_at'] <= now]
+        for key in keys:
+            self.delete(key)
+        return len(keys)
+
+    def __len__(self):
+        return sum(1 for key in os.listdir(self.directory) if not key.endswith('.tmp'))
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.modified = False
+        self.rotate = False
+
+    # Login and logout start with session.clear(): the next save issues a fresh id (no session fixation)
+    def clear(self):
+        super().clear()
+        self.rotate = True
+
+
+# ✅ The cookie holds only a random session id; the data lives in the store. Each process keeps the most
+# recently used sessions decoded in memory and reuses one only while the store still has the same version,
+# so no worker serves a session another worker has since rewritten or revoked.
+class ServerSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()  # Same encoding as Flask's cookie sessions (tuples in _flashes etc.)
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and len(sid) == SID_LENGTH:
+            entry = self._load(_key(sid))
+            if entry is not None and entry[2] > time.time():
+                return ServerSession(copy.deepcopy(entry[1]), sid, entry[2])  # Requests may change nested values
+        return ServerSession()
+
+    # (version, data, expires_at): a version lookup when this process has the session decoded, else a full read
+    def _load(self, key):
+        cached = session_cache.get(key)
+        if cached is not None and self.store.version(key) == cached[0]:
+            return cached
+        entry = self.store.load(key)
+        if entry is None:
+            session_cache.pop(key)
+            return None
+        cached = (entry[3], self.serializer.loads(entry[0]), entry[1])
+        session_cache.set(key, cached)
+        return cached
+
+    def _forget(self, sid):
+        key = _key(sid)
+        self.store.delete(key)
+        session_cache.pop(key)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.sid is not None:
+                self._forget(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = time.time()
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        # Sliding expiry, written back at most once per half lifetime for sessions that only read
+        stale = session.sid is not None and session.expires_at - now < lifetime / 2
+        response.vary.add('Cookie')
+        if not (session.sid is None or session.modified or session.rotate or stale):
+            return
+
+        if session.rotate and session.sid is not None:
+            self._forget(session.sid)
+        if session.sid is None or session.rotate:
+            session.sid = secrets.token_urlsafe(SID_BYTES)
+
+        key = _key(session.sid)
+        self.store.save(key, self.serializer.dumps(dict(session)), now + lifetime, _principal(session))
+        session_cache.pop(key)  # Read back, with its new version, on the next request
+        response.set_cookie(
+            name, session.sid, expires=self.get_expiration_time(app, session), httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path, secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app),
+        )
+
+
+# ✅ Log an account out everywhere, e.g. when an admin deletes it
+def revoke(user_type, principal_id):
+    if session_store is None:
+        return 0
+    return len(session_store.revoke(f'{user_type}:{principal_id}'))
+
+
+def purge_expired():
+    if session_store is None:
+        return 0
+    purged = session_store.purge_expired()
+    if purged:
+        logger.info("Purged %d expired sessions", purged)
+    return purged
+
+
+def init_app(app):
+    global session_store
+    backend = app.config['SESSION_BACKEND']
+    if backend == 'cookie':
+        return  # Flask's signed cookie sessions
+
+    session_cache.max_size = app.config['SESSION_CACHE_SIZE']
+    session_cache.ttl = app.permanent_session_lifetime.total_seconds()
+    path = app.config['SESSION_STORE_PATH']
+    if backend == 'sqlite':
+        path = path or os.path.join(app.instance_path, 'sessions.db')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        session_store = SQLiteSessionStore(path)
+    elif backend == 'filesystem':
+        session_store = FilesystemSessionStore(path or os.path.join(app.instance_path, 'sessions'))
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND {backend!r}; use 'sqlite', 'filesystem' or 'cookie'")
+    app.session_interface = ServerSessionInterface(session_store)
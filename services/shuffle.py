@@ -0,0 +1,76 @@
+from itertools import permutations
+from services.ttl_cache import TTLCache
+
+LETTERS = 'ABCD'
+_PERMUTATIONS = [''.join(p) for p in permutations(LETTERS)]  # All 24 orders of A-D
+_MASK = (1 << 64) - 1
+
+# Arranged question lists per (seed, quiz_id, version), so a reload does not sort again
+_arranged_cache = TTLCache(max_size=20000, ttl=3600)
+
+
+# SplitMix64 finaliser: a cheap, well-mixed hash of (seed, value)
+def _mix(seed, value):
+    z = (seed * 0x9E3779B97F4A7C15 + value) & _MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+    return z ^ (z >> 31)
+
+
+# ✅ Deterministic per-attempt shuffle derived from QuizAttempt.seed.
+# Every question gets its own option order from hash(seed, question_id), so mapping an answer back is
+# O(1) and does not depend on the other questions (adding one to the quiz leaves the rest unchanged).
+class AttemptShuffle:
+    def __init__(self, seed):
+        self.seed = seed
+
+    # Original letters in display order: option_order(q)[i] is the option shown at position i
+    def option_order(self, question_id):
+        return _PERMUTATIONS[_mix(self.seed, question_id) % 24]
+
+    def question_order(self, question_ids):
+        return sorted(question_ids, key=lambda question_id: _mix(~self.seed & _MASK, question_id))
+
+    # Letter the candidate clicked -> letter of that option on the Question row
+    def to_original(self, question_id, shown_letter):
+        position = LETTERS.find(shown_letter)
+        if position < 0 or len(shown_letter) != 1:
+            return shown_letter  # Not an option letter; grading treats it as wrong
+        return self.option_order(question_id)[position]
+
+    # Letter on the Question row -> letter the candidate sees, e.g. to restore autosaved answers
+    def to_shown(self, question_id, original_letter):
+        order = self.option_order(question_id)
+        return LETTERS[order.index(original_letter)] if original_letter in order else original_letter
+
+    # Map a submitted form {question_id: shown letter} back to original letters; other fields untouched
+    def unshuffle(self, selected_options):
+        return {
+            key: self.to_original(int(key), value) if key.isdecimal() else value
+            for key, value in selected_options.items()
+        }
+
+    # The cached paper's questions in this attempt's order, each with its options reordered
+    def arrange(self, paper):
+        key = (self.seed, paper.quiz_id, paper.version)
+        arranged = _arranged_cache.get(key)
+        if arranged is None:
+            by_id = {question['id']: question for question in paper.payload['questions']}
+            arranged = []
+            for question_id in self.question_order(by_id):
+                question = by_id[question_id]
+                order = self.option_order(question_id)
+                arranged.append({**question, 'options': [question['options'][LETTERS.index(letter)] for letter in order]})
+            _arranged_cache.set(key, arranged)
+        return arranged
+
+
+    # The attempt page fragment, joined from blocks the paper renders once per (question, option order)
+    def render(self, paper):
+        by_id = {question['id']: question for question in paper.payload['questions']}
+        return '\n'.join(paper.question_html(by_id[question_id], self.option_order(question_id))
+                         for question_id in self.question_order(by_id))
+
+
+def for_attempt(attempt):
+    return AttemptShuffle(attempt.seed) if attempt is not None and attempt.seed is not None else None
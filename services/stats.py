@@ -0,0 +1,182 @@
+from collections import Counter, defaultdict
+from sqlalchemy import and_, case, delete, func, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models.quiz import QuizAttempt, QuizAnswer, Question
+from models.score import Score
+from models.stats import QuizStats, QuizScoreBucket, QuestionStats
+
+_UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+# Answers reach the stats when their attempt is graded (submitted, with a Score for that quiz and user);
+# the autosaved answers of an open attempt do not count yet
+def _graded_attempt():
+    return and_(QuizAttempt.submitted_at.is_not(None),
+                db.select(Score.id)
+                .where(Score.quiz_id == QuizAttempt.quiz_id, Score.user_id == QuizAttempt.user_id).exists())
+
+
+# ✅ Add `rows` ({column: value}) to counters keyed by `keys`, creating missing rows.
+# One batched INSERT ... ON CONFLICT DO UPDATE per table on SQLite/PostgreSQL.
+def _increment(model, keys, rows):
+    if not rows:
+        return
+    table = model.__table__
+    counters = [column for column in rows[0] if column not in keys]
+    dialect_insert = _UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+
+    if dialect_insert is not None:
+        # executemany keeps the compiled statement cacheable whatever the number of rows
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={column: table.c[column] + stmt.excluded[column] for column in counters}
+        )
+        db.session.execute(stmt, rows)
+        return
+
+    for row in rows:  # Portable fallback: UPDATE, then INSERT when the row does not exist yet
+        result = db.session.execute(
+            update(table).where(*(table.c[key] == row[key] for key in keys))
+            .values({column: table.c[column] + row[column] for column in counters})
+        )
+        if result.rowcount == 0:
+            db.session.execute(insert(table).values(row))
+
+
+def _apply(quiz_totals, buckets, question_totals):
+    _increment(QuizStats, ['quiz_id'], [
+        {'quiz_id': quiz_id, 'attempts': attempts, 'total_score': total}
+        for quiz_id, (attempts, total) in quiz_totals.items()
+    ])
+    _increment(QuizScoreBucket, ['quiz_id', 'score'], [
+        {'quiz_id': quiz_id, 'score': score, 'count': count}
+        for (quiz_id, score), count in buckets.items()
+    ])
+    _increment(QuestionStats, ['quiz_id', 'question_id'], [
+        {'quiz_id': quiz_id, 'question_id': question_id, 'answered': answered, 'correct': correct}
+        for (quiz_id, question_id), (answered, correct) in question_totals.items()
+    ])
+
+
+# ✅ Fold freshly graded attempts into the stats, in the caller's transaction.
+# results: [(quiz_id, score, [(question_id, selected_option, is_correct), ...])]
+def record_graded(results):
+    quiz_totals = defaultdict(lambda: [0, 0])
+    buckets = Counter()
+    question_totals = defaultdict(lambda: [0, 0])
+    for quiz_id, score, graded in results:
+        quiz_totals[quiz_id][0] += 1
+        quiz_totals[quiz_id][1] += score
+        buckets[(quiz_id, score)] += 1
+        for question_id, _, is_correct in graded:
+            question_totals[(quiz_id, question_id)][0] += 1
+            question_totals[(quiz_id, question_id)][1] += int(is_correct)
+    _apply(quiz_totals, buckets, question_totals)
+
+
+# ✅ Subtract scores (ids, or a select of ids) from the stats, in the transaction that deletes them
+def forget_scores(score_ids):
+    quiz_totals, buckets = {}, Counter()
+    for quiz_id, score, count in db.session.execute(
+        db.select(Score.quiz_id, Score.total_score, func.count())
+        .where(Score.id.in_(score_ids)).group_by(Score.quiz_id, Score.total_score)
+    ):
+        score = score or 0
+        attempts, total = quiz_totals.get(quiz_id, (0, 0))
+        quiz_totals[quiz_id] = (attempts - count, total - score * count)
+        buckets[(quiz_id, score)] -= count
+    _apply(quiz_totals, buckets, {})
+
+
+# ✅ Subtract answers (ids, or a select of ids) from the stats, in the transaction that deletes them.
+# Delete the answers before the scores, so graded attempts are still recognised.
+def forget_answers(answer_ids):
+    question_totals = {
+        (quiz_id, question_id): (-answered, -(correct or 0))
+        for quiz_id, question_id, answered, correct in db.session.execute(
+            db.select(QuizAttempt.quiz_id, QuizAnswer.question_id, func.count(),
+                      func.sum(case((QuizAnswer.is_correct, 1), else_=0)))
+            .join(QuizAttempt, QuizAttempt.id == QuizAnswer.attempt_id)
+            .where(QuizAnswer.id.in_(answer_ids), _graded_attempt())
+            .group_by(QuizAttempt.quiz_id, QuizAnswer.question_id)
+        )
+    }
+    _apply({}, Counter(), question_totals)
+
+
+def forget_quizzes(quiz_ids):
+    for model in (QuizStats, QuizScoreBucket, QuestionStats):
+        db.session.execute(delete(model).where(model.quiz_id.in_(quiz_ids)))
+
+
+def forget_questions(question_ids):
+    db.session.execute(delete(QuestionStats).where(QuestionStats.question_id.in_(question_ids)))
+
+
+# ✅ Recompute everything from Score and QuizAnswer with three INSERT ... SELECT statements
+def rebuild():
+    for model in (QuizStats, QuizScoreBucket, QuestionStats):
+        db.session.execute(delete(model))
+
+    db.session.execute(insert(QuizStats).from_select(
+        ['quiz_id', 'attempts', 'total_score'],
+        db.select(Score.quiz_id, func.count(), func.coalesce(func.sum(Score.total_score), 0)).group_by(Score.quiz_id)
+    ))
+    db.session.execute(insert(QuizScoreBucket).from_select(
+        ['quiz_id', 'score', 'count'],
+        db.select(Score.quiz_id, func.coalesce(Score.total_score, 0), func.count())
+        .group_by(Score.quiz_id, func.coalesce(Score.total_score, 0))
+    ))
+    db.session.execute(insert(QuestionStats).from_select(
+        ['quiz_id', 'question_id', 'answered', 'correct'],
+        db.select(QuizAttempt.quiz_id, QuizAnswer.question_id, func.count(),
+                  func.sum(case((QuizAnswer.is_correct, 1), else_=0)))
+        .join(QuizAttempt, QuizAttempt.id == QuizAnswer.attempt_id)
+        .where(_graded_attempt())
+        .group_by(QuizAttempt.quiz_id, QuizAnswer.question_id)
+    ))
+    db.session.commit()
+
+
+def attempt_counts(quiz_ids):
+    return dict(db.session.execute(
+        db.select(QuizStats.quiz_id, QuizStats.attempts).where(QuizStats.quiz_id.in_(quiz_ids))
+    ).all())
+
+
+def _median(buckets):
+    total = sum(count for _, count in buckets)
+    if not total:
+        return 0
+    middle, seen, lower = (total - 1) // 2, 0, None
+    for score, count in buckets:  # Buckets are sorted by score
+        if lower is None and seen + count > middle:
+            lower = score
+        if seen + count > total // 2:
+            return lower if total % 2 else (lower + score) / 2
+        seen += count
+
+
+# ✅ Everything the analytics page needs, in three queries
+def quiz_summary(quiz_id):
+    stats = db.session.get(QuizStats, quiz_id)
+    buckets = db.session.execute(
+        db.select(QuizScoreBucket.score, QuizScoreBucket.count)
+        .where(QuizScoreBucket.quiz_id == quiz_id, QuizScoreBucket.count > 0)
+        .order_by(QuizScoreBucket.score)
+    ).all()
+    questions = db.session.execute(
+        db.select(Question.question_text, QuestionStats)
+        .join(Question, Question.id == QuestionStats.question_id)
+        .where(QuestionStats.quiz_id == quiz_id)
+        .order_by(QuestionStats.question_id)
+    ).all()
+    return {
+        'attempts': stats.attempts if stats else 0,
+        'mean': stats.mean_score() if stats else 0,
+        'median': _median(buckets),
+        'histogram': buckets,
+        'questions': questions,
+    }
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from extensions import db
+from models.quiz import QuizAttempt
+from services.scheduler import serving
+
+logger = logging.getLogger(__name__)
+
+submission_queue = None  # Set by init_app when SUBMISSION_MODE == 'queued'
+
+
+# ✅ Durable FIFO of raw answer payloads, stored in its own SQLite file so that
+# enqueueing never waits on the main database's writer lock.
+# An item that fails `max_tries` times is dead-lettered (failed_at set): kept, but no longer claimed.
+class SubmissionQueue:
+    def __init__(self, path, claim_timeout=300, max_tries=5):
+        self.path = path
+        self.claim_timeout = claim_timeout  # Seconds before a claimed but unacked item is redelivered
+        self.max_tries = max_tries
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS submission ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' attempt_id INTEGER NOT NULL UNIQUE,'
+            ' payload TEXT NOT NULL,'
+            ' enqueued_at REAL NOT NULL,'
+            ' claimed_by TEXT,'
+            ' claimed_at REAL,'
+            ' tries INTEGER NOT NULL DEFAULT 0,'
+            ' failed_at REAL)'
+        )
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(submission)')}
+        if 'tries' not in columns:  # Queue files created before dead-lettering
+            conn.execute('ALTER TABLE submission ADD COLUMN tries INTEGER NOT NULL DEFAULT 0')
+            conn.execute('ALTER TABLE submission ADD COLUMN failed_at REAL')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            self._local.conn = conn
+        return conn
+
+    # A second put for the same attempt (a retry after a failed commit) replaces the first
+    def put(self, attempt_id, selected_options):
+        self._connect().execute(
+            'INSERT INTO submission (attempt_id, payload, enqueued_at) VALUES (?, ?, ?)'
+            ' ON CONFLICT (attempt_id) DO UPDATE SET payload = excluded.payload, enqueued_at = excluded.enqueued_at,'
+            ' claimed_by = NULL, claimed_at = NULL, tries = 0, failed_at = NULL',
+            (attempt_id, json.dumps(selected_options), time.time())
+        )
+
+    # Claim up to `limit` items atomically across threads and processes
+    def claim(self, limit):
+        conn = self._connect()
+        token = uuid.uuid4().hex
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'UPDATE submission SET claimed_by = ?, claimed_at = ? WHERE id IN ('
+                ' SELECT id FROM submission WHERE failed_at IS NULL AND (claimed_at IS NULL OR claimed_at < ?)'
+                ' ORDER BY id LIMIT ?)',
+                (token, now, now - self.claim_timeout, limit)
+            )
+            rows = conn.execute(
+                'SELECT id, attempt_id, payload FROM submission WHERE claimed_by = ? ORDER BY id', (token,)
+            ).fetchall()
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return [(item_id, attempt_id, json.loads(payload)) for item_id, attempt_id, payload in rows]
+
+    def ack(self, item_ids):
+        if item_ids:
+            placeholders = ','.join('?' * len(item_ids))
+            self._connect().execute(f'DELETE FROM submission WHERE id IN ({placeholders})', list(item_ids))
+
+    # Hand claimed items back without counting a try; they can be claimed again after `delay` seconds
+    def release(self, item_ids, delay):
+        if item_ids:
+            placeholders = ','.join('?' * len(item_ids))
+            self._connect().execute(
+                f'UPDATE submission SET claimed_by = NULL, claimed_at = ? WHERE id IN ({placeholders})',
+                [time.time() + delay - self.claim_timeout, *item_ids]
+            )
+
+    # A claimed item that could not be graded: back to the queue, or dead-lettered after max_tries.
+    # Returns True if it was dead-lettered.
+    def fail(self, item_id):
+        conn = self._connect()
+        conn.execute(
+            'UPDATE submission SET claimed_by = NULL, claimed_at = NULL, tries = tries + 1,'
+            ' failed_at = CASE WHEN tries + 1 >= ? THEN ? END WHERE id = ?',
+            (self.max_tries, time.time(), item_id)
+        )
+        row = conn.execute('SELECT failed_at FROM submission WHERE id = ?', (item_id,)).fetchone()
+        return row is not None and row[0] is not None
+
+    # Put dead-lettered items back in the queue, e.g. after fixing what made them fail
+    def requeue_failed(self):
+        return self._connect().execute(
+            'UPDATE submission SET tries = 0, failed_at = NULL WHERE failed_at IS NOT NULL'
+        ).rowcount
+
+    def failed_count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM submission WHERE failed_at IS NOT NULL').fetchone()[0]
+
+    # Dead-lettered submissions still count as pending: their attempts have no score yet
+    def is_pending(self, attempt_id):
+        row = self._connect().execute('SELECT 1 FROM submission WHERE attempt_id = ?', (attempt_id,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM submission WHERE failed_at IS NULL').fetchone()[0]
+
+
+# ✅ Mark the attempt as submitted (keeps unique_user_quiz_attempt) and queue the raw answers.
+# The answers are queued before the commit, while the guarded UPDATE holds the attempt: a crash in between
+# leaves a queued item for an attempt that is still open, never a submitted attempt without its answers.
+# The workers leave such items alone until the attempt is submitted again or closed by the deadline sweep.
+# Returns None if the attempt had already been submitted (another tab, or the deadline sweep).
+def enqueue_submission(quiz_id, user_id, selected_options, attempt=None, submitted_at=None):
+    from services.grading import close_attempt
+
+    now = datetime.utcnow()
+    if attempt is None:
+        # Left open by an earlier try that hit a locked database?
+        attempt = QuizAttempt.query.filter_by(user_id=user_id, quiz_id=quiz_id).first()
+    if attempt is None:
+        # Committed open first, so a queued item never names a rolled-back id that a later attempt reuses
+        attempt = QuizAttempt(user_id=user_id, quiz_id=quiz_id, started_at=now)
+        db.session.add(attempt)
+        db.session.commit()
+    if not close_attempt(attempt, submitted_at or now):
+        return None
+
+    try:
+        submission_queue.put(attempt.id, selected_options)
+    except Exception:
+        db.session.rollback()  # The attempt stays open; the user can submit again
+        raise
+    db.session.commit()
+    _wakeup.set()
+    return attempt
+
+
+def is_grading(attempt):
+    return submission_queue is not None and attempt.submitted_at is not None and submission_queue.is_pending(attempt.id)
+
+
+_wakeup = threading.Event()
+
+
+# Grade a claimed batch in one transaction. If that fails, grade each submission on its own,
+# so one bad payload holds up only itself. Returns (graded item ids, failed item ids).
+def _grade(items):
+    from services.grading import grade_submitted_attempts
+
+    try:
+        grade_submitted_attempts([(attempt_id, payload) for _, attempt_id, payload in items])
+        return [item_id for item_id, _, _ in items], []
+    except Exception:
+        db.session.rollback()
+        if len(items) == 1:
+            logger.exception("Grading submission %d (attempt %d) failed", items[0][0], items[0][1])
+            return [], [items[0][0]]
+        logger.warning("Grading batch of %d failed; grading its submissions one by one", len(items), exc_info=True)
+
+    graded, failed = [], []
+    for item_id, attempt_id, payload in items:
+        try:
+            grade_submitted_attempts([(attempt_id, payload)])
+            graded.append(item_id)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Grading submission %d (attempt %d) failed", item_id, attempt_id)
+            failed.append(item_id)
+    return graded, failed
+
+
+# Attempts that are not submitted yet: their submission has not committed (or never will)
+def _open_attempts(attempt_ids):
+    return set(db.session.scalars(
+        db.select(QuizAttempt.id).where(QuizAttempt.id.in_(attempt_ids), QuizAttempt.submitted_at.is_(None))
+    ))
+
+
+def _worker(app, queue, batch_size, poll_interval):
+    while True:
+        try:
+            items = queue.claim(batch_size)
+            if not items:
+                _wakeup.wait(poll_interval)
+                _wakeup.clear()
+                continue
+
+            with app.app_context():
+                waiting = _open_attempts([attempt_id for _, attempt_id, _ in items])
+                graded, failed = _grade([item for item in items if item[1] not in waiting])
+            queue.ack(graded)
+            queue.release([item_id for item_id, attempt_id, _ in items if attempt_id in waiting], poll_interval)
+            for item_id in failed:
+                if queue.fail(item_id):
+                    logger.error("Submission %d failed %d times; dead-lettered (flask requeue-submissions "
+                                 "puts it back)", item_id, queue.max_tries)
+            if failed:
+                time.sleep(poll_interval)
+        except Exception:
+            logger.exception("Grading worker error")  # e.g. the queue file locked; keep the worker alive
+            time.sleep(poll_interval)
+
+
+def init_app(app):
+    global submission_queue
+    if app.config['SUBMISSION_MODE'] != 'queued':
+        return
+
+    path = app.config['SUBMISSION_QUEUE_PATH'] or os.path.join(app.instance_path, 'submissions.db')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    submission_queue = SubmissionQueue(path, max_tries=app.config['SUBMISSION_MAX_TRIES'])
+    if not serving():
+        return  # CLI commands (e.g. requeue-submissions) use the queue but do not grade
+
+    for i in range(app.config['SUBMISSION_WORKERS']):
+        threading.Thread(
+            target=_worker, name=f'grading-worker-{i}', daemon=True,
+            args=(app, submission_queue, app.config['SUBMISSION_BATCH_SIZE'], app.config['SUBMISSION_POLL_INTERVAL'])
+        ).start()